@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
-from .models import Department, StudentClass, StaffProfile, StudentProfile
+from .models import Department, StudentClass, StaffProfile, StudentProfile, AgentResultCache, AgentRunRecord
 
 admin.site.register(get_user_model())
 admin.site.register(Department)
 admin.site.register(StudentClass)
 admin.site.register(StaffProfile)
 admin.site.register(StudentProfile)
+admin.site.register(AgentResultCache)
+admin.site.register(AgentRunRecord)
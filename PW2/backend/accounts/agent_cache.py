@@ -0,0 +1,149 @@
+"""
+Content-addressed cache for bonafide agent results.
+
+Students often re-upload the exact same permission letter (after a rejection or
+a flaky network). The agent output only depends on the PDF bytes and the
+expected student details, so we key results on sha256(pdf) + expected and skip
+both the PDF parse and the Gemini calls on a hit.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import metrics
+from .agent_trace import current_trace
+from .bonafide_agent import run_bonafide_graph_from_text
+from .models import AgentResultCache
+
+logger = logging.getLogger(__name__)
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "BONAFIDE_AGENT_CACHE_TTL", 60 * 60 * 24 * 7))
+
+
+def _max_entries() -> int:
+    return int(getattr(settings, "BONAFIDE_AGENT_CACHE_MAX_ENTRIES", 5000))
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "BONAFIDE_AGENT_CACHE_ENABLED", True))
+
+
+def file_digest(data) -> str:
+    """sha256 of PDF bytes (or any buffer, e.g. a memoryview over the upload)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def upload_digest(upload) -> str:
+    """Hash a Django UploadedFile chunk by chunk (chunks() rewinds the file first)."""
+    h = hashlib.sha256()
+    for chunk in upload.chunks():
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(digest: str, expected: Optional[Dict[str, Optional[str]]] = None) -> str:
+    expected_json = json.dumps(expected or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{digest}:{expected_json}".encode("utf-8")).hexdigest()
+
+
+def get_result(key: str) -> Optional[dict]:
+    entry = AgentResultCache.objects.filter(key=key).only("id", "result", "created_at").first()
+    if entry is None:
+        return None
+    if entry.created_at < timezone.now() - timedelta(seconds=_ttl()):
+        entry.delete()
+        return None
+    # bump recency for LRU eviction without a full save()
+    AgentResultCache.objects.filter(pk=entry.pk).update(
+        hit_count=F("hit_count") + 1, last_used_at=timezone.now()
+    )
+    return entry.result
+
+
+def store_result(key: str, result: dict) -> None:
+    AgentResultCache.objects.update_or_create(
+        key=key, defaults={"result": result, "last_used_at": timezone.now()}
+    )
+    evict()
+
+
+def evict() -> int:
+    """Drop expired entries, then the least recently used ones above the size limit."""
+    cutoff = timezone.now() - timedelta(seconds=_ttl())
+    removed, _ = AgentResultCache.objects.filter(created_at__lt=cutoff).delete()
+    overflow = AgentResultCache.objects.count() - _max_entries()
+    if overflow > 0:
+        stale_ids = list(
+            AgentResultCache.objects.order_by("last_used_at").values_list("id", flat=True)[:overflow]
+        )
+        n, _ = AgentResultCache.objects.filter(id__in=stale_ids).delete()
+        removed += n
+    return removed
+
+
+def lookup(digest: str, expected: Optional[Dict[str, Optional[str]]]) -> Tuple[Optional[str], Optional[dict]]:
+    """(cache key, cached result or None). The key is None when the cache is disabled."""
+    if not _enabled():
+        return None, None
+    key = make_key(digest, expected)
+    try:
+        cached = get_result(key)
+    except Exception:
+        logger.exception("Agent cache lookup failed for key=%s", key)
+        cached = None
+    if cached is None:
+        metrics.incr("agent_cache.miss")
+        return key, None
+    metrics.incr("agent_cache.hit")
+    trace = current_trace()
+    if trace is not None:
+        trace.cache_hit = True
+    return key, cached
+
+
+def remember(key: Optional[str], result: dict) -> None:
+    if key is None:
+        return
+    try:
+        store_result(key, result)
+    except Exception:
+        logger.exception("Agent cache store failed for key=%s", key)
+
+
+def run_cached(digest: str, expected: Optional[Dict[str, Optional[str]]],
+               load_text: Callable[[], str]) -> dict:
+    """
+    Return the agent result for a PDF, running the graph only on a cache miss.
+    load_text is only called on a miss so hits also skip the PDF parse.
+    """
+    key, cached = lookup(digest, expected)
+    if cached is not None:
+        return cached
+    result = run_bonafide_graph_from_text(load_text(), expected=expected)
+    remember(key, result)
+    return result
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters plus the number of LLM extractions the cache has avoided."""
+    counters = metrics.get_counters("agent_cache.hit", "agent_cache.miss")
+    hits, misses = counters["agent_cache.hit"], counters["agent_cache.miss"]
+    saved_calls = 0
+    for entry in AgentResultCache.objects.filter(hit_count__gt=0).only("result", "hit_count").iterator():
+        saved_calls += entry.hit_count * int((entry.result or {}).get("iterations") or 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if (hits + misses) else 0.0,
+        "entries": AgentResultCache.objects.count(),
+        "total_entry_hits": AgentResultCache.objects.aggregate(n=Sum("hit_count"))["n"] or 0,
+        "llm_calls_saved": saved_calls,
+    }
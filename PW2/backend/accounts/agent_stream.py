@@ -0,0 +1,103 @@
+"""
+Server-sent events for /bonafide/check/stream/.
+
+The view is async, so under ASGI (backend/asgi.py) an open stream only holds
+a coroutine on the event loop, not a worker thread. The blocking part (cache
+lookup, PDF parse, the LangGraph run via stream_mode="updates") runs in a
+worker thread via run_check_events. Each event goes back to the loop through
+an asyncio.Queue as soon as it happens:
+
+  event: cached      a cached result exists (followed directly by "result")
+  event: parsed      PDF text extracted ({"chars": n})
+  event: rules       rule extractor finished ({"confidence": x})
+  event: extraction  LLM extraction/retry iteration N finished ({"iteration", "node", "fields"})
+  event: audit       auditor checklist ({"checklist", "is_valid", "iteration"})
+  event: result      final result, same body as /bonafide/check/ (incl. check_token)
+  event: error       {"detail", "reason"?}; the stream ends after it
+"""
+import asyncio
+import json
+from typing import Callable
+
+from django.db import close_old_connections
+
+from .agent_cache import lookup, remember
+from .agent_trace import trace_run
+from .bonafide_agent import get_pdf_text, stream_bonafide_graph
+from .check_token import make_check_token
+from .llm_guard import LLMUnavailable
+
+_DONE = object()
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _node_event(node: str, update: dict):
+    if node == "rules":
+        return "rules", {"confidence": update.get("rule_confidence", 0.0)}
+    if node in ("extract", "retry"):
+        fields = {k: v for k, v in (update.get("extracted_data") or {}).items() if k != "explanation"}
+        return "extraction", {"iteration": update.get("iterations", 0), "node": node, "fields": fields}
+    if node == "audit":
+        return "audit", {"checklist": update.get("checklist_results") or {}, "is_valid": bool(update.get("is_valid"))}
+    return node, update
+
+
+def run_check_events(source, digest: str, expected: dict, emit: Callable[[str, dict], None]) -> None:
+    """Blocking check pipeline; reports progress through emit(event, data)."""
+    try:
+        with trace_run("check-stream"):
+            key, cached = lookup(digest, expected)
+            if cached is not None:
+                emit("cached", {})
+                result = cached
+            else:
+                text = get_pdf_text(source)
+                emit("parsed", {"chars": len(text)})
+                iteration = 0
+                result = None
+                for kind, *payload in stream_bonafide_graph(text, expected):
+                    if kind == "result":
+                        result = payload[0]
+                        continue
+                    node, update = payload
+                    iteration = update.get("iterations", iteration)
+                    event, data = _node_event(node, update)
+                    if event == "audit":
+                        data["iteration"] = iteration
+                    emit(event, data)
+                remember(key, result)
+        emit("result", {**result, "check_token": make_check_token(digest, result)})
+    except LLMUnavailable as exc:
+        emit("error", {"detail": "The document checker is busy, please try again shortly.", "reason": exc.reason})
+    except Exception as exc:
+        emit("error", {"detail": f"Agent run failed: {exc}"})
+    finally:
+        close_old_connections()
+
+
+async def check_event_stream(source, digest: str, expected: dict):
+    """Async generator of SSE frames for one check; the work runs in a worker thread."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def work():
+        try:
+            run_check_events(source, digest, expected, emit)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    job = loop.run_in_executor(None, work)
+    # an initial comment flushes headers so clients see the stream open right away
+    yield ": stream open\n\n"
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            break
+        yield sse(*item)
+    await job
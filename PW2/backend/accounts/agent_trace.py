@@ -0,0 +1,169 @@
+"""
+Per-run instrumentation for the bonafide agent.
+
+A trace is opened around one check/submit agent run (trace_run). PDF parsing,
+the graph run and each node invocation record wall time, LLM token counts
+and exception types into it. On exit it is stored as a compact AgentRunRecord
+row, which the staff-only /bonafide/agent-stats/ endpoint aggregates.
+
+The current trace lives in a ContextVar so the nodes do not need any extra
+state; code running outside a trace (shell, replay tools) records nothing.
+"""
+import contextlib
+import contextvars
+import functools
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("bonafide_agent_trace", default=None)
+
+
+class AgentTrace:
+    def __init__(self, endpoint: str, bonafide_id: Optional[int] = None, record: bool = True):
+        self.endpoint = endpoint
+        self.bonafide_id = bonafide_id
+        self.record = record  # store an AgentRunRecord / replay-corpus entry for this run
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.stages: Dict[str, float] = {}
+        self.nodes: List[list] = []  # [node, ms, input_tokens, output_tokens, error_type]
+        self.iterations = 0
+        self.llm_calls = 0
+        self.cache_hit = False
+        self.error_type = ""
+        self.llm_responses: List[dict] = []  # structured LLM outputs, in call order (replay corpus)
+
+    def add_stage(self, stage: str, ms: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + ms
+
+    def add_node(self, node: str, ms: float, input_tokens: int = 0, output_tokens: int = 0, error_type: str = "") -> None:
+        self.nodes.append([node, round(ms, 2), input_tokens, output_tokens, error_type])
+
+    def save(self) -> None:
+        from .models import AgentRunRecord
+
+        AgentRunRecord.objects.create(
+            bonafide_id=self.bonafide_id,
+            endpoint=self.endpoint,
+            total_ms=round(self.total_ms, 2),
+            pdf_ms=self.stages.get("pdf"),
+            graph_ms=self.stages.get("graph"),
+            iterations=self.iterations,
+            llm_calls=self.llm_calls,
+            input_tokens=sum(n[2] for n in self.nodes),
+            output_tokens=sum(n[3] for n in self.nodes),
+            cache_hit=self.cache_hit,
+            error_type=self.error_type,
+            nodes=self.nodes,
+        )
+
+
+def current_trace() -> Optional[AgentTrace]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def trace_run(endpoint: str, bonafide_id: Optional[int] = None, record: bool = True):
+    """Trace one agent run; with record=False (offline replay) nothing is stored."""
+    trace = AgentTrace(endpoint, bonafide_id, record)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except Exception as exc:
+        trace.error_type = type(exc).__name__
+        raise
+    finally:
+        _current.reset(token)
+        trace.total_ms = (time.perf_counter() - trace.started) * 1000
+        if trace.record:
+            try:
+                trace.save()
+            except Exception:
+                logger.exception("Failed to store agent run record for bonafide id=%s", bonafide_id)
+
+
+@contextlib.contextmanager
+def trace_stage(stage: str):
+    """Time a non-node stage (pdf parse, whole graph run) into the current trace."""
+    trace = _current.get()
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        if trace is not None:
+            trace.add_stage(stage, (time.perf_counter() - started) * 1000)
+
+
+def traced_node(name: str):
+    """Wrap a LangGraph node so each invocation is recorded in the current trace."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(state, *args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return fn(state, *args, **kwargs)
+            before = dict(state.get("tokens") or {})
+            started = time.perf_counter()
+            try:
+                update = fn(state, *args, **kwargs)
+            except Exception as exc:
+                trace.add_node(name, (time.perf_counter() - started) * 1000, error_type=type(exc).__name__)
+                raise
+            after = (update or {}).get("tokens") or before
+            trace.add_node(
+                name,
+                (time.perf_counter() - started) * 1000,
+                after.get("input", 0) - before.get("input", 0),
+                after.get("output", 0) - before.get("output", 0),
+            )
+            return update
+        return wrapper
+    return decorator
+
+
+def percentiles(samples: Iterable[float], points=(50, 95, 99)) -> Dict[str, float]:
+    ordered = sorted(s for s in samples if s is not None)
+    if not ordered:
+        return {f"p{p}": None for p in points}
+    out = {}
+    for p in points:
+        k = (len(ordered) - 1) * p / 100.0
+        lo = int(k)
+        hi = min(lo + 1, len(ordered) - 1)
+        out[f"p{p}"] = round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 2)
+    return out
+
+
+def aggregate_runs(records) -> dict:
+    """p50/p95/p99 latency per stage and per node, plus token/error totals."""
+    records = list(records)
+    node_ms: Dict[str, List[float]] = {}
+    node_errors: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    for r in records:
+        if r.error_type:
+            errors[r.error_type] = errors.get(r.error_type, 0) + 1
+        for node, ms, _in, _out, err in r.nodes or []:
+            node_ms.setdefault(node, []).append(ms)
+            if err:
+                node_errors[node] = node_errors.get(node, 0) + 1
+    runs = len(records)
+    return {
+        "runs": runs,
+        "cache_hit_rate": (sum(1 for r in records if r.cache_hit) / runs) if runs else 0.0,
+        "total_ms": percentiles(r.total_ms for r in records),
+        "pdf_ms": percentiles(r.pdf_ms for r in records),
+        "graph_ms": percentiles(r.graph_ms for r in records),
+        "iterations": percentiles(r.iterations for r in records),
+        "llm_calls_per_run": (sum(r.llm_calls for r in records) / runs) if runs else 0.0,
+        "input_tokens": percentiles(r.input_tokens for r in records),
+        "output_tokens": percentiles(r.output_tokens for r in records),
+        "nodes": {
+            node: {"calls": len(ms), "errors": node_errors.get(node, 0), **percentiles(ms)}
+            for node, ms in node_ms.items()
+        },
+        "errors": errors,
+    }
@@ -0,0 +1,133 @@
+"""
+Background pipeline for the bonafide agent.
+
+BonafideSubmitView only persists the request and enqueues it here; a small
+in-process thread pool parses the PDF, runs the agent graph and writes the
+result back. The queue itself is the BonafideRequest.agent_status column, so no
+external broker is needed.
+
+Nothing in the web process recovers rows on its own: anything left 'queued' or
+'running' by a restarted worker, and requests parked as 'deferred' while the
+LLM was unavailable (circuit breaker open, see accounts/llm_guard.py), wait for
+`manage.py run_agent_queue`. Run it periodically (cron, or `--every` as a
+long-lived process); see the README.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import metrics
+from .agent_cache import file_digest, run_cached
+from .agent_trace import trace_run
+from .bonafide_agent import get_pdf_text
+from .llm_guard import LLMUnavailable, get_guard
+from .models import BonafideRequest
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(getattr(settings, "BONAFIDE_AGENT_WORKERS", 2)),
+                    thread_name_prefix="bonafide-agent",
+                )
+    return _executor
+
+
+def expected_details_for(user) -> Dict[str, Optional[str]]:
+    """The logged-in student's details the agent verifies the letter against."""
+    student_profile = getattr(user, "student_profile", None)
+    return {
+        "name": getattr(user, "name", None) or getattr(user, "full_name", None) or getattr(user, "username", None),
+        "roll_number": getattr(user, "username", None),
+        "department": (
+            getattr(getattr(student_profile, "student_class", None), "code", None)
+            or getattr(student_profile, "department", None)
+            or ""
+        ),
+    }
+
+
+def apply_agent_result(bon: BonafideRequest, agent_result: dict) -> None:
+    bon.extracted = agent_result.get('extracted') or {}
+    bon.checklist = agent_result.get('checklist') or {}
+    bon.is_valid = bool(agent_result.get('is_valid', False))
+    # prefer explanation inside extracted if present
+    explanation = None
+    if isinstance(bon.extracted, dict):
+        explanation = bon.extracted.get('explanation')
+    if not explanation:
+        explanation = agent_result.get('explanation') or ''
+    bon.explanation = explanation or ''
+
+
+def process_bonafide(bonafide_id: int) -> bool:
+    """
+    Run the agent for one queued request. Returns False when the row was already
+    claimed by another worker (or no longer exists).
+    """
+    # claim the row atomically so the pool and run_agent_queue never double-process it
+    claimed = BonafideRequest.objects.filter(pk=bonafide_id, agent_status="queued").update(
+        agent_status="running", agent_claimed_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    bon = BonafideRequest.objects.select_related("student__student_profile__student_class").get(pk=bonafide_id)
+    try:
+        with trace_run("submit", bon.id):
+            with bon.permission_file.open("rb") as fh:
+                data = fh.read()
+            agent_result = run_cached(file_digest(data), expected_details_for(bon.student), lambda: get_pdf_text(data))
+    except LLMUnavailable as exc:
+        logger.warning("LLM unavailable for bonafide id=%s, deferring: %s", bon.id, exc)
+        BonafideRequest.objects.filter(pk=bon.pk).update(agent_status="deferred")
+        return True
+    except Exception as exc:
+        logger.exception("LLM run failed for bonafide id=%s: %s", bon.id, str(exc))
+        BonafideRequest.objects.filter(pk=bon.pk).update(agent_status="failed")
+        return True
+
+    apply_agent_result(bon, agent_result)
+    bon.agent_status = "done"
+    bon.save(update_fields=["extracted", "checklist", "is_valid", "explanation", "agent_status"])
+    return True
+
+
+def _run_job(bonafide_id: int) -> None:
+    close_old_connections()
+    try:
+        process_bonafide(bonafide_id)
+    except Exception:
+        logger.exception("Agent worker crashed for bonafide id=%s", bonafide_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_bonafide(bon: BonafideRequest) -> None:
+    """Schedule the agent for a freshly saved request once the transaction commits."""
+    if get_guard().is_open():
+        # don't queue work that would only fail fast; run_agent_queue picks it up later
+        BonafideRequest.objects.filter(pk=bon.pk).update(agent_status="deferred")
+        bon.agent_status = "deferred"
+        metrics.incr("llm_guard.deferred_submissions")
+        return
+    if not getattr(settings, "BONAFIDE_AGENT_ASYNC", True):
+        # synchronous mode (dev/tests): run inline and hand back the updated row
+        process_bonafide(bon.pk)
+        bon.refresh_from_db()
+        return
+    bonafide_id = bon.pk
+    transaction.on_commit(lambda: get_executor().submit(_run_job, bonafide_id))
@@ -0,0 +1,168 @@
+"""
+Department/class alias index used by auditor_node.
+
+Every Department and StudentClass code and name is reduced to a canonical key
+("B.E. Computer Science and Engineering", "BE_CSE" and "BE CSE" all become
+"BE CSE") and mapped to its (department_id, class_id). An extracted department
+string then resolves with a single dict lookup. The index is built once per
+process. Saving or deleting a Department/StudentClass bumps a version in the
+Django cache (see accounts/signals.py), which makes every worker rebuild it.
+"""
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from django.core.cache import cache
+
+VERSION_KEY = "accounts:alias_index_version"
+
+# long forms contracted to the abbreviation used in department/class codes
+# (longest phrases first so "COMPUTER SCIENCE ENGINEERING" wins over "COMPUTER SCIENCE")
+CONTRACTIONS = [
+    (("ELECTRONICS", "COMMUNICATION", "ENGINEERING"), "ECE"),
+    (("ELECTRICAL", "ELECTRONICS", "ENGINEERING"), "EEE"),
+    (("COMPUTER", "SCIENCE", "ENGINEERING"), "CSE"),
+    (("ARTIFICIAL", "INTELLIGENCE"), "AI"),
+    (("MACHINE", "LEARNING"), "ML"),
+    (("INFORMATION", "TECHNOLOGY"), "IT"),
+    (("ELECTRICAL", "ENGINEERING"), "EE"),
+    (("COMPUTER", "SCIENCE"), "CSE"),
+    (("BACHELOR", "ENGINEERING"), "BE"),
+]
+STOPWORDS = {"AND", "OF", "THE", "IN", "DEPARTMENT", "DEPT", "BRANCH", "COURSE", "PROGRAMME", "PROGRAM"}
+DEGREES = {"BE", "BTECH", "ME", "MTECH"}
+MAX_TOKENS = 12
+
+
+class AliasTarget(NamedTuple):
+    department_id: int
+    class_id: Optional[int]  # None when the alias names the whole department
+
+
+def canonical_tokens(value: Optional[str]) -> List[str]:
+    # drop dots first so "B.E." -> "BE"; underscores/punctuation split tokens
+    raw = [t.upper() for t in re.findall(r"[A-Za-z0-9]+", (value or "").replace(".", ""))]
+    tokens: List[str] = []
+    for t in raw:
+        # "B E" (from "B. E.") -> "BE"
+        if len(t) == 1 and t.isalpha() and tokens and len(tokens[-1]) == 1 and tokens[-1].isalpha():
+            tokens[-1] += t
+            continue
+        if t not in STOPWORDS:
+            tokens.append(t)
+    out: List[str] = []
+    i = 0
+    while i < len(tokens):
+        for phrase, abbr in CONTRACTIONS:
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                out.append(abbr)
+                i += len(phrase)
+                break
+        else:
+            out.append(tokens[i])
+            i += 1
+    return out[:MAX_TOKENS]
+
+
+def canonical_key(value: Optional[str]) -> str:
+    return " ".join(canonical_tokens(value))
+
+
+class AliasIndex:
+    def __init__(self, aliases: Dict[str, AliasTarget]):
+        self.aliases = aliases
+
+    @classmethod
+    def build(cls) -> "AliasIndex":
+        from .models import Department, StudentClass
+
+        candidates: Dict[str, set] = {}
+
+        def add(value, target):
+            tokens = canonical_tokens(value)
+            if not tokens or all(t in DEGREES for t in tokens):
+                # a bare degree ("BE") names no department
+                return
+            candidates.setdefault(" ".join(tokens), set()).add(target)
+            # also index without the degree prefix: "CSE G1" for "BE CSE G1"
+            if tokens[0] in DEGREES and len(tokens) > 1:
+                candidates.setdefault(" ".join(tokens[1:]), set()).add(target)
+
+        for dept_id, code, name in Department.objects.values_list("id", "code", "name"):
+            for value in (code, name):
+                add(value, AliasTarget(dept_id, None))
+        for class_id, code, name, dept_id in StudentClass.objects.values_list("id", "code", "name", "department_id"):
+            for value in (code, name):
+                add(value, AliasTarget(dept_id, class_id))
+
+        aliases = {}
+        for key, targets in candidates.items():
+            if len(targets) == 1:
+                aliases[key] = next(iter(targets))
+                continue
+            # several classes (or a class and its department) share a key: keep it
+            # at department level if they agree on the department, else drop it
+            dept_ids = {t.department_id for t in targets}
+            if len(dept_ids) == 1:
+                aliases[key] = AliasTarget(dept_ids.pop(), None)
+        return cls(aliases)
+
+    def resolve(self, value: Optional[str]) -> Optional[AliasTarget]:
+        tokens = canonical_tokens(value)
+        if not tokens:
+            return None
+        hit = self.aliases.get(" ".join(tokens))
+        if hit is not None:
+            return hit
+        # surrounding noise ("III year BE CSE G1 section A"): longest known sub-phrase wins
+        for size in range(len(tokens) - 1, 0, -1):
+            for start in range(len(tokens) - size + 1):
+                hit = self.aliases.get(" ".join(tokens[start:start + size]))
+                if hit is not None:
+                    return hit
+        return None
+
+
+_index: Optional[AliasIndex] = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_alias_index() -> AliasIndex:
+    global _index, _index_version
+    version = cache.get(VERSION_KEY, 0)
+    if _index is None or version != _index_version:
+        with _index_lock:
+            if _index is None or version != _index_version:
+                _index = AliasIndex.build()
+                _index_version = version
+    return _index
+
+
+def invalidate_alias_index() -> None:
+    global _index
+    _index = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def departments_match(extracted: Optional[str], expected: Optional[str]) -> bool:
+    """
+    True when the extracted department/class names the same thing as the expected
+    one (usually the student's class code): the same class when the expected value
+    is a class, the same department when it is a department. A bare department or
+    degree ("CSE", "B.E.") never verifies a specific class.
+    """
+    if not extracted or not expected:
+        return False
+    index = get_alias_index()
+    exp, ext = index.resolve(expected), index.resolve(extracted)
+    if exp is not None and ext is not None:
+        if exp.class_id is not None:
+            return ext.class_id == exp.class_id
+        return ext.department_id == exp.department_id
+    # not in the tables: the canonical forms must be identical ("B.E. CSE" == "BE_CSE")
+    exp_tokens = canonical_tokens(expected)
+    return bool(exp_tokens) and exp_tokens == canonical_tokens(extracted)
@@ -1,15 +1,63 @@
-import os
-import json
-from typing import TypedDict, Dict, Optional
+import logging
+import threading
+import time
+from typing import TypedDict, Dict, List, Optional
 from pydantic import BaseModel, Field
-import fitz  # PyMuPDF for PDF extraction
 import re
 
-from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
+from django.conf import settings
 
-os.environ["GOOGLE_API_KEY"] = ""
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+from . import metrics
+from .agent_trace import current_trace, trace_stage, traced_node
+from .alias_index import departments_match
+from .llm_guard import get_guard
+from .pdf_pool import parse_pdf
+from .replay_corpus import capture_run
+from .pdf_text import PdfSource
+
+logger = logging.getLogger(__name__)
+
+# langchain/langgraph/PyMuPDF are imported lazily: views.py imports this module, so
+# anything done at import time is paid by every manage.py command and worker boot.
+END = "__end__"  # same value as langgraph.graph.END; avoids importing langgraph here
+
+_llms: Dict[int, object] = {}
+_bonafide_app = None
+_init_lock = threading.Lock()
+
+
+def model_tiers() -> List[Dict[str, Optional[str]]]:
+    from .llm_backends import tier_specs
+
+    return tier_specs()
+
+
+def get_llm(tier: int = 0):
+    """
+    The shared chat model for an LLM tier (BONAFIDE_MODEL_TIERS, cheapest first;
+    see accounts/llm_backends.py), built on first use.
+    """
+    llm = _llms.get(tier)
+    if llm is None:
+        with _init_lock:
+            llm = _llms.get(tier)
+            if llm is None:
+                from .llm_backends import build_llm
+
+                spec = model_tiers()[tier]
+                llm = _llms[tier] = build_llm(spec["backend"], spec["model"])
+    return llm
+
+
+def reset_llms(llm=None) -> None:
+    """
+    Drop the cached clients, e.g. after changing the backend/tier settings. With llm,
+    pin every tier to that model instead (offline replay, benchmarks).
+    """
+    with _init_lock:
+        _llms.clear()
+        if llm is not None:
+            _llms.update({tier: llm for tier in range(len(model_tiers()))})
 
 # --- UPDATED: structured schema includes explanation ---
 class BonafideDetails(BaseModel):
@@ -28,14 +76,157 @@ class BonafideState(TypedDict):
     is_valid: bool
     iterations: int
     expected: Dict[str, Optional[str]]  # supplied expected values: name, roll_number, department
+    source: str  # "rules" or "llm": who produced extracted_data
+    rule_confidence: float
+    llm_calls: int
+    node_calls: Dict[str, int]  # invocations per graph node
+    tokens: Dict[str, int]  # LLM usage: {"input": n, "output": n}
+    tier: int  # index into model_tiers() of the model behind the last LLM extraction
+
+# core checklist rows and the extracted field each one audits
+CORE_CHECKS = {"Name": "name", "Roll No": "roll_number", "Dept": "department"}
+
+
+def _count_call(state: BonafideState, node: str) -> Dict[str, int]:
+    calls = dict(state.get("node_calls") or {})
+    calls[node] = calls.get(node, 0) + 1
+    metrics.incr(f"agent.node.{node}")
+    return calls
+
+
+def _add_usage(state: BonafideState, usage: Dict) -> Dict[str, int]:
+    tokens = dict(state.get("tokens") or {"input": 0, "output": 0})
+    tokens["input"] = tokens.get("input", 0) + int(usage.get("input_tokens") or 0)
+    tokens["output"] = tokens.get("output", 0) + int(usage.get("output_tokens") or 0)
+    return tokens
+
 
-# Utility: PDF text extraction (assumes fitz imported above)
-def get_pdf_text(path: str) -> str:
-    text = ""
-    with fitz.open(path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
+def invoke_structured(prompt: str, tier: int = 0):
+    """Call the tier's LLM for BonafideDetails; returns (fields dict, usage_metadata dict)."""
+    structured_llm = get_llm(tier).with_structured_output(BonafideDetails, include_raw=True)
+    name = model_tiers()[tier]["name"]
+    started = time.perf_counter()
+    # concurrency limit + circuit breaker; raises LLMUnavailable instead of piling up
+    try:
+        out = get_guard().call(lambda: structured_llm.invoke(prompt))
+    finally:
+        metrics.incr(f"agent.tier.{name}.calls")
+        metrics.incr(f"agent.tier.{name}.ms", int((time.perf_counter() - started) * 1000))
+    parsed = out.get("parsed")
+    if parsed is None:
+        raise out.get("parsing_error") or ValueError("LLM returned no structured output")
+    data = parsed.dict() if hasattr(parsed, "dict") else dict(parsed)
+    usage = getattr(out.get("raw"), "usage_metadata", None) or {}
+    metrics.incr(f"agent.tier.{name}.tokens_in", int(usage.get("input_tokens") or 0))
+    metrics.incr(f"agent.tier.{name}.tokens_out", int(usage.get("output_tokens") or 0))
+    trace = current_trace()
+    if trace is not None:
+        trace.llm_responses.append({"tier": name, "fields": data, "usage": dict(usage)})
+    return data, usage
+
+# Utility: PDF text extraction (bounded by the BONAFIDE_PDF_* page/char/token budgets)
+def get_pdf_text(source: PdfSource) -> str:
+    """source is the raw PDF bytes (preferred, opened as a stream) or a file path."""
+    with trace_stage("pdf"):
+        result = parse_pdf(source)
+    metrics.incr("pdf.documents")
+    metrics.incr("pdf.pages_read", result.pages_read)
+    metrics.incr("pdf.bytes_extracted", result.bytes_extracted)
+    if result.truncated:
+        metrics.incr("pdf.truncated")
+        logger.info("PDF text truncated: read %s of %s pages, %s bytes",
+                    result.pages_read, result.page_count, result.bytes_extracted)
+    return result.text
+
+# --- NODE 0: Rule-based pre-extractor (no LLM) ---
+# Most letters follow the college template ("Name: ...", "Roll No: ...") or the
+# standard "I, <name>, (Roll No ...) studying in <class>" prose, so plain regexes
+# recover the core fields. A confident, fully-matching result skips Gemini.
+RULE_PATTERNS = {
+    "name": [
+        re.compile(r"\b(?:student'?s?\s+)?name\s*[:\-]\s*(?P<v>[^\n]+)", re.I),
+        re.compile(r"\bI\s*,\s*(?P<v>[A-Za-z][A-Za-z. ]{1,60}?)\s*[,(]"),
+    ],
+    "roll_number": [
+        re.compile(r"\b(?:roll|reg(?:ister)?)\.?\s*(?:no|number)?\.?\s*[:\-]?\s*(?P<v>[A-Za-z]*\d[A-Za-z0-9/\-]{2,})", re.I),
+    ],
+    "department": [
+        re.compile(r"\b(?:department|dept|class|branch|course)\.?\s*[:\-]\s*(?P<v>[^\n]+)", re.I),
+        re.compile(r"studying\s+(?:in\s+)?(?:the\s+)?(?P<v>[^,\n.]+)", re.I),
+    ],
+    "reason": [
+        re.compile(r"\b(?:reason|purpose|subject)\s*[:\-]\s*(?P<v>[^\n]+)", re.I),
+        re.compile(r"bonafide\s+certificate\s+(?:for|to)\s+(?P<v>[^.\n]+)", re.I),
+    ],
+}
+# a signature counts only when something follows the closing or the "Signature:" label;
+# template letters print the word "Signature" with a blank line to sign on
+CLOSING_PATTERN = re.compile(r"yours\s+(?:faithfully|sincerely|truly|obediently)\b[^\n]*\n(?P<rest>(?:[^\n]*\n?){1,3})", re.I)
+SIGNATURE_LABEL_PATTERN = re.compile(r"\bsignature\b[^:\n]*:[ \t]*(?P<v>[^\n]*)", re.I)
+LABEL_LINE_PATTERN = re.compile(r"^\s*[A-Za-z]+(?:\s+[A-Za-z]+){0,3}\s*:")
+RULE_CORE_FIELDS = ("name", "roll_number", "department", "reason")
+
+
+def _filled(value: str) -> bool:
+    """Something other than a blank to write on ("_____", "......", "-")."""
+    value = (value or "").strip()
+    return bool(re.search(r"[A-Za-z]", value)) and not re.search(r"_{2,}|\.{3,}", value)
+
+
+def has_signature_block(text: str) -> bool:
+    for m in SIGNATURE_LABEL_PATTERN.finditer(text):
+        if _filled(m.group("v")):
+            return True
+    m = CLOSING_PATTERN.search(text)
+    if m:
+        # the first non-empty line under "Yours faithfully," must be a name, not another blank label
+        line = next((ln for ln in m.group("rest").splitlines() if ln.strip()), "")
+        return _filled(line) and not LABEL_LINE_PATTERN.match(line)
+    return False
+
+
+def rule_extract(raw_text: str):
+    """
+    Returns (extracted, confidence): the share of core fields read from the letter's
+    labels/template prose (1.0 each). The student's expected details are never
+    copied in, so the audit can't end up comparing a profile value with itself.
+    """
+    text = raw_text or ""
+    extracted = {}
+    score = 0.0
+    for field in RULE_CORE_FIELDS:
+        value = None
+        for pattern in RULE_PATTERNS[field]:
+            m = pattern.search(text)
+            if m:
+                value = m.group("v").strip(" .:-\t")
+                if value:
+                    break
+        if value:
+            score += 1.0
+        extracted[field] = value or None
+    extracted["has_signature"] = has_signature_block(text)
+    extracted["explanation"] = (
+        "Letter follows the college template; details were read without the AI model."
+    )
+    return extracted, score / len(RULE_CORE_FIELDS)
+
+
+def rule_extractor_node(state: BonafideState):
+    extracted, confidence = rule_extract(state.get("raw_text", ""))
+    return {
+        "extracted_data": extracted,
+        "rule_confidence": confidence,
+        "source": "rules",
+        "node_calls": _count_call(state, "rules"),
+    }
+
+
+def route_after_rules(state: BonafideState):
+    threshold = float(getattr(settings, "BONAFIDE_RULE_CONFIDENCE_THRESHOLD", 0.75))
+    if state.get("rule_confidence", 0.0) >= threshold:
+        return "audit"
+    return "extract"
 
 # --- NODE 1: Extractor Agent (simple, explicit prompt) ---
 def extractor_node(state: BonafideState):
@@ -45,7 +236,6 @@ def extractor_node(state: BonafideState):
     The prompt now also receives the expected values so the LLM can prefer matching fields,
     but the final verification is performed in the auditor_node.
     """
-    structured_llm = llm.with_structured_output(BonafideDetails)
     expected = state.get("expected", {}) or {}
     prompt = (
         "Extract the following fields from this college bonafide letter and provide a short 1-2 sentence "
@@ -59,71 +249,90 @@ def extractor_node(state: BonafideState):
         "Extract the fields as present in the document. Do NOT guess the expected values — just extract what you see. "
         "The auditor will compare extracted values to the expected values and report matches/mismatches."
     )
-    print(expected)
-    data = structured_llm.invoke(prompt)
-    extracted = data.dict() if hasattr(data, "dict") else dict(data)
-    return {"extracted_data": extracted, "iterations": state.get("iterations", 0) + 1, "expected": expected}
+    # first LLM tier (cheapest); field_retry_node escalates if the audit fails
+    extracted, usage = invoke_structured(prompt, tier=0)
+    return {
+        "extracted_data": extracted,
+        "iterations": state.get("iterations", 0) + 1,
+        "expected": expected,
+        "source": "llm",
+        "tier": 0,
+        "llm_calls": state.get("llm_calls", 0) + 1,
+        "node_calls": _count_call(state, "extract"),
+        "tokens": _add_usage(state, usage),
+    }
 
-# --- NODE 2: Auditor Agent (builds checklist including AI reasoning) ---
-def auditor_node(state: BonafideState):
-    data = state.get("extracted_data", {}) or {}
-    expected = state.get("expected", {}) or {}
+# --- NODE 1b: Targeted retry (only the core fields the auditor reported missing) ---
+def failing_fields(state: BonafideState):
+    """
+    Split failing core fields into (missing, mismatched) extracted-field names. A field
+    that was read but has no expected value is neither: no retry or stronger model
+    can verify it.
+    """
+    checklist = state.get("checklist_results", {}) or {}
+    missing, mismatched = [], []
+    for check, field in CORE_CHECKS.items():
+        verdict = checklist.get(check, "")
+        if verdict.startswith(("✅", "❌ Unverified")):
+            continue
+        if verdict.startswith("❌ Mismatch"):
+            mismatched.append(field)
+        else:
+            missing.append(field)
+    return missing, mismatched
 
-    def norm(s):
-        return "".join(ch for ch in (s or "").lower() if ch.isalnum())
-
-    def tokenize(s: Optional[str]):
-        s = (s or "")
-        # split into alphanumeric tokens (preserve letters/numbers)
-        return [t.upper() for t in re.findall(r'\w+', s)]
-
-    # map common abbreviations to their expanded token lists
-    ABBR_EXPANSIONS = {
-        "CSE": ["COMPUTER", "SCIENCE", "ENGINEERING"],
-        "IT": ["INFORMATION", "TECHNOLOGY"],
-        "AI": ["ARTIFICIAL", "INTELLIGENCE"],
-        "ML": ["MACHINE", "LEARNING"],
-        "ECE": ["ELECTRONICS", "COMMUNICATION", "ENGINEERING"],
-        "EE": ["ELECTRICAL", "ENGINEERING"],
-        # add more if needed
-    }
 
-    def expand_tokens(tokens):
-        out = []
-        for t in tokens:
-            out.append(t)
-            if t in ABBR_EXPANSIONS:
-                out.extend([w.upper() for w in ABBR_EXPANSIONS[t]])
-        return set(out)
-
-    def dept_equivalent(extracted_val: Optional[str], expected_val: Optional[str]) -> bool:
-        if not expected_val or not extracted_val:
-            return False
-        toks_exp = tokenize(expected_val)
-        toks_ext = tokenize(extracted_val)
-        if not toks_exp or not toks_ext:
-            return False
-
-        set_exp = expand_tokens(toks_exp)
-        set_ext = set(toks_ext)
-
-        # direct subset (expected tokens present in extracted)
-        if set_exp.issubset(set_ext):
-            return True
+def next_tier(state: BonafideState) -> Optional[int]:
+    """The stronger tier to escalate to, or None when the last tier was already used."""
+    tier = state.get("tier", 0) + 1
+    return tier if tier < len(model_tiers()) else None
 
-        # intersection ratio heuristic
-        inter = set_exp.intersection(set_ext)
-        if len(inter) / max(1, len(set_exp)) >= 0.6:
-            return True
 
-        # also accept if key tokens like degree + major both appear
-        # e.g., BE + COMPUTER/SCIENCE/ENGINEERING
-        if "BE" in set_exp:
-            major_tokens = {"COMPUTER", "SCIENCE", "ENGINEERING", "INFORMATION", "TECHNOLOGY"}
-            if len(major_tokens.intersection(set_ext)) >= 2:
-                return True
+def field_retry_node(state: BonafideState):
+    missing, mismatched = failing_fields(state)
+    tier = next_tier(state)
+    if tier is None:
+        # already on the strongest model: only re-ask for what it left out
+        tier, fields = state.get("tier", 0), missing
+    else:
+        # escalating: let the stronger model re-read mismatched fields too
+        fields = missing + mismatched
+    prompt = (
+        "From this college bonafide letter, extract only these fields: "
+        f"{', '.join(fields)}. Leave every other field empty.\n\n"
+        f"Text:\n\n{state['raw_text']}"
+    )
+    data, usage = invoke_structured(prompt, tier=tier)
+    extracted = dict(state.get("extracted_data") or {})
+    for field in fields:
+        if data.get(field):
+            extracted[field] = data[field]
+    return {
+        "extracted_data": extracted,
+        "tier": tier,
+        "iterations": state.get("iterations", 0) + 1,
+        "llm_calls": state.get("llm_calls", 0) + 1,
+        "node_calls": _count_call(state, "retry"),
+        "tokens": _add_usage(state, usage),
+    }
+
+# --- NODE 2: Auditor Agent (builds checklist including AI reasoning) ---
+def norm(s):
+    return "".join(ch for ch in (s or "").lower() if ch.isalnum())
 
-        return False
+def _core_verdict(found, expected, matched) -> str:
+    if not found:
+        return "❌ Missing"
+    if matched:
+        return "✅"
+    if not expected:
+        # nothing to compare against (e.g. an anonymous /bonafide/check/)
+        return "❌ Unverified: found '{}', no expected value to compare".format(found)
+    return "❌ Mismatch: found '{}' instead of '{}'".format(found, expected)
+
+def auditor_node(state: BonafideState):
+    data = state.get("extracted_data", {}) or {}
+    expected = state.get("expected", {}) or {}
 
     # name match: require non-empty and normalized equality
     name_found = bool(data.get("name"))
@@ -135,50 +344,74 @@ def auditor_node(state: BonafideState):
     dept_found = bool(data.get("department"))
     dept_match = False
     if expected.get("department") and data.get("department"):
-        dept_match = dept_equivalent(data.get("department"), expected.get("department"))
+        # one lookup in the Department/StudentClass alias index (accounts/alias_index.py)
+        dept_match = departments_match(data.get("department"), expected.get("department"))
 
     checklist = {
-        "Name": ("✅" if name_found and name_match else
-                 ("❌ Mismatch: found '{}' instead of '{}'".format(data.get("name"), expected.get("name")) if name_found else "❌ Missing")),
-        "Roll No": ("✅" if roll_found and roll_match else
-                    ("❌ Mismatch: found '{}' instead of '{}'".format(data.get("roll_number"), expected.get("roll_number")) if roll_found else "❌ Missing")),
-        "Dept": ("✅" if dept_found and dept_match else
-                 ("❌ Mismatch: found '{}' instead of '{}'".format(data.get("department"), expected.get("department")) if dept_found else "❌ Missing")),
+        "Name": _core_verdict(data.get("name"), expected.get("name"), name_found and name_match),
+        "Roll No": _core_verdict(data.get("roll_number"), expected.get("roll_number"), roll_found and roll_match),
+        "Dept": _core_verdict(data.get("department"), expected.get("department"), dept_found and dept_match),
         "Reason": f"✅" if data.get('reason') else "❌ Missing",
         "Signature": "✅" if data.get('has_signature') else "❌ Missing",
         "AI Reasoning": data.get('explanation', "N/A")
     }
 
     # determine validity: require Name, Roll No, Dept all present and matched (✅)
-    core_ok = all((v.startswith("✅") for k, v in checklist.items() if k in ("Name", "Roll No", "Dept")))
-    return {"checklist_results": checklist, "is_valid": core_ok}
+    core_ok = all((v.startswith("✅") for k, v in checklist.items() if k in CORE_CHECKS))
+    if core_ok and state.get("source") == "llm":
+        # the tier whose extraction finally verified (per-tier hit rate)
+        metrics.incr(f"agent.tier.{model_tiers()[state.get('tier', 0)]['name']}.resolved")
+    return {"checklist_results": checklist, "is_valid": core_ok, "node_calls": _count_call(state, "audit")}
 
-# --- LOGIC: Should we retry or end? (same simple rule) ---
+# --- LOGIC: Should we retry or end? ---
 def should_continue(state: BonafideState):
-    if state.get("is_valid") or state.get("iterations", 0) >= 2:
+    if state.get("is_valid"):
         return END
-    return "extract"
+    # rule-based fields did not verify: fall back to the LLM
+    if state.get("source") == "rules":
+        return "extract"
+    if state.get("iterations", 0) >= max(2, len(model_tiers())):
+        return END
+    missing, mismatched = failing_fields(state)
+    if not (missing or mismatched):
+        return END
+    # a cheaper tier failed the audit: escalate to the next, stronger model
+    if next_tier(state) is not None:
+        return "retry"
+    # on the strongest model a field that was read but differs from the profile is
+    # a real mismatch; asking again cannot fix it, so only retry missing fields
+    if mismatched:
+        return END
+    return "retry"
 
-# --- BUILD GRAPH (extract -> audit -> conditional loop) ---
-builder = StateGraph(BonafideState)
-builder.add_node("extract", extractor_node)
-builder.add_node("audit", auditor_node)
+# --- BUILD GRAPH (rules -> [extract] -> audit -> [retry -> audit]) ---
+def build_bonafide_app():
+    from langgraph.graph import StateGraph
 
-builder.set_entry_point("extract")
-builder.add_edge("extract", "audit")
-builder.add_conditional_edges("audit", should_continue, {"extract": "extract", END: END})
-bonafide_app = builder.compile()
+    builder = StateGraph(BonafideState)
+    builder.add_node("rules", traced_node("rules")(rule_extractor_node))
+    builder.add_node("extract", traced_node("extract")(extractor_node))
+    builder.add_node("retry", traced_node("retry")(field_retry_node))
+    builder.add_node("audit", traced_node("audit")(auditor_node))
 
-# --- RUNNER: convenience to execute graph and normalize output for frontend ---
-def run_bonafide_graph_from_text(raw_text: str, expected: Optional[Dict[str, Optional[str]]] = None):
-    final_state = bonafide_app.invoke({
-        "raw_text": raw_text,
-        "iterations": 0,
-        "expected": expected or {}
-    })
-    extracted = final_state.get("extracted_data", {}) or {}
-    checklist = final_state.get("checklist_results", {}) or {}
-    is_valid = bool(final_state.get("is_valid", False))
+    builder.set_entry_point("rules")
+    builder.add_conditional_edges("rules", route_after_rules, {"audit": "audit", "extract": "extract"})
+    builder.add_edge("extract", "audit")
+    builder.add_edge("retry", "audit")
+    builder.add_conditional_edges("audit", should_continue, {"extract": "extract", "retry": "retry", END: END})
+    return builder.compile()
+
+
+def get_bonafide_app():
+    """The compiled LangGraph app, built on first use."""
+    global _bonafide_app
+    if _bonafide_app is None:
+        with _init_lock:
+            if _bonafide_app is None:
+                _bonafide_app = build_bonafide_app()
+    return _bonafide_app
+
+def _with_match_flags(extracted: Dict, checklist: Dict[str, str]) -> Dict:
     explanation = extracted.get("explanation") if isinstance(extracted, dict) else None
     extracted = dict(extracted)
     extracted["explanation"] = explanation or ""
@@ -186,9 +419,141 @@ def run_bonafide_graph_from_text(raw_text: str, expected: Optional[Dict[str, Opt
     extracted["_name_matched"] = checklist.get("Name", "").startswith("✅")
     extracted["_roll_matched"] = checklist.get("Roll No", "").startswith("✅")
     extracted["_dept_matched"] = checklist.get("Dept", "").startswith("✅")
+    return extracted
+
+# --- RUNNER: convenience to execute graph and normalize output for frontend ---
+def initial_state(raw_text: str, expected: Optional[Dict[str, Optional[str]]] = None) -> BonafideState:
     return {
-        "extracted": extracted,
+        "raw_text": raw_text,
+        "iterations": 0,
+        "llm_calls": 0,
+        "node_calls": {},
+        "tokens": {"input": 0, "output": 0},
+        "expected": expected or {}
+    }
+
+def finish_run(final_state: Dict) -> Dict:
+    """Record run metrics/trace figures and normalize the final state for the frontend."""
+    llm_calls = final_state.get("llm_calls", 0)
+    trace = current_trace()
+    if trace is not None:
+        trace.iterations = final_state.get("iterations", 0)
+        trace.llm_calls = llm_calls
+    tokens = final_state.get("tokens") or {"input": 0, "output": 0}
+    metrics.incr("agent.runs")
+    metrics.incr("agent.llm_calls", llm_calls)
+    metrics.incr("agent.tokens_in", tokens.get("input", 0))
+    metrics.incr("agent.tokens_out", tokens.get("output", 0))
+    if llm_calls == 0:
+        metrics.incr("agent.runs_without_llm")
+    checklist = final_state.get("checklist_results", {}) or {}
+    is_valid = bool(final_state.get("is_valid", False))
+    result = {
+        "extracted": _with_match_flags(final_state.get("extracted_data", {}) or {}, checklist),
         "checklist": checklist,
         "is_valid": is_valid,
-        "iterations": final_state.get("iterations", 0)
-    }
\ No newline at end of file
+        "iterations": final_state.get("iterations", 0),
+        "llm_calls": llm_calls,
+        "source": final_state.get("source", "llm"),
+        "rule_confidence": final_state.get("rule_confidence", 0.0),
+        "node_calls": final_state.get("node_calls") or {},
+        "tokens": tokens,
+        "tier": model_tiers()[final_state.get("tier", 0)]["name"] if llm_calls else "rules",
+    }
+    if trace is not None and trace.record:
+        capture_run(final_state, result, trace.llm_responses)
+    return result
+
+def run_bonafide_graph_from_text(raw_text: str, expected: Optional[Dict[str, Optional[str]]] = None):
+    app = get_bonafide_app()
+    with trace_stage("graph"):
+        final_state = app.invoke(initial_state(raw_text, expected))
+    return finish_run(final_state)
+
+def stream_bonafide_graph(raw_text: str, expected: Optional[Dict[str, Optional[str]]] = None):
+    """
+    Like run_bonafide_graph_from_text, but yields ("node", name, update) for every
+    node as it finishes (LangGraph stream_mode="updates") and ("result", result) last.
+    """
+    app = get_bonafide_app()
+    state = dict(initial_state(raw_text, expected))
+    with trace_stage("graph"):
+        for chunk in app.stream(state, stream_mode="updates"):
+            for node, update in chunk.items():
+                state.update(update or {})
+                yield "node", node, update or {}
+    yield "result", finish_run(state)
+
+def reaudit_result(result: Dict, expected: Optional[Dict[str, Optional[str]]] = None) -> Dict:
+    """
+    Re-run only the auditor (no LLM) on a previous run's extracted fields against
+    new expected details, e.g. when a /bonafide/check/ result is reused on submit.
+    """
+    extracted = {k: v for k, v in (result.get("extracted") or {}).items() if not k.startswith("_")}
+    audit = auditor_node({"extracted_data": extracted, "expected": expected or {}})
+    checklist = audit["checklist_results"]
+    return {
+        **result,
+        "extracted": _with_match_flags(extracted, checklist),
+        "checklist": checklist,
+        "is_valid": bool(audit["is_valid"]),
+    }
+
+def llm_free_stats() -> Dict[str, float]:
+    """Fraction of agent runs that were served by the rule extractor alone."""
+    counters = metrics.get_counters("agent.runs", "agent.runs_without_llm")
+    runs, without_llm = counters["agent.runs"], counters["agent.runs_without_llm"]
+    return {
+        "runs": runs,
+        "runs_without_llm": without_llm,
+        "llm_free_fraction": without_llm / runs if runs else 0.0,
+    }
+
+def llm_usage_stats() -> Dict[str, float]:
+    """Per-node call counts and average LLM calls/tokens per agent run."""
+    nodes = ("rules", "extract", "retry", "audit")
+    counters = metrics.get_counters(
+        "agent.runs", "agent.llm_calls", "agent.tokens_in", "agent.tokens_out",
+        *(f"agent.node.{n}" for n in nodes)
+    )
+    runs = counters["agent.runs"] or 0
+
+    def per_run(key):
+        return counters[key] / runs if runs else 0.0
+
+    return {
+        "runs": runs,
+        "node_calls": {n: counters[f"agent.node.{n}"] for n in nodes},
+        "llm_calls_per_run": per_run("agent.llm_calls"),
+        "input_tokens_per_run": per_run("agent.tokens_in"),
+        "output_tokens_per_run": per_run("agent.tokens_out"),
+    }
+
+def tier_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-tier hit rate (share of calls whose extraction then verified), average latency
+    and tokens. "rules" is the LLM-free rule extractor in front of the model tiers.
+    """
+    names = [t["name"] for t in model_tiers()]
+    fields = ("calls", "resolved", "ms", "tokens_in", "tokens_out")
+    counters = metrics.get_counters(
+        "agent.node.rules", "agent.runs_without_llm",
+        *(f"agent.tier.{n}.{f}" for n in names for f in fields)
+    )
+    rules_calls = counters["agent.node.rules"]
+    stats = {
+        "rules": {
+            "calls": rules_calls,
+            "hit_rate": counters["agent.runs_without_llm"] / rules_calls if rules_calls else 0.0,
+        }
+    }
+    for n in names:
+        calls = counters[f"agent.tier.{n}.calls"]
+        stats[n] = {
+            "calls": calls,
+            "hit_rate": counters[f"agent.tier.{n}.resolved"] / calls if calls else 0.0,
+            "avg_ms": counters[f"agent.tier.{n}.ms"] / calls if calls else 0.0,
+            "input_tokens_per_call": counters[f"agent.tier.{n}.tokens_in"] / calls if calls else 0.0,
+            "output_tokens_per_call": counters[f"agent.tier.{n}.tokens_out"] / calls if calls else 0.0,
+        }
+    return stats
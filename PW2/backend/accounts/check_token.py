@@ -0,0 +1,34 @@
+"""
+Signed, short-lived tokens that let /bonafide/submit/ reuse the agent result
+computed by /bonafide/check/ for the same file instead of running the graph twice.
+
+The token carries the sha256 of the checked PDF and the agent output; it is
+signed with SECRET_KEY so clients cannot forge or edit the stored result.
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+
+SALT = "accounts.bonafide-check"
+# only what submit needs to persist; keeps the token small
+RESULT_KEYS = ("extracted", "checklist", "is_valid", "iterations", "llm_calls", "source", "tier")
+
+
+def make_check_token(digest: str, result: dict) -> str:
+    payload = {"h": digest, "r": {k: result.get(k) for k in RESULT_KEYS if k in result}}
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def load_check_token(token: Optional[str], digest: str) -> Optional[dict]:
+    """The stored agent result, or None if the token is missing, expired, tampered with or for another file."""
+    if not token:
+        return None
+    max_age = int(getattr(settings, "BONAFIDE_CHECK_TOKEN_MAX_AGE", 15 * 60))
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=max_age)
+    except signing.BadSignature:  # includes SignatureExpired
+        return None
+    if not isinstance(payload, dict) or payload.get("h") != digest:
+        return None
+    return payload.get("r") or None
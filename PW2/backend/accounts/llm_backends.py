@@ -0,0 +1,192 @@
+"""
+LLM backends for the bonafide agent, selected by settings.BONAFIDE_LLM_BACKEND.
+
+A backend is a factory returning a LangChain-style chat model: anything with
+with_structured_output(schema, include_raw=...).invoke(prompt). Factories may
+take no arguments; a tier's model name is only passed to those accepting a
+``model`` keyword (or **kwargs).
+Built-in names:
+
+  "gemini"  ChatGoogleGenerativeAI (BONAFIDE_LLM_MODEL, GOOGLE_API_KEY)
+  "fake"    FakeBonafideLLM, a deterministic local model for load tests and
+            development without Gemini quota
+
+Any other value is treated as a dotted path to a factory.
+
+BONAFIDE_MODEL_TIERS lists the models the extractor escalates through, cheapest
+first; each tier is {"name", "model", optional "backend"} (see tier_specs()).
+"""
+import hashlib
+import inspect
+import random
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .pdf_text import CHARS_PER_TOKEN
+
+
+class FakeLLMError(RuntimeError):
+    """Injected failure raised by FakeBonafideLLM (see BONAFIDE_FAKE_LLM_FAILURE_RATE)."""
+
+
+_TEXT_SECTION = re.compile(r"Text:\n\n(?P<text>.*?)(?:\n\nNOTE:|\Z)", re.S)
+_RETRY_FIELDS = re.compile(r"extract only these fields: (?P<fields>[a-z_, ]+)\.")
+
+
+class _FakeRaw:
+    def __init__(self, usage_metadata: Dict[str, int]):
+        self.usage_metadata = usage_metadata
+
+
+class _FakeStructured:
+    def __init__(self, llm: "FakeBonafideLLM", schema, include_raw: bool):
+        self.llm = llm
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def invoke(self, prompt: str):
+        parsed, usage = self.llm.respond(self.schema, prompt)
+        if self.include_raw:
+            return {"parsed": parsed, "raw": _FakeRaw(usage), "parsing_error": None}
+        return parsed
+
+
+class FakeBonafideLLM:
+    """
+    Reads the letter text out of the prompt and fills the schema with the
+    rule-based extractor, so the same prompt always yields the same answer.
+    Latency is latency_ms +/- jitter_ms; failure_rate is the fraction of calls
+    raising FakeLLMError. Both are drawn from a RNG seeded by (seed, prompt),
+    so a given prompt is slow or failing on every run.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.seed = seed
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return _FakeStructured(self, schema, include_raw)
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def respond(self, schema, prompt: str):
+        from .bonafide_agent import rule_extract
+
+        rng = self._rng(prompt)
+        delay = self.latency_ms + (rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if self.failure_rate and rng.random() < self.failure_rate:
+            raise FakeLLMError("fake LLM: injected failure")
+
+        m = _TEXT_SECTION.search(prompt)
+        text = m.group("text") if m else prompt
+        extracted, _ = rule_extract(text)
+        retry = _RETRY_FIELDS.search(prompt)
+        if retry:
+            wanted = {f.strip() for f in retry.group("fields").split(",")}
+            extracted = {k: (v if k in wanted else None) for k, v in extracted.items()}
+        extracted["explanation"] = "Fields read by the local fake model."
+        parsed = schema(**{k: v for k, v in extracted.items() if k in schema.model_fields})
+        usage = {
+            "input_tokens": len(prompt) // CHARS_PER_TOKEN,
+            "output_tokens": len(parsed.model_dump_json()) // CHARS_PER_TOKEN,
+        }
+        return parsed, usage
+
+
+class RecordedLLM:
+    """
+    Replays recorded structured responses (replay corpus "llm_responses") in call
+    order, whatever the prompt. Calls beyond the recording get an empty answer
+    and are counted in .unrecorded_calls.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses or [])
+        self.unrecorded_calls = 0
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return _FakeStructured(self, schema, include_raw)
+
+    def respond(self, schema, prompt: str):
+        if not self.responses:
+            self.unrecorded_calls += 1
+            return schema(), {}
+        recorded = self.responses.pop(0)
+        fields = recorded.get("fields") or {}
+        parsed = schema(**{k: v for k, v in fields.items() if k in schema.model_fields})
+        return parsed, dict(recorded.get("usage") or {})
+
+
+def build_gemini(model: Optional[str] = None):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    kwargs = {
+        "model": model or getattr(settings, "BONAFIDE_LLM_MODEL", "gemini-2.5-flash"),
+        "temperature": 0,
+        "timeout": float(getattr(settings, "BONAFIDE_LLM_TIMEOUT", 30)),
+        "max_retries": int(getattr(settings, "BONAFIDE_LLM_MAX_RETRIES", 2)),
+    }
+    api_key = getattr(settings, "GOOGLE_API_KEY", None)
+    if api_key:
+        kwargs["google_api_key"] = api_key
+    return ChatGoogleGenerativeAI(**kwargs)
+
+
+def build_fake(model: Optional[str] = None):
+    return FakeBonafideLLM(
+        latency_ms=float(getattr(settings, "BONAFIDE_FAKE_LLM_LATENCY_MS", 0)),
+        jitter_ms=float(getattr(settings, "BONAFIDE_FAKE_LLM_JITTER_MS", 0)),
+        failure_rate=float(getattr(settings, "BONAFIDE_FAKE_LLM_FAILURE_RATE", 0.0)),
+        seed=int(getattr(settings, "BONAFIDE_FAKE_LLM_SEED", 0)),
+    )
+
+
+LLM_BACKENDS: Dict[str, Callable] = {
+    "gemini": build_gemini,
+    "fake": build_fake,
+}
+
+
+def build_llm(backend: Optional[str] = None, model: Optional[str] = None):
+    backend = backend or getattr(settings, "BONAFIDE_LLM_BACKEND", "gemini")
+    factory = LLM_BACKENDS.get(backend)
+    if factory is None:
+        factory = import_string(backend)
+    return factory(model=model) if model and _accepts_model(factory) else factory()
+
+
+def _accepts_model(factory) -> bool:
+    try:
+        params = inspect.signature(factory).parameters.values()
+    except (TypeError, ValueError):
+        return True  # builtins/C callables: assume the documented keyword
+    return any(p.name == "model" or p.kind is p.VAR_KEYWORD for p in params)
+
+
+def tier_specs() -> List[Dict[str, Optional[str]]]:
+    """
+    The configured LLM tiers, cheapest first. Without BONAFIDE_MODEL_TIERS there is a
+    single tier using BONAFIDE_LLM_MODEL on BONAFIDE_LLM_BACKEND.
+    """
+    tiers = getattr(settings, "BONAFIDE_MODEL_TIERS", None) or [
+        {"name": "default", "model": getattr(settings, "BONAFIDE_LLM_MODEL", "gemini-2.5-flash")}
+    ]
+    return [
+        {
+            "name": tier.get("name") or tier.get("model") or f"tier{i}",
+            "model": tier.get("model"),
+            "backend": tier.get("backend"),
+        }
+        for i, tier in enumerate(tiers)
+    ]
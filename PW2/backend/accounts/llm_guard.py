@@ -0,0 +1,176 @@
+"""
+Process-wide admission control around LLM calls.
+
+At most BONAFIDE_LLM_MAX_CONCURRENCY calls run at once. Up to
+BONAFIDE_LLM_MAX_WAITING more callers wait (each for at most
+BONAFIDE_LLM_ACQUIRE_TIMEOUT seconds) for a slot. Anyone beyond that is
+rejected immediately. A circuit breaker opens after
+BONAFIDE_LLM_BREAKER_THRESHOLD consecutive failures. While it is open every
+call fails fast, until BONAFIDE_LLM_BREAKER_RESET seconds have passed; then a
+single trial call is let through (half-open), and its outcome closes or
+re-opens the breaker.
+
+Rejections raise LLMUnavailable. The check view turns that into a 503 and the
+submit worker marks the request 'deferred' for run_agent_queue to retry.
+The per-request timeout itself is enforced by the client (BONAFIDE_LLM_TIMEOUT,
+see accounts/llm_backends.py).
+"""
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from django.conf import settings
+
+from . import metrics
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LLMUnavailable(Exception):
+    """The LLM call was not attempted: breaker open, wait queue full or no slot in time."""
+
+    def __init__(self, reason: str, retry_after: Optional[float] = None):
+        super().__init__(f"LLM unavailable ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LLMGuard:
+    def __init__(self, max_concurrency: int = 4, max_waiting: int = 16, acquire_timeout: float = 10.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.acquire_timeout = acquire_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    # --- circuit breaker ---
+    def _admit(self) -> bool:
+        """Raise if the breaker rejects the call; True when this call is the half-open trial."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise LLMUnavailable("circuit_open", retry_after=remaining)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    raise LLMUnavailable("circuit_open", retry_after=self.reset_timeout)
+                self._trial_running = True
+                return True
+            return False
+
+    def _record(self, ok: bool, trial: bool) -> None:
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if ok:
+                self.consecutive_failures = 0
+                self.state = CLOSED
+                return
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    metrics.incr("llm_guard.trips")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == OPEN and time.monotonic() < self.opened_at + self.reset_timeout
+
+    # --- concurrency limit ---
+    def _acquire(self) -> None:
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            if self.waiting >= self.max_waiting:
+                raise LLMUnavailable("queue_full", retry_after=self.acquire_timeout)
+            self.waiting += 1
+        try:
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                raise LLMUnavailable("queue_timeout", retry_after=self.acquire_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def call(self, fn: Callable[[], T]) -> T:
+        try:
+            trial = self._admit()
+            try:
+                self._acquire()
+            except LLMUnavailable:
+                if trial:
+                    with self._lock:
+                        self._trial_running = False
+                raise
+        except LLMUnavailable as exc:
+            metrics.incr(f"llm_guard.rejected.{exc.reason}")
+            raise
+
+        with self._lock:
+            self.in_flight += 1
+        metrics.incr("llm_guard.calls")
+        try:
+            result = fn()
+        except Exception:
+            metrics.incr("llm_guard.failures")
+            self._record(False, trial)
+            raise
+        else:
+            self._record(True, trial)
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_waiting": self.max_waiting,
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+_guard: Optional[LLMGuard] = None
+_guard_lock = threading.Lock()
+
+
+def get_guard() -> LLMGuard:
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = LLMGuard(
+                    max_concurrency=int(getattr(settings, "BONAFIDE_LLM_MAX_CONCURRENCY", 4)),
+                    max_waiting=int(getattr(settings, "BONAFIDE_LLM_MAX_WAITING", 16)),
+                    acquire_timeout=float(getattr(settings, "BONAFIDE_LLM_ACQUIRE_TIMEOUT", 10)),
+                    failure_threshold=int(getattr(settings, "BONAFIDE_LLM_BREAKER_THRESHOLD", 5)),
+                    reset_timeout=float(getattr(settings, "BONAFIDE_LLM_BREAKER_RESET", 30)),
+                )
+    return _guard
+
+
+def guard_stats() -> dict:
+    """This process's breaker state and queue depth, plus the shared rejection counters."""
+    names = ("calls", "failures", "trips", "rejected.circuit_open", "rejected.queue_full", "rejected.queue_timeout")
+    counters = metrics.get_counters(*(f"llm_guard.{n}" for n in names))
+    return {
+        **get_guard().stats(),
+        **{n.replace(".", "_"): counters.get(f"llm_guard.{n}", 0) for n in names},
+    }
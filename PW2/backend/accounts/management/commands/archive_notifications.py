@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import Notification
+from accounts.notifications import archive_read, open_archive_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Move read notifications older than the retention period out of the Notification table, "
+        "in short batches, into the NotificationArchive table and/or a gzip JSON-lines file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="Archive read notifications older than N days (default: NOTIFICATION_RETENTION_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Rows per transaction (default: NOTIFICATION_ARCHIVE_BATCH_SIZE).")
+        parser.add_argument("--file", help="Also append the rows to this gzip JSON-lines file. Each batch is "
+                                           "synced to disk before it is deleted; a rerun after a crash may "
+                                           "repeat rows (at-least-once), so deduplicate by id.")
+        parser.add_argument("--no-table", action="store_true",
+                            help="Don't copy rows into NotificationArchive; requires --file.")
+        parser.add_argument("--purge", action="store_true",
+                            help="Delete the rows without keeping any copy (no table, no file).")
+        parser.add_argument("--limit", type=int, default=None, help="Archive at most N rows in this run.")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be archived.")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else getattr(settings, "NOTIFICATION_RETENTION_DAYS", 90)
+        if days < 0:
+            raise CommandError("--days must be zero or more.")
+        if options["purge"] and (options["file"] or options["no_table"]):
+            raise CommandError("--purge keeps no copy; don't combine it with --file or --no-table.")
+        if options["no_table"] and not options["file"]:
+            raise CommandError("--no-table needs --file, or the rows would be lost; use --purge to delete them.")
+        to_table = not (options["no_table"] or options["purge"])
+        if options["dry_run"]:
+            cutoff = timezone.now() - timedelta(days=days)
+            n = Notification.objects.filter(unread=False, created_at__lt=cutoff).count()
+            self.stdout.write(f"{n} read notification(s) older than {days} day(s) would be archived.")
+            return
+
+        stream = open_archive_file(options["file"]) if options["file"] else None
+        try:
+            moved = archive_read(
+                days=days,
+                batch_size=options["batch_size"],
+                to_table=to_table,
+                stream=stream,
+                pause=options["pause"],
+                limit=options["limit"],
+                progress=lambda n: self.stdout.write(f"  {n} archived", ending="\r") if options["verbosity"] > 1 else None,
+            )
+        finally:
+            if stream is not None:
+                stream.close()
+        where = " and ".join(filter(None, ["NotificationArchive" if to_table else "", options["file"]]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} read notification(s) older than {days} day(s)" + (f" to {where}." if where else " (deleted).")
+        ))
@@ -0,0 +1,133 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import bonafide_agent, metrics
+from accounts.agent_trace import percentiles, trace_run
+from accounts.llm_backends import FakeBonafideLLM, RecordedLLM
+from accounts.replay_corpus import CORPUS_VERSION, SCORED_FIELDS, corpus_dir, corpus_root, field_matches, load_corpus
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the captured bonafide corpus through the agent graph with recorded or fake LLM "
+        "responses, report field accuracy, retry rate and per-stage latency, and fail on "
+        "regressions against the stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", help="Corpus root (default: BONAFIDE_CORPUS_DIR).")
+        parser.add_argument("--corpus-version", type=int, default=CORPUS_VERSION, help="Corpus version to replay.")
+        parser.add_argument("--mode", choices=("recorded", "fake"), default="recorded",
+                            help="Answer LLM calls from the recording or from the local fake model.")
+        parser.add_argument("--limit", type=int, default=None, help="Replay at most N records.")
+        parser.add_argument("--baseline", help="Baseline JSON (default: <corpus>/v<version>/baseline-<mode>.json).")
+        parser.add_argument("--write-baseline", action="store_true", help="Store this run as the new baseline.")
+        parser.add_argument("--max-accuracy-drop", type=float, default=0.02,
+                            help="Allowed drop of any field accuracy / validity agreement (absolute).")
+        parser.add_argument("--max-retry-increase", type=float, default=0.05,
+                            help="Allowed increase of the retry rate (absolute).")
+        parser.add_argument("--max-latency-increase", type=float, default=0.25,
+                            help="Allowed relative increase of p95 graph latency.")
+        parser.add_argument("--latency-slack-ms", type=float, default=2.0,
+                            help="Latency increases below this many ms are never a regression.")
+
+    def handle(self, *args, **options):
+        root = Path(options["corpus"]) if options["corpus"] else corpus_root()
+        if root is None:
+            raise CommandError("No corpus: pass --corpus or set BONAFIDE_CORPUS_DIR.")
+        version_dir = corpus_dir(root, options["corpus_version"])
+        records = list(load_corpus(root, options["corpus_version"], options["limit"]))
+        if not records:
+            raise CommandError(f"No records in {version_dir}.")
+
+        report = self.replay(records, options["mode"])
+        self.print_report(report)
+
+        baseline_path = Path(options["baseline"] or version_dir / f"baseline-{options['mode']}.json")
+        if options["write_baseline"]:
+            baseline_path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}; run with --write-baseline to create one."))
+            return
+
+        regressions = self.compare(json.loads(baseline_path.read_text()), report, options)
+        if regressions:
+            raise CommandError("Regressions against baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
+
+    def replay(self, records, mode):
+        field_hits = {f: 0 for f in SCORED_FIELDS}
+        validity_agree = retried = llm_calls = unrecorded = 0
+        graph_ms, node_ms = [], {}
+        # count under "replay:" so replays don't inflate the live /bonafide/agent-stats/ figures
+        with metrics.namespace("replay"):
+            try:
+                for record in records:
+                    llm = RecordedLLM(record.get("llm_responses")) if mode == "recorded" else FakeBonafideLLM()
+                    bonafide_agent.reset_llms(llm)
+                    with trace_run("replay", record=False) as trace:
+                        result = bonafide_agent.run_bonafide_graph_from_text(record["raw_text"], record.get("expected") or {})
+                    for field, ok in field_matches(record, result.get("extracted") or {}).items():
+                        field_hits[field] += ok
+                    validity_agree += bool(result.get("is_valid")) == bool(record.get("is_valid"))
+                    retried += bool((result.get("node_calls") or {}).get("retry"))
+                    llm_calls += result.get("llm_calls", 0)
+                    unrecorded += getattr(llm, "unrecorded_calls", 0)
+                    graph_ms.append(trace.stages.get("graph", 0.0))
+                    for node, ms, *_ in trace.nodes:
+                        node_ms.setdefault(node, []).append(ms)
+            finally:
+                bonafide_agent.reset_llms()
+
+        n = len(records)
+        return {
+            "version": 1,
+            "mode": mode,
+            "records": n,
+            "field_accuracy": {f: hits / n for f, hits in field_hits.items()},
+            "validity_agreement": validity_agree / n,
+            "retry_rate": retried / n,
+            "llm_calls_per_run": llm_calls / n,
+            "unrecorded_llm_calls": unrecorded,
+            "latency_ms": {
+                "graph": percentiles(graph_ms),
+                "nodes": {node: percentiles(ms) for node, ms in node_ms.items()},
+            },
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f"Replayed {report['records']} records ({report['mode']} LLM responses)")
+        for field, acc in report["field_accuracy"].items():
+            self.stdout.write(f"  {field:<16} {acc:7.1%}")
+        self.stdout.write(f"  {'validity':<16} {report['validity_agreement']:7.1%}")
+        self.stdout.write(f"  retry rate {report['retry_rate']:.1%}, LLM calls/run {report['llm_calls_per_run']:.2f}, "
+                          f"unrecorded LLM calls {report['unrecorded_llm_calls']}")
+        graph = report["latency_ms"]["graph"]
+        self.stdout.write(f"  graph ms  p50 {graph['p50']}  p95 {graph['p95']}  p99 {graph['p99']}")
+        for node, p in report["latency_ms"]["nodes"].items():
+            self.stdout.write(f"    {node:<8} p50 {p['p50']}  p95 {p['p95']}")
+
+    def compare(self, baseline, report, options):
+        regressions = []
+        drop = options["max_accuracy_drop"]
+        for field, acc in report["field_accuracy"].items():
+            before = baseline.get("field_accuracy", {}).get(field)
+            if before is not None and before - acc > drop:
+                regressions.append(f"{field} accuracy {before:.1%} -> {acc:.1%}")
+        before = baseline.get("validity_agreement")
+        if before is not None and before - report["validity_agreement"] > drop:
+            regressions.append(f"validity agreement {before:.1%} -> {report['validity_agreement']:.1%}")
+        before = baseline.get("retry_rate")
+        if before is not None and report["retry_rate"] - before > options["max_retry_increase"]:
+            regressions.append(f"retry rate {before:.1%} -> {report['retry_rate']:.1%}")
+        before = (baseline.get("latency_ms") or {}).get("graph", {}).get("p95")
+        after = report["latency_ms"]["graph"]["p95"]
+        if before is not None and after is not None:
+            limit = max(before * (1 + options["max_latency_increase"]), before + options["latency_slack_ms"])
+            if after > limit:
+                regressions.append(f"p95 graph latency {before} ms -> {after} ms")
+        return regressions
@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.agent_worker import process_bonafide
+from accounts.llm_guard import get_guard
+from accounts.models import BonafideRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the bonafide agent for requests still queued (e.g. after a worker restart) "
+        "or deferred while the LLM circuit breaker was open. Nothing else recovers these "
+        "rows: schedule this command (cron) or keep it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Maximum number of requests to process per sweep.")
+        parser.add_argument(
+            "--retry-failed", action="store_true",
+            help="Also re-queue requests whose previous agent run failed.",
+        )
+        parser.add_argument(
+            "--stale-minutes", type=int, default=None,
+            help="Re-queue 'running' requests claimed by a worker more than N minutes ago (the worker died). "
+                 "Default: BONAFIDE_AGENT_STALE_MINUTES; 0 disables.",
+        )
+        parser.add_argument(
+            "--every", type=int, default=0,
+            help="Keep running and sweep every N seconds instead of exiting after one sweep.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stale_minutes"] is None:
+            options["stale_minutes"] = int(getattr(settings, "BONAFIDE_AGENT_STALE_MINUTES", 15))
+        while True:
+            self.sweep(options)
+            if not options["every"]:
+                return
+            close_old_connections()
+            time.sleep(options["every"])
+
+    def sweep(self, options):
+        BonafideRequest.objects.filter(agent_status="deferred").update(agent_status="queued")
+        if options["retry_failed"]:
+            BonafideRequest.objects.filter(agent_status="failed").update(agent_status="queued")
+        if options["stale_minutes"]:
+            cutoff = timezone.now() - timedelta(minutes=options["stale_minutes"])
+            # rows claimed before agent_claimed_at existed fall back to their age
+            BonafideRequest.objects.filter(agent_status="running").filter(
+                Q(agent_claimed_at__lt=cutoff) | Q(agent_claimed_at__isnull=True, created_at__lt=cutoff)
+            ).update(agent_status="queued")
+
+        ids = list(
+            BonafideRequest.objects.filter(agent_status="queued")
+            .order_by("created_at")
+            .values_list("id", flat=True)[: options["limit"]]
+        )
+        processed = 0
+        for pk in ids:
+            if get_guard().is_open():
+                # LLM still unavailable: leave the rest queued for the next run
+                break
+            processed += 1 if process_bonafide(pk) else 0
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} of {len(ids)} queued bonafide requests."))
@@ -0,0 +1,46 @@
+"""
+Small counter helpers for the bonafide agent pipeline.
+
+Counters live in the configured Django cache so they are shared between
+workers whenever a shared cache backend (redis/memcached) is configured.
+Code running inside namespace("...") (e.g. replay_bonafide_corpus) counts
+under its own keys, so it never shows up in the live stats.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+COUNTER_PREFIX = "bonafide_metrics:"
+
+_namespace: ContextVar[str] = ContextVar("metrics_namespace", default="")
+
+
+@contextmanager
+def namespace(name: str):
+    token = _namespace.set(f"{name}:")
+    try:
+        yield
+    finally:
+        _namespace.reset(token)
+
+
+def _key(name: str) -> str:
+    return COUNTER_PREFIX + _namespace.get() + name
+
+
+def incr(name: str, amount: int = 1) -> None:
+    key = _key(name)
+    # add() only succeeds for a missing key, so the first writer seeds the value
+    if cache.add(key, amount, timeout=None):
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # key expired/evicted between add() and incr()
+        cache.set(key, amount, timeout=None)
+
+
+def get_counters(*names: str) -> dict:
+    values = cache.get_many([_key(n) for n in names])
+    return {n: values.get(_key(n), 0) for n in names}
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_agentresultcache'),
+    ]
+
+    operations = [
+        # existing rows already ran the agent synchronously, so backfill them as 'done'
+        migrations.AddField(
+            model_name='bonafiderequest',
+            name='agent_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='bonafiderequest',
+            name='agent_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16),
+        ),
+    ]
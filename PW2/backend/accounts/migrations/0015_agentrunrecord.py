@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_bonafiderequest_agent_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentRunRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('total_ms', models.FloatField()),
+                ('pdf_ms', models.FloatField(blank=True, null=True)),
+                ('graph_ms', models.FloatField(blank=True, null=True)),
+                ('iterations', models.PositiveSmallIntegerField(default=0)),
+                ('llm_calls', models.PositiveSmallIntegerField(default=0)),
+                ('input_tokens', models.PositiveIntegerField(default=0)),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('error_type', models.CharField(blank=True, max_length=64)),
+                ('nodes', models.JSONField(default=list)),
+                ('bonafide', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='agent_runs', to='accounts.bonafiderequest')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
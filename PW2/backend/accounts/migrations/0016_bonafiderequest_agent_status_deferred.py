@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_agentrunrecord'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bonafiderequest',
+            name='agent_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('deferred', 'Deferred')], db_index=True, default='queued', max_length=16),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_student_class(apps, schema_editor):
+    BonafideRequest = apps.get_model('accounts', 'BonafideRequest')
+    StudentProfile = apps.get_model('accounts', 'StudentProfile')
+    BonafideRequest.objects.update(student_class=Subquery(
+        StudentProfile.objects.filter(user_id=OuterRef('student_id')).values('student_class_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_bonafiderequest_agent_status_deferred'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bonafiderequest',
+            name='student_class',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bonafide_requests', to='accounts.studentclass'),
+        ),
+        migrations.RunPython(backfill_student_class, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bonafiderequest',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='bonafide_student_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bonafiderequest',
+            index=models.Index(fields=['student_class', 'status', '-created_at', '-id'], name='bonafide_class_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bonafiderequest',
+            index=models.Index(fields=['student_class', '-created_at', '-id'], name='bonafide_class_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notification_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('unread', True)), fields=['recipient', '-created_at', '-id'], name='notification_unread_idx'),
+        ),
+    ]
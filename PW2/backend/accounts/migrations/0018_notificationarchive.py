@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_bonafide_student_class_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.BigIntegerField(unique=True)),
+                ('recipient_id', models.BigIntegerField()),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('verb', models.CharField(max_length=128)),
+                ('message', models.TextField(blank=True)),
+                ('target_bonafide_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient_id', '-created_at'], name='notification_archive_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_notificationarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bonafiderequest',
+            name='agent_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -56,8 +56,19 @@ class BonafideRequest(models.Model):
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
     )
+    AGENT_STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('deferred', 'Deferred'),  # LLM unavailable (circuit breaker open); retried by run_agent_queue
+    )
 
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bonafide_requests')
+    # the student's class when the request was filed; fixed afterwards so a request stays with the
+    # staff who handle it. Inboxes, history, detail and actions all route on it (indexes below)
+    student_class = models.ForeignKey(StudentClass, null=True, blank=True, on_delete=models.SET_NULL,
+                                      related_name='bonafide_requests', db_index=False)
     student_name = models.CharField(max_length=255, blank=True)
     roll_number = models.CharField(max_length=128, blank=True)
     contact = models.CharField(max_length=64, blank=True)
@@ -69,12 +80,26 @@ class BonafideRequest(models.Model):
     checklist = models.JSONField(null=True, blank=True)
     is_valid = models.BooleanField(default=False)
     explanation = models.TextField(blank=True)
+    # state of the background agent run (accounts/agent_worker.py), separate from the approval status
+    agent_status = models.CharField(max_length=16, choices=AGENT_STATUS_CHOICES, default='queued', db_index=True)
+    # when a worker last claimed the row ('running'); run_agent_queue --stale-minutes measures from here
+    agent_claimed_at = models.DateTimeField(null=True, blank=True)
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        # each index matches one list query shape, with the keyset order (accounts/pagination.py) last
+        indexes = [
+            # student's own list (/bonafide/mine/)
+            models.Index(fields=['student', '-created_at', '-id'], name='bonafide_student_keyset_idx'),
+            # tutor / PC / HoD inbox: one status of a class (HoD: of each class of the department), newest first
+            models.Index(fields=['student_class', 'status', '-created_at', '-id'], name='bonafide_class_status_idx'),
+            # history: a class's requests newest first; the status exclusion is checked on the walk, which
+            # stops after one page (a partial index on NOT IN isn't matched by SQLite's planner)
+            models.Index(fields=['student_class', '-created_at', '-id'], name='bonafide_class_history_idx'),
+        ]
 
     def __str__(self):
         return f"Bonafide({self.student.username}) - {self.status}"
@@ -90,6 +115,75 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pagination of a user's notifications (accounts/pagination.py)
+            models.Index(fields=["recipient", "-created_at", "-id"], name="notification_keyset_idx"),
+            # unread notifications of a user (bell badge, mark-all-read)
+            models.Index(fields=["recipient", "-created_at", "-id"], condition=models.Q(unread=True),
+                         name="notification_unread_idx"),
+        ]
 
     def __str__(self):
         return f"Notification to {self.recipient} - {self.verb}"
+
+class NotificationArchive(models.Model):
+    """
+    Read notifications moved out of Notification by `manage.py archive_notifications`.
+    Ids are kept as plain integers (no foreign keys, no unread flag) so archived rows
+    cost no constraint checks and survive deletion of the users/requests they name.
+    """
+    notification_id = models.BigIntegerField(unique=True)
+    recipient_id = models.BigIntegerField()
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    verb = models.CharField(max_length=128)
+    message = models.TextField(blank=True)
+    target_bonafide_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["recipient_id", "-created_at"], name="notification_archive_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived notification {self.notification_id} - {self.verb}"
+
+class AgentResultCache(models.Model):
+    """
+    Memoised output of run_bonafide_graph_from_text, keyed by the SHA-256 of the
+    uploaded PDF bytes plus the expected student details (see accounts/agent_cache.py).
+    """
+    key = models.CharField(max_length=64, unique=True)
+    result = models.JSONField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"AgentResultCache({self.key[:12]}) - {self.hit_count} hits"
+
+class AgentRunRecord(models.Model):
+    """
+    Compact timing/usage record for one agent run (see accounts/agent_trace.py).
+    nodes holds one [node, ms, input_tokens, output_tokens, error_type] entry per node invocation.
+    """
+    bonafide = models.ForeignKey(BonafideRequest, null=True, blank=True, on_delete=models.SET_NULL, related_name='agent_runs')
+    endpoint = models.CharField(max_length=16)  # "check" or "submit"
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    total_ms = models.FloatField()
+    pdf_ms = models.FloatField(null=True, blank=True)
+    graph_ms = models.FloatField(null=True, blank=True)
+    iterations = models.PositiveSmallIntegerField(default=0)
+    llm_calls = models.PositiveSmallIntegerField(default=0)
+    input_tokens = models.PositiveIntegerField(default=0)
+    output_tokens = models.PositiveIntegerField(default=0)
+    cache_hit = models.BooleanField(default=False)
+    error_type = models.CharField(max_length=64, blank=True)
+    nodes = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"AgentRun({self.endpoint}) - {self.total_ms:.0f} ms"
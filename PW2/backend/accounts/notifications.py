@@ -0,0 +1,242 @@
+"""
+Notification fan-out.
+
+notify_many() resolves the recipients of one event to user ids, builds the
+Notification rows and inserts them with a single bulk_create inside one
+transaction, instead of one autocommitted INSERT per recipient. The insert
+runs according to NOTIFICATION_FANOUT_MODE (or the mode argument):
+
+- "inline"     insert now (inside the caller's transaction, if any)
+- "on_commit"  insert after the caller's transaction commits (right away under autocommit)
+- "worker"     insert on a background thread, so the request doesn't wait for it
+
+Recipient resolvers (tutors_for, coordinators_for, hods_for) return user
+querysets; notify_many only reads their ids.
+
+Unread counts are cached per user (unread_count). A miss counts once through the
+partial notification_unread_idx index. The counts are only shared between
+processes when a shared cache is configured (CACHE_URL in settings). Later inserts here and mark_read()
+adjust the cached value in place, and NOTIFICATION_UNREAD_TTL bounds any drift
+from writes that bypass this module.
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from . import metrics, push
+from .models import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notify")
+    return _executor
+
+
+def tutors_for(student_class) -> QuerySet:
+    return get_user_model().objects.filter(
+        staff_profile__student_class=student_class, staff_profile__designation__icontains="TUTOR"
+    )
+
+
+def coordinators_for(student_class) -> QuerySet:
+    return get_user_model().objects.filter(staff_profile__student_class=student_class).filter(
+        Q(staff_profile__designation__icontains="PROGRAM_COORDINATOR") | Q(staff_profile__designation__icontains="PC")
+    )
+
+
+def hods_for(department_id) -> QuerySet:
+    return get_user_model().objects.filter(
+        staff_profile__hod_department_id=department_id, staff_profile__designation__icontains="HOD"
+    )
+
+
+def _recipient_ids(recipients) -> List[int]:
+    if isinstance(recipients, QuerySet):
+        return list(recipients.values_list("pk", flat=True).distinct())
+    # ordered de-duplication: the same user may be reached through two roles
+    return list(dict.fromkeys(getattr(r, "pk", r) for r in recipients if r is not None))
+
+
+def _unread_key(user_id) -> str:
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user) -> int:
+    key = _unread_key(getattr(user, "pk", user))
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient=user, unread=True).count()
+        # add(), not set(): an incr() that landed while we counted must not be overwritten
+        if not cache.add(key, count, timeout=getattr(settings, "NOTIFICATION_UNREAD_TTL", 300)):
+            count = cache.get(key, count)
+    return max(0, count)
+
+
+def _adjust_unread(user_ids, delta: int) -> None:
+    # only adjust counters that are cached; a missing one is recounted on the next read
+    for user_id in user_ids:
+        try:
+            cache.incr(_unread_key(user_id), delta)
+        except ValueError:
+            pass
+
+
+def mark_read(user, ids=None, before=None) -> int:
+    """
+    Mark the user's unread notifications read in one UPDATE: all of them, those
+    with the given ids, and/or those created at or before `before`. Returns the
+    number of rows changed.
+    """
+    qs = Notification.objects.filter(recipient=user, unread=True)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    if before is not None:
+        qs = qs.filter(created_at__lte=before)
+    updated = qs.update(unread=False)
+    if updated:
+        _adjust_unread([getattr(user, "pk", user)], -updated)
+    return updated
+
+
+def _insert(rows: List[Notification]) -> None:
+    try:
+        # one transaction for every batch (a savepoint when the caller already has one)
+        with transaction.atomic():
+            Notification.objects.bulk_create(rows)
+            push.publish_notifications(rows)
+        metrics.incr("notifications.created", len(rows))
+        _adjust_unread([row.recipient_id for row in rows], 1)
+    except Exception:
+        logger.exception("Failed to create %d notification(s) verb=%s", len(rows), rows[0].verb if rows else None)
+
+
+def _insert_in_worker(rows: List[Notification]) -> None:
+    try:
+        _insert(rows)
+    finally:
+        close_old_connections()
+
+
+def notify_many(recipients: Iterable, actor, verb: str, message: str = "", target=None,
+                mode: Optional[str] = None) -> int:
+    """
+    Notify every recipient (users, user ids or a user queryset) of one event.
+    Returns the number of rows scheduled; failures are logged, never raised.
+    """
+    try:
+        ids = _recipient_ids(recipients)
+    except Exception:
+        logger.exception("Failed to resolve notification recipients verb=%s", verb)
+        return 0
+    if not ids:
+        return 0
+    # keep a passed-in actor instance on the rows so the pushed payload needs no lookup
+    actor_kwargs = {"actor": actor} if hasattr(actor, "pk") else {"actor_id": actor}
+    target_id = getattr(target, "pk", target)
+    rows = [
+        Notification(recipient_id=pk, verb=verb, message=message or "", target_bonafide_id=target_id, **actor_kwargs)
+        for pk in ids
+    ]
+
+    mode = mode or getattr(settings, "NOTIFICATION_FANOUT_MODE", "inline")
+    if mode == "on_commit":
+        transaction.on_commit(lambda: _insert(rows))
+    elif mode == "worker":
+        # the rows may point at a request created in the caller's transaction
+        transaction.on_commit(lambda: get_executor().submit(_insert_in_worker, rows))
+    else:
+        _insert(rows)
+    return len(rows)
+
+
+def create_notification(recipient, actor, verb, message="", target=None):
+    notify_many([recipient], actor, verb, message, target)
+
+
+ARCHIVE_FIELDS = ("id", "recipient_id", "actor_id", "verb", "message", "target_bonafide_id", "created_at")
+
+
+def _sync(stream) -> None:
+    """Push what was written to `stream` down to disk (gzip: a sync-flushed block)."""
+    stream.flush()
+    try:
+        fd = stream.fileno()
+    except (AttributeError, OSError):
+        return  # in-memory stream
+    os.fsync(fd)
+
+
+def archive_read(days: Optional[int] = None, batch_size: Optional[int] = None, to_table: bool = True,
+                 stream=None, pause: float = 0.0, limit: Optional[int] = None,
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Move read notifications created more than `days` ago out of Notification.
+    Rows go to NotificationArchive when to_table, and are written as JSON lines
+    to `stream` (an open text file) when given; with neither they are just
+    deleted. Returns the number of rows removed from the hot table.
+
+    Each batch is flushed and fsynced to `stream` before its DELETE commits, so
+    the file is at-least-once: a crash or rollback after the sync leaves rows
+    that a rerun writes again. Deduplicate by "id" when reading it back.
+    """
+    days = int(days if days is not None else getattr(settings, "NOTIFICATION_RETENTION_DAYS", 90))
+    batch_size = int(batch_size or getattr(settings, "NOTIFICATION_ARCHIVE_BATCH_SIZE", 1000))
+    cutoff = timezone.now() - timedelta(days=days)
+    stale = Notification.objects.filter(unread=False, created_at__lt=cutoff)
+
+    moved, last_pk = 0, 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        with transaction.atomic():
+            # walk by primary key so every batch starts where the previous one stopped
+            rows: List[Dict] = list(stale.filter(pk__gt=last_pk).order_by("pk").values(*ARCHIVE_FIELDS)[:size])
+            if not rows:
+                break
+            ids = [row["id"] for row in rows]
+            if to_table:
+                NotificationArchive.objects.bulk_create(
+                    [NotificationArchive(notification_id=row["id"], **{k: row[k] for k in ARCHIVE_FIELDS[1:]})
+                     for row in rows],
+                    ignore_conflicts=True,  # rerun after a crash between copy and delete
+                )
+            if stream is not None:
+                for row in rows:
+                    stream.write(json.dumps(row, default=str) + "\n")
+                _sync(stream)
+            deleted, _ = Notification.objects.filter(pk__in=ids).delete()
+        moved += deleted
+        last_pk = ids[-1]
+        if progress:
+            progress(moved)
+        if pause:
+            time.sleep(pause)
+    if moved:
+        metrics.incr("notifications.archived", moved)
+    return moved
+
+
+def open_archive_file(path: str):
+    """Gzip text stream for archive_read(stream=...); appends when the file exists."""
+    return gzip.open(path, "at", encoding="utf-8")
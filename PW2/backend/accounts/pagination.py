@@ -0,0 +1,151 @@
+"""
+Keyset pagination for the list endpoints (mine, incoming, history, notifications).
+
+Rows are ordered newest first by (created_at, id). The cursor is an opaque token
+for the (created_at, id) of the row at the page edge plus a direction. The next
+page filters on
+
+    created_at < c  OR  (created_at = c AND id < i)
+
+so the (…, created_at, id) indexes serve page N with the same cost as page 1,
+with no OFFSET scan. Rows inserted while a client pages through do not shift
+or repeat items.
+
+    GET ...?page_size=20&cursor=<token>&count=1
+
+    {"next": url|null, "previous": url|null, "results": [...], "count": n}
+
+- page_size defaults to LIST_PAGE_SIZE and is capped at LIST_MAX_PAGE_SIZE
+- "count" (a full COUNT(*) over the filtered set) is only included with ?count=1
+  or LIST_INCLUDE_COUNT = True; without it a page costs one query of page_size + 1 rows
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+TRUTHY = ("1", "true", "yes")
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request) -> int:
+        default = int(getattr(settings, "LIST_PAGE_SIZE", 20))
+        limit = int(getattr(settings, "LIST_MAX_PAGE_SIZE", 100))
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            size = default
+        return max(1, min(size, limit))
+
+    def include_count(self, request) -> bool:
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return bool(getattr(settings, "LIST_INCLUDE_COUNT", False))
+        return value.lower() in TRUTHY
+
+    # cursor = urlsafe base64 of ["n"|"p", created_at iso, id]
+    def encode_cursor(self, direction: str, obj) -> str:
+        raw = json.dumps([direction, obj.created_at.isoformat(), obj.pk], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("ascii")
+            direction, created_at, pk = json.loads(raw)
+            created_at = parse_datetime(created_at)
+            if direction not in ("n", "p") or created_at is None:
+                raise ValueError(token)
+            return direction, created_at, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.order_by().count() if self.include_count(request) else None
+
+        cursor = self.decode_cursor(request)
+        direction = cursor[0] if cursor else "n"
+        if cursor:
+            _, created_at, pk = cursor
+            if direction == "n":
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        ordering = ("-created_at", "-pk") if direction == "n" else ("created_at", "pk")
+        rows = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if direction == "p":
+            rows.reverse()
+
+        # "more" tells whether rows exist beyond the page in the direction we walked;
+        # coming from a cursor means rows exist on the side we came from
+        self.has_next = more if direction == "n" else bool(cursor)
+        self.has_previous = bool(cursor) if direction == "n" else more
+        self.page = rows
+        return rows
+
+    def _link(self, direction: str, obj):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(direction, obj))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link("n", self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link("p", self.page[0])
+
+    def get_paginated_response(self, data):
+        body = OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ])
+        if self.count is not None:
+            body["count"] = self.count
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+                "count": {"type": "integer"},
+            },
+        }
+
+
+def paginated_response(view, request, queryset, serializer_class, **serializer_kwargs):
+    """Paginate queryset with KeysetPagination and serialize the page."""
+    if hasattr(serializer_class, "setup_eager_loading"):
+        queryset = serializer_class.setup_eager_loading(queryset)
+    serializer_kwargs.setdefault("context", {"request": request})
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True, **serializer_kwargs)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,188 @@
+"""
+Process pool for PDF text extraction.
+
+PyMuPDF holds the GIL while it parses, so one large PDF on a threaded worker
+(gthread/ASGI) stalls every other request on that worker. With
+BONAFIDE_PDF_POOL_ENABLED the parse runs in a small pool of warm worker
+processes instead:
+
+- BONAFIDE_PDF_POOL_SIZE processes, started on first use with fitz already imported
+- each parse checks one process out and talks to it over its own pipe
+- a process is replaced after BONAFIDE_PDF_POOL_MAX_TASKS documents (bounds leaks)
+- a parse taking longer than BONAFIDE_PDF_POOL_TIMEOUT seconds (waiting for a free
+  process included) raises PdfParseTimeout; only the process running that parse is
+  killed and replaced, so parses running on the other processes carry on
+
+Workers only run accounts.pdf_text.extract_pdf_text with explicit budgets, so
+they never need Django configured.
+"""
+import atexit
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+
+from . import metrics
+from .pdf_text import PdfSource, PdfText, extract_pdf_text, pdf_budgets
+
+logger = logging.getLogger(__name__)
+
+
+class PdfParseTimeout(Exception):
+    """PDF text extraction did not finish within BONAFIDE_PDF_POOL_TIMEOUT."""
+
+
+class PdfWorkerDied(Exception):
+    """The worker process exited while parsing (e.g. MuPDF crashed on the document)."""
+
+
+def _worker_main(conn) -> None:
+    import fitz  # noqa: F401  (pay the PyMuPDF import once per process, not per document)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            reply = (True, extract_pdf_text(*job))
+        except Exception as exc:
+            reply = (False, exc)
+        try:
+            conn.send(reply)
+        except Exception:
+            # the exception itself didn't pickle
+            conn.send((False, RuntimeError(repr(reply[1]))))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True, name="pdf-worker")
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class PdfWorkerPool:
+    def __init__(self, size: int, max_tasks: int = 0, start_method: str = "forkserver"):
+        self.ctx = multiprocessing.get_context(start_method)
+        self.max_tasks = max_tasks
+        self.closed = False
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(_Worker(self.ctx))
+
+    def run(self, args: tuple, timeout: float) -> PdfText:
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PdfParseTimeout(f"No PDF worker free within {timeout:g}s") from None
+
+        keep = False
+        try:
+            worker.conn.send(args)
+            if not worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                metrics.incr("pdf_pool.timeouts")
+                logger.warning("PDF parse exceeded %ss; replacing its worker process", timeout)
+                raise PdfParseTimeout(f"PDF parsing took longer than {timeout:g}s")
+            ok, value = worker.conn.recv()
+            worker.tasks += 1
+            keep = not self.max_tasks or worker.tasks < self.max_tasks
+        except (EOFError, OSError):
+            raise PdfWorkerDied("PDF worker process exited while parsing") from None
+        finally:
+            self._release(worker, keep)
+        if not ok:
+            raise value
+        return value
+
+    def _release(self, worker: _Worker, keep: bool) -> None:
+        if keep and not self.closed:
+            self._idle.put(worker)
+            return
+        if keep:
+            worker.stop()
+            return
+        # stuck, dead or used up: replace just this process
+        worker.kill()
+        metrics.incr("pdf_pool.restarts")
+        if not self.closed:
+            self._idle.put(_Worker(self.ctx))
+
+    def close(self) -> None:
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+
+_pool: Optional[PdfWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def pool_enabled() -> bool:
+    return bool(getattr(settings, "BONAFIDE_PDF_POOL_ENABLED", False))
+
+
+def get_pdf_pool() -> PdfWorkerPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PdfWorkerPool(
+                    size=int(getattr(settings, "BONAFIDE_PDF_POOL_SIZE", 2)),
+                    max_tasks=int(getattr(settings, "BONAFIDE_PDF_POOL_MAX_TASKS", 50)),
+                    start_method=getattr(settings, "BONAFIDE_PDF_POOL_START_METHOD", "forkserver"),
+                )
+    return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+atexit.register(shutdown_pdf_pool)
+
+
+def parse_pdf(source: PdfSource, timeout: Optional[float] = None) -> PdfText:
+    """Extract text within the BONAFIDE_PDF_* budgets, in the pool when it is enabled."""
+    max_pages, max_chars, max_tokens = pdf_budgets()
+    if not pool_enabled():
+        return extract_pdf_text(source, max_pages=max_pages, max_chars=max_chars, max_tokens=max_tokens)
+
+    if isinstance(source, memoryview):
+        source = source.tobytes()  # buffers can't be pickled; paths and bytes can
+    if timeout is None:
+        timeout = float(getattr(settings, "BONAFIDE_PDF_POOL_TIMEOUT", 20))
+    metrics.incr("pdf_pool.tasks")
+    return get_pdf_pool().run((source, max_pages, max_chars, max_tokens), timeout)
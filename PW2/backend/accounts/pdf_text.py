@@ -0,0 +1,104 @@
+"""
+Bounded PDF text extraction for the bonafide agent.
+
+Pages are read one at a time from an in-memory stream and extraction stops as
+soon as the page, character or (approximate) token budget is used up, so a
+200-page scan or a hostile PDF cannot blow up memory or the LLM prompt.
+Budgets default to the BONAFIDE_PDF_* settings.
+"""
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple, Union
+
+PdfSource = Union[bytes, bytearray, memoryview, str]
+
+# rough chars-per-token ratio for Gemini-style tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class PdfText:
+    text: str
+    pages_read: int
+    page_count: int
+    bytes_extracted: int
+    truncated: bool
+
+
+def pdf_budgets() -> Tuple[int, int, int]:
+    from django.conf import settings
+
+    return (
+        int(getattr(settings, "BONAFIDE_PDF_MAX_PAGES", 10)),
+        int(getattr(settings, "BONAFIDE_PDF_MAX_CHARS", 20000)),
+        int(getattr(settings, "BONAFIDE_PDF_MAX_TOKENS", 5000)),
+    )
+
+
+def open_pdf(source: PdfSource):
+    import fitz  # PyMuPDF
+
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def upload_pdf_source(upload) -> PdfSource:
+    """
+    Source for a Django UploadedFile without copying it to another file: uploads
+    Django already spooled to disk (above the default FILE_UPLOAD_MAX_MEMORY_SIZE,
+    2.5 MB) are opened from their temp path, in-memory ones straight from the
+    upload buffer.
+    """
+    temporary_file_path = getattr(upload, "temporary_file_path", None)
+    if temporary_file_path is not None:
+        return temporary_file_path()
+    getbuffer = getattr(upload.file, "getbuffer", None)
+    if getbuffer is not None:
+        return getbuffer()
+    upload.seek(0)
+    return upload.read()
+
+
+def iter_pdf_pages(source: PdfSource, max_pages: Optional[int] = None) -> Iterator[Tuple[int, str, int]]:
+    """Yield (page_number, text, page_count) lazily, stopping after max_pages."""
+    with open_pdf(source) as doc:
+        page_count = doc.page_count
+        limit = page_count if max_pages is None else min(page_count, max_pages)
+        for page_no in range(limit):
+            yield page_no, doc.load_page(page_no).get_text(), page_count
+
+
+def extract_pdf_text(source: PdfSource, max_pages: Optional[int] = None,
+                     max_chars: Optional[int] = None, max_tokens: Optional[int] = None) -> PdfText:
+    if max_pages is None or max_chars is None or max_tokens is None:
+        default_pages, default_chars, default_tokens = pdf_budgets()
+        max_pages = default_pages if max_pages is None else max_pages
+        max_chars = default_chars if max_chars is None else max_chars
+        max_tokens = default_tokens if max_tokens is None else max_tokens
+    char_budget = min(max_chars, max_tokens * CHARS_PER_TOKEN)
+
+    parts = []
+    used = 0
+    pages_read = 0
+    page_count = 0
+    truncated = False
+    for page_no, text, page_count in iter_pdf_pages(source, max_pages):
+        pages_read = page_no + 1
+        if used + len(text) > char_budget:
+            parts.append(text[: char_budget - used])
+            used = char_budget
+            truncated = True
+            break
+        parts.append(text)
+        used += len(text)
+    if pages_read < page_count:
+        truncated = True
+
+    text = "".join(parts)
+    return PdfText(
+        text=text,
+        pages_read=pages_read,
+        page_count=page_count,
+        bytes_extracted=len(text.encode("utf-8")),
+        truncated=truncated,
+    )
@@ -0,0 +1,247 @@
+"""
+Push channel for notifications: server-sent events on /notifications/stream/.
+
+Clients keep one EventSource open instead of polling notifications/. The view
+is async, so under ASGI (backend/asgi.py) an open stream holds a coroutine on
+the event loop, not a worker thread. Events:
+
+  event: notification  a new Notification row (NotificationSerializer body); id = notification id
+  event: status        a bonafide request changed status ({"id", "status"}); no id
+  : ping               comment sent every NOTIFICATION_STREAM_HEARTBEAT seconds
+
+The stream never ends, so it needs an ASGI server (uvicorn backend.asgi:application);
+under WSGI the view answers 503 and clients keep polling. The ?token= used by
+EventSource is blanked in the access logs (RedactTokenFilter).
+
+Resuming: the browser resends the last seen id as Last-Event-ID on reconnect
+(or pass ?last_event_id=). The stream first replays the user's notifications
+with a larger id from the database (at most NOTIFICATION_STREAM_REPLAY),
+then follows the live events. Status events are not replayed; the
+"actioned" notification sent with every transition covers them.
+
+Events travel over a pub/sub bus chosen by NOTIFICATION_BUS_BACKEND:
+
+  "local"  in-process (default). Only reaches streams served by the same
+           process, so it fits a single ASGI worker.
+  "redis"  Redis pub/sub on NOTIFICATION_BUS_URL, for several workers/hosts
+           (needs the redis package)
+
+Any other value is treated as a dotted path to a bus class with
+publish(user_id, message) and an async context manager subscribe(user_id)
+yielding an asyncio.Queue of messages.
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .agent_stream import sse
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBus:
+    """In-process bus: one asyncio.Queue per open stream, fed thread-safely."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, message: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # the stream's loop has closed; its subscription goes away with it
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[user_id].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(entry)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+
+class RedisBus:
+    """Redis pub/sub bus, one channel per user."""
+
+    def __init__(self):
+        import redis
+
+        self.url = getattr(settings, "NOTIFICATION_BUS_URL", "redis://localhost:6379/0")
+        self.client = redis.Redis.from_url(self.url)
+
+    @staticmethod
+    def channel(user_id) -> str:
+        return f"notifications:user:{user_id}"
+
+    def publish(self, user_id, message: dict) -> None:
+        self.client.publish(self.channel(user_id), json.dumps(message, default=str))
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel(user_id))
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump():
+            async for item in pubsub.listen():
+                if item.get("type") == "message":
+                    queue.put_nowait(json.loads(item["data"]))
+
+        task = asyncio.create_task(pump())
+        try:
+            yield queue
+        finally:
+            task.cancel()
+            await pubsub.unsubscribe(self.channel(user_id))
+            await pubsub.aclose()
+            await client.aclose()
+
+
+BUS_BACKENDS: Dict[str, Callable] = {
+    "local": LocalBus,
+    "redis": RedisBus,
+}
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                backend = getattr(settings, "NOTIFICATION_BUS_BACKEND", "local")
+                factory = BUS_BACKENDS.get(backend) or import_string(backend)
+                _bus = factory()
+    return _bus
+
+
+def publish(user_ids: Iterable, event: str, data: dict, event_id: Optional[int] = None) -> None:
+    """
+    Send one event to the streams of every user once the current transaction
+    commits (right away under autocommit). Failures are logged, never raised.
+    """
+    message = {"event": event, "id": event_id, "data": data}
+    user_ids = list(user_ids)
+
+    def send():
+        try:
+            bus = get_bus()
+            for user_id in user_ids:
+                bus.publish(user_id, message)
+        except Exception:
+            logger.exception("Failed to publish %s event to %d user(s)", event, len(user_ids))
+
+    transaction.on_commit(send)
+
+
+def publish_notifications(rows) -> None:
+    """Push freshly inserted Notification rows to their recipients."""
+    from .serializers import NotificationSerializer
+
+    if not rows or rows[0].pk is None:
+        # the database did not return ids from bulk_create; clients pick these up on reconnect
+        return
+    # rows of one fan-out differ only in id and recipient, so serialize once
+    base = NotificationSerializer(rows[0]).data
+    for row in rows:
+        publish([row.recipient_id], "notification", {**base, "id": row.pk, "recipient": row.recipient_id},
+                event_id=row.pk)
+
+
+def publish_status(bon) -> None:
+    """Tell the request's student that its status changed."""
+    publish([bon.student_id], "status", {"id": bon.pk, "status": bon.status})
+
+
+_TOKEN_PARAM = re.compile(r"([?&]token=)[^&\s\"]+")
+
+
+class RedactTokenFilter(logging.Filter):
+    """Blank the ?token= access token in access log lines of the stream URL."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str):
+            record.msg = _TOKEN_PARAM.sub(r"\1[redacted]", record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _TOKEN_PARAM.sub(r"\1[redacted]", arg) if isinstance(arg, str) else arg for arg in record.args
+            )
+        return True
+
+
+# access loggers of runserver, uvicorn and daphne
+ACCESS_LOGGERS = ("django.server", "uvicorn.access", "daphne.access")
+
+
+def install_log_redaction() -> None:
+    for name in ACCESS_LOGGERS:
+        logger_ = logging.getLogger(name)
+        if not any(isinstance(f, RedactTokenFilter) for f in logger_.filters):
+            logger_.addFilter(RedactTokenFilter())
+
+
+def _replay(user, last_id: int):
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    limit = int(getattr(settings, "NOTIFICATION_STREAM_REPLAY", 100))
+    rows = list(
+        NotificationSerializer.setup_eager_loading(Notification.objects.filter(recipient=user, pk__gt=last_id))
+        .order_by("pk")[:limit]
+    )
+    return NotificationSerializer(rows, many=True).data
+
+
+def _frame(event: str, data, event_id=None) -> str:
+    frame = sse(event, data)
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+
+async def notification_event_stream(user, last_id: Optional[int] = None):
+    """Async generator of SSE frames for one user: replay after last_id, then live events."""
+    heartbeat = float(getattr(settings, "NOTIFICATION_STREAM_HEARTBEAT", 15))
+    async with get_bus().subscribe(user.pk) as queue:
+        # subscribed before the replay query, so nothing created in between is lost
+        yield f"retry: {int(getattr(settings, 'NOTIFICATION_STREAM_RETRY_MS', 3000))}\n: stream open\n\n"
+        # only the replay moves the cutoff: live ids can arrive out of order (transactions
+        # commit in any order), so a lower id after a higher one is still new
+        replay_max = last_id or 0
+        if last_id is not None:
+            for item in await sync_to_async(_replay)(user, last_id):
+                replay_max = max(replay_max, item["id"])
+                yield _frame("notification", item, item["id"])
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            event_id = message.get("id")
+            if event_id is not None and event_id <= replay_max:
+                continue  # already sent by the replay
+            yield _frame(message["event"], message["data"], event_id)
@@ -0,0 +1,102 @@
+"""
+On-disk replay corpus for the bonafide agent.
+
+With BONAFIDE_CORPUS_DIR set, a sample (BONAFIDE_CORPUS_SAMPLE_RATE) of traced
+production runs is appended as JSON lines to
+
+    <BONAFIDE_CORPUS_DIR>/v<CORPUS_VERSION>/<YYYY-MM-DD>.jsonl
+
+Each line holds the raw_text, the expected details and the run's outputs:
+extracted, checklist, is_valid, iterations, plus every structured LLM response
+in call order. The letters contain student data, so keep the directory
+private. `manage.py replay_bonafide_corpus` replays the corpus through the
+graph (see that command for the metrics and baseline checks). An optional
+"gold" dict on a record, added by hand, overrides the recorded extracted
+fields as the accuracy reference.
+"""
+import hashlib
+import json
+import logging
+import random
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CORPUS_VERSION = 1
+SCORED_FIELDS = ("name", "roll_number", "department", "reason", "has_signature")
+
+_write_lock = threading.Lock()
+
+
+def corpus_root() -> Optional[Path]:
+    root = getattr(settings, "BONAFIDE_CORPUS_DIR", None)
+    return Path(root) if root else None
+
+
+def corpus_dir(root: Optional[Path] = None, version: int = CORPUS_VERSION) -> Path:
+    return Path(root or corpus_root()) / f"v{version}"
+
+
+def capture_run(final_state: Dict, result: Dict, llm_responses: List[dict]) -> None:
+    """Append one run to today's corpus file (sampled; never raises)."""
+    root = corpus_root()
+    if root is None:
+        return
+    if random.random() >= float(getattr(settings, "BONAFIDE_CORPUS_SAMPLE_RATE", 1.0)):
+        return
+    raw_text = final_state.get("raw_text") or ""
+    record = {
+        "v": CORPUS_VERSION,
+        "id": hashlib.sha256(raw_text.encode("utf-8")).hexdigest()[:16],
+        "captured_at": timezone.now().isoformat(),
+        "raw_text": raw_text,
+        "expected": final_state.get("expected") or {},
+        "extracted": {k: v for k, v in (result.get("extracted") or {}).items() if not k.startswith("_")},
+        "checklist": result.get("checklist") or {},
+        "is_valid": bool(result.get("is_valid")),
+        "iterations": result.get("iterations", 0),
+        "source": result.get("source"),
+        "tier": result.get("tier"),
+        "llm_responses": llm_responses,
+    }
+    try:
+        path = corpus_dir(root)
+        path.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _write_lock, open(path / f"{timezone.now():%Y-%m-%d}.jsonl", "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    except Exception:
+        logger.exception("Failed to write replay corpus record")
+
+
+def load_corpus(root: Optional[Path] = None, version: int = CORPUS_VERSION,
+                limit: Optional[int] = None) -> Iterator[dict]:
+    """Records of one corpus version, oldest file first."""
+    count = 0
+    for path in sorted(corpus_dir(root, version).glob("*.jsonl")):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                yield json.loads(line)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+
+def _norm(value) -> str:
+    return "".join(ch for ch in str(value or "").lower() if ch.isalnum())
+
+
+def field_matches(record: dict, extracted: dict) -> Dict[str, bool]:
+    """Per scored field: does the replayed value equal the reference (gold or recorded)?"""
+    reference = record.get("gold") or record.get("extracted") or {}
+    matches = {f: _norm(reference.get(f)) == _norm(extracted.get(f)) for f in SCORED_FIELDS}
+    matches["has_signature"] = bool(reference.get("has_signature")) == bool(extracted.get("has_signature"))
+    return matches
@@ -13,6 +13,14 @@ class MinimalUserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'role', 'name', 'mobile_number', 'designation', 'student_class', 'department')
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # every profile/class/department the method fields below read, in one query
+        return queryset.select_related(
+            'staff_profile__student_class', 'staff_profile__hod_department',
+            'student_profile__student_class__department',
+        )
+
     def get_designation(self, obj):
         if obj.role == 'staff' and hasattr(obj, 'staff_profile'):
             return obj.staff_profile.designation
@@ -123,10 +131,14 @@ class BonafideRequestSerializer(serializers.ModelSerializer):
             'id', 'student_username', 'student_name', 'roll_number', 'contact', 'reason',
             'permission_file_url', 'status', 'created_at',
             # persisted LLM fields
-            'extracted', 'checklist', 'is_valid', 'explanation',
+            'extracted', 'checklist', 'is_valid', 'explanation', 'agent_status',
         ]
         read_only_fields = ['id', 'student_username', 'permission_file_url', 'created_at',
-                            'extracted', 'checklist', 'is_valid', 'explanation']
+                            'extracted', 'checklist', 'is_valid', 'explanation', 'agent_status']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('student')
 
     def get_permission_file_url(self, obj):
         request = self.context.get('request')
@@ -136,6 +148,46 @@ class BonafideRequestSerializer(serializers.ModelSerializer):
             return obj.permission_file.url
         return None
 
+class SparseFieldsMixin:
+    """
+    ?fields=a,b,c limits the output to those fields (unknown names are ignored;
+    an empty selection keeps all fields).
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        wanted = request.query_params.get(self.fields_query_param) if request is not None else None
+        if not wanted:
+            return
+        wanted = {name.strip() for name in wanted.split(',')}
+        if wanted & set(self.fields):
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class BonafideRequestListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Table row for the inbox/history/mine lists. The extracted/checklist JSON,
+    explanation and file URL are left to BonafideDetailView (BonafideRequestSerializer).
+    """
+    student_username = serializers.CharField(source='student.username', read_only=True)
+
+    class Meta:
+        model = BonafideRequest
+        fields = ['id', 'student_username', 'student_name', 'roll_number', 'status', 'agent_status',
+                  'is_valid', 'created_at']
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # only the summary columns: the JSON blobs are never read for list queries
+        return queryset.select_related('student').only(
+            'id', 'student__username', 'student_name', 'roll_number', 'status', 'agent_status',
+            'is_valid', 'created_at',
+        )
+
 class NotificationSerializer(serializers.ModelSerializer):
     actor_username = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S%z")
@@ -144,5 +196,9 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = ["id", "recipient", "actor_username", "verb", "message", "target_bonafide", "unread", "created_at"]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related("actor")
+
     def get_actor_username(self, obj):
         return getattr(obj.actor, "username", None)
\ No newline at end of file
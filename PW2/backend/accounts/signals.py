@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .alias_index import invalidate_alias_index
+from .models import Department, StudentClass
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=StudentClass)
+def refresh_alias_index(sender, **kwargs):
+    invalidate_alias_index()
+
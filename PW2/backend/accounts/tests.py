@@ -1,3 +1,1211 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import InMemoryUploadedFile, SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import metrics
+from .agent_cache import cache_stats, file_digest, get_result, make_key, run_cached, store_result, upload_digest
+from .agent_trace import aggregate_runs, trace_run
+from .agent_worker import process_bonafide
+from .alias_index import departments_match, invalidate_alias_index
+from .bonafide_agent import (
+    END, auditor_node, failing_fields, field_retry_node, get_bonafide_app, get_llm, reset_llms, route_after_rules,
+    rule_extract, rule_extractor_node, run_bonafide_graph_from_text, should_continue,
+)
+from .check_token import load_check_token, make_check_token
+from .llm_backends import FakeBonafideLLM, build_llm
+from .llm_guard import LLMGuard, LLMUnavailable
+from .notifications import notify_many, unread_count
+from .pdf_pool import PdfParseTimeout, PdfWorkerPool, parse_pdf
+from .pdf_text import CHARS_PER_TOKEN, extract_pdf_text, upload_pdf_source
+from .push import RedactTokenFilter, get_bus, notification_event_stream
+from .models import (
+    AgentResultCache, AgentRunRecord, BonafideRequest, Department, Notification, NotificationArchive, StaffProfile, StudentClass, StudentProfile,
+)
+
+User = get_user_model()
+
+ROW_COUNTS = (10, 100, 1000)
+STATUSES = ("pending", "pc_pending", "hod_pending", "approved")
+LETTER_LINES = ("Name: Arun Kumar", "Roll No: 22CS001", "Department: BE CSE G1", "Reason: passport application")
+
+
+def letter_pdf(lines=LETTER_LINES) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, line in enumerate(lines):
+        page.insert_text((72, 72 + 18 * i), line)
+    return doc.tobytes()
+
+
+# one page holds every row, so a per-row query would show up as 1000 extra queries
+@override_settings(LIST_PAGE_SIZE=1000, LIST_MAX_PAGE_SIZE=1000)
+class QueryBudgetTests(TestCase):
+    """
+    Every list/detail endpoint runs a fixed number of queries however many rows
+    it returns. Budgets are per request with force_authenticate (no JWT user
+    lookup); each endpoint is measured at 10, 100 and 1,000 rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(code="QB_DEPT", name="Query budget dept")
+        cls.klass = StudentClass.objects.create(code="QB_DEPT_G1", name="QB G1", department=cls.dept)
+        cls.student = cls.make_user("qb-student", "student")
+        StudentProfile.objects.create(user=cls.student, student_class=cls.klass)
+        cls.tutor = cls.make_staff("qb-tutor", "TUTOR", student_class=cls.klass)
+        cls.pc = cls.make_staff("qb-pc", "PC", student_class=cls.klass)
+        cls.hod = cls.make_staff("qb-hod", "HOD", hod_department=cls.dept)
+
+    @classmethod
+    def make_user(cls, username, role):
+        return User.objects.create_user(username=username, email=f"{username}@example.com", password="pw", role=role)
+
+    @classmethod
+    def make_staff(cls, username, designation, **profile):
+        user = cls.make_user(username, "staff")
+        StaffProfile.objects.create(user=user, designation=designation, **profile)
+        return user
+
+    def grow_to(self, rows):
+        """Top requests and the student's notifications up to `rows` each."""
+        have = BonafideRequest.objects.count()
+        BonafideRequest.objects.bulk_create(
+            BonafideRequest(student=self.student, student_class=self.klass, reason=f"r{i}",
+                            status=STATUSES[i % len(STATUSES)], agent_status="done")
+            for i in range(have, rows)
+        )
+        have = Notification.objects.filter(recipient=self.student).count()
+        Notification.objects.bulk_create(
+            Notification(recipient=self.student, actor=self.tutor, verb="actioned", message=f"n{i}")
+            for i in range(have, rows)
+        )
+
+    def count_queries(self, user, method, url, data=None):
+        client = APIClient()
+        # a fresh instance, as JWT authentication would load it (no cached profiles)
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300, getattr(response, "data", None))
+        # savepoints only exist because TestCase wraps each test in a transaction
+        queries = [q for q in ctx.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))]
+        return len(queries), response
+
+    def assert_budget(self, user, url, budget, statuses=STATUSES):
+        counts = []
+        for rows in ROW_COUNTS:
+            self.grow_to(rows)
+            queries, response = self.count_queries(user, "get", url)
+            expected = sum(STATUSES[i % len(STATUSES)] in statuses for i in range(rows))
+            self.assertEqual(len(response.data["results"]), expected, url)
+            self.assertLessEqual(queries, budget, f"{url} at {rows} rows")
+            counts.append(queries)
+        self.assertEqual(len(set(counts)), 1, f"{url} query count grows with rows: {counts}")
+
+    def test_student_list(self):
+        self.assert_budget(self.student, "/api/auth/bonafide/mine/", 1)
+
+    def test_tutor_incoming(self):
+        self.assert_budget(self.tutor, "/api/auth/bonafide/incoming/", 3, ("pending",))
+
+    def test_pc_incoming(self):
+        self.assert_budget(self.pc, "/api/auth/bonafide/incoming/", 3, ("pc_pending",))
+
+    def test_hod_incoming(self):
+        self.assert_budget(self.hod, "/api/auth/bonafide/incoming/", 2, ("hod_pending",))
+
+    def test_tutor_history(self):
+        self.assert_budget(self.tutor, "/api/auth/bonafide/history/", 3, STATUSES[1:])
+
+    def test_pc_history(self):
+        self.assert_budget(self.pc, "/api/auth/bonafide/history/", 3, STATUSES[1:])
+
+    def test_hod_history(self):
+        self.assert_budget(self.hod, "/api/auth/bonafide/history/", 2, STATUSES[1:])
+
+    def test_notifications(self):
+        self.assert_budget(self.student, "/api/auth/notifications/", 1)
+
+    def test_paginated_list_with_count(self):
+        self.grow_to(100)
+        queries, response = self.count_queries(self.student, "get", "/api/auth/bonafide/mine/?page_size=10&count=1")
+        self.assertEqual(response.data["count"], 100)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertLessEqual(queries, 2)
+        queries, response = self.count_queries(self.student, "get", response.data["next"])
+        self.assertLessEqual(queries, 2)
+
+    def test_detail(self):
+        self.grow_to(10)
+        hod_pending = BonafideRequest.objects.filter(status="hod_pending").first()
+        pc_pending = BonafideRequest.objects.filter(status="pc_pending").first()
+        for user, bon, budget in (
+            (self.student, hod_pending, 1),
+            (self.tutor, pc_pending, 3),
+            (self.pc, pc_pending, 3),
+            (self.hod, hod_pending, 2),
+        ):
+            with self.subTest(user=user.username):
+                queries, _ = self.count_queries(user, "get", f"/api/auth/bonafide/{bon.pk}/")
+                self.assertLessEqual(queries, budget)
+
+    def test_action_notifies_in_fixed_queries(self):
+        self.grow_to(10)
+        bon = BonafideRequest.objects.filter(status="pc_pending").first()
+        # request + staff profile + class, update, student notification, HoD lookup, HoD notification
+        queries, response = self.count_queries(self.pc, "post", f"/api/auth/bonafide/{bon.pk}/action/", {"action": "approve"})
+        self.assertEqual(response.data["status"], "hod_pending")
+        self.assertLessEqual(queries, 7)
+
+    def test_login_user_payload(self):
+        # authenticate, then one joined read for MinimalUserSerializer's profile fields
+        for user, budget in ((self.student, 2), (self.hod, 2)):
+            with self.subTest(user=user.username):
+                client = APIClient()
+                with CaptureQueriesContext(connection) as ctx:
+                    response = client.post("/api/auth/login/", {"username": user.username, "password": "pw"}, format="json")
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(ctx.captured_queries), budget)
+
+
+
+class RequestRoutingTests(TestCase):
+    """A request stays with the class it was filed under, for lists, detail and actions alike."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(code="RR_DEPT", name="Routing dept")
+        cls.old_class = StudentClass.objects.create(code="RR_DEPT_G1", name="RR G1", department=dept)
+        cls.new_class = StudentClass.objects.create(code="RR_DEPT_G2", name="RR G2", department=dept)
+        cls.student = QueryBudgetTests.make_user("rr-student", "student")
+        cls.profile = StudentProfile.objects.create(user=cls.student, student_class=cls.old_class)
+        cls.old_tutor = QueryBudgetTests.make_staff("rr-tutor-1", "TUTOR", student_class=cls.old_class)
+        cls.new_tutor = QueryBudgetTests.make_staff("rr-tutor-2", "TUTOR", student_class=cls.new_class)
+        cls.bon = BonafideRequest.objects.create(student=cls.student, student_class=cls.old_class, status="pending")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def ids(self, user, url):
+        return [row["id"] for row in self.client_for(user).get(url).data["results"]]
+
+    def test_moving_the_student_does_not_move_filed_requests(self):
+        self.profile.student_class = self.new_class
+        self.profile.save()
+        self.bon.refresh_from_db()
+        self.assertEqual(self.bon.student_class, self.old_class)
+
+        self.assertEqual(self.ids(self.old_tutor, "/api/auth/bonafide/incoming/"), [self.bon.pk])
+        self.assertEqual(self.ids(self.new_tutor, "/api/auth/bonafide/incoming/"), [])
+        self.assertEqual(self.client_for(self.new_tutor).get(f"/api/auth/bonafide/{self.bon.pk}/").status_code, 403)
+        self.assertEqual(self.client_for(self.old_tutor).get(f"/api/auth/bonafide/{self.bon.pk}/").status_code, 200)
+        response = self.client_for(self.new_tutor).post(f"/api/auth/bonafide/{self.bon.pk}/action/", {"action": "approve"})
+        self.assertEqual(response.status_code, 403)
+        response = self.client_for(self.old_tutor).post(f"/api/auth/bonafide/{self.bon.pk}/action/", {"action": "approve"})
+        self.assertEqual(response.data["status"], "pc_pending")
+        self.assertEqual(self.ids(self.old_tutor, "/api/auth/bonafide/history/"), [self.bon.pk])
+
+    def test_tutor_inbox_excludes_only_forwarded_and_final_states(self):
+        other = BonafideRequest.objects.create(student=self.student, student_class=self.old_class, status="")
+        BonafideRequest.objects.create(student=self.student, student_class=self.old_class, status="rejected")
+        self.assertEqual(sorted(self.ids(self.old_tutor, "/api/auth/bonafide/incoming/")), [self.bon.pk, other.pk])
+
+
+class ListPayloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dept = Department.objects.create(code="LP_DEPT", name="List payload dept")
+        klass = StudentClass.objects.create(code="LP_DEPT_G1", name="LP G1", department=dept)
+        cls.student = User.objects.create_user(username="lp-student", email="lp@example.com", password="pw", role="student")
+        StudentProfile.objects.create(user=cls.student, student_class=klass)
+        cls.bon = BonafideRequest.objects.create(
+            student=cls.student, student_class=klass, extracted={"name": "x" * 500}, checklist={"name": True},
+            explanation="long explanation",
+        )
+
+    def get(self, url):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, " ".join(q["sql"] for q in ctx.captured_queries)
+
+    def test_list_rows_are_lean(self):
+        response, sql = self.get("/api/auth/bonafide/mine/")
+        row = response.data["results"][0]
+        self.assertEqual(row["student_username"], "lp-student")
+        for heavy in ("extracted", "checklist", "explanation", "permission_file_url"):
+            self.assertNotIn(heavy, row)
+        # the JSON columns are not even selected
+        self.assertNotIn('"extracted"', sql)
+        self.assertNotIn('"checklist"', sql)
+
+    def test_sparse_fieldsets(self):
+        response, _ = self.get("/api/auth/bonafide/mine/?fields=id,status,bogus")
+        self.assertEqual(set(response.data["results"][0]), {"id", "status"})
+        response, _ = self.get("/api/auth/bonafide/mine/?fields=bogus")
+        self.assertIn("created_at", response.data["results"][0])
+
+    def test_detail_keeps_blobs(self):
+        response, _ = self.get(f"/api/auth/bonafide/{self.bon.pk}/")
+        self.assertEqual(response.data["checklist"], {"name": True})
+        self.assertIn("permission_file_url", response.data)
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="uc-user", email="uc@example.com", password="pw", role="student")
+        cls.other = User.objects.create_user(username="uc-other", email="uc2@example.com", password="pw", role="student")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return self.client.get("/api/auth/notifications/unread-count/").data["unread"]
+
+    def test_counter_follows_fan_out_and_mark_read(self):
+        notify_many([self.user, self.other], None, "new_request", "a")
+        self.assertEqual(self.unread(), 1)
+        notify_many([self.user], None, "new_request", "b")
+        notify_many([self.user], None, "new_request", "c")
+        # served from the cached counter, kept current by the inserts
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.unread(), 3)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        first = Notification.objects.filter(recipient=self.user).order_by("pk").first()
+        self.assertEqual(self.client.post(f"/api/auth/notifications/{first.pk}/mark-read/").status_code, 200)
+        self.assertEqual(self.unread(), 2)
+        theirs = Notification.objects.get(recipient=self.other)
+        self.assertEqual(self.client.post(f"/api/auth/notifications/{theirs.pk}/mark-read/").status_code, 404)
+
+    def test_recount_does_not_overwrite_a_concurrent_update(self):
+        notify_many([self.user], None, "new_request", "a")
+        cache.clear()
+        key = f"notifications:unread:{self.user.pk}"
+
+        def count_while_another_process_updates(qs):
+            cache.set(key, 2)  # another reader cached its count and an insert bumped it
+            return 1
+
+        with mock.patch("django.db.models.query.QuerySet.count", count_while_another_process_updates):
+            self.assertEqual(unread_count(self.user), 2)
+        self.assertEqual(cache.get(key), 2)
+
+    def test_bulk_mark_read_is_one_update(self):
+        notify_many([self.user], None, "new_request", "x")
+        notify_many([self.user], None, "new_request", "y")
+        notify_many([self.user], None, "new_request", "z")
+        notify_many([self.other], None, "new_request", "theirs")
+        x, y, z = Notification.objects.filter(recipient=self.user).order_by("pk")
+        Notification.objects.filter(pk=x.pk).update(created_at=x.created_at.replace(year=2020))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/auth/notifications/mark-read/", {"ids": [y.pk]}, format="json")
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual([q["sql"].split()[0] for q in ctx.captured_queries].count("UPDATE"), 1)
+
+        response = self.client.post("/api/auth/notifications/mark-read/", {"before": "2021-01-01T00:00:00Z"}, format="json")
+        self.assertEqual(response.data["updated"], 1)
+        response = self.client.post("/api/auth/notifications/mark-read/", {"all": True}, format="json")
+        self.assertEqual((response.data["updated"], response.data["unread"]), (1, 0))
+        self.assertTrue(Notification.objects.get(recipient=self.other).unread)
+        self.assertEqual(self.client.post("/api/auth/notifications/mark-read/", {}, format="json").status_code, 400)
+
+
+class NotificationStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="ns-user", email="ns@example.com", password="pw", role="student")
+
+    def test_resumes_after_last_event_id_then_follows_live_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for message in ("one", "two"):
+                notify_many([self.user], None, "actioned", message)
+        first, second = Notification.objects.filter(recipient=self.user).order_by("pk")
+
+        @async_to_sync
+        async def read():
+            stream = notification_event_stream(self.user, last_id=first.pk)
+            frames = [await stream.__anext__(), await stream.__anext__()]
+            # a repeat of a replayed notification is dropped, the status event comes through
+            get_bus().publish(self.user.pk, {"event": "notification", "id": second.pk, "data": {}})
+            get_bus().publish(self.user.pk, {"event": "status", "id": None, "data": {"id": 7, "status": "approved"}})
+            frames.append(await stream.__anext__())
+            await stream.aclose()
+            return frames
+
+        opening, replayed, live = read()
+        self.assertTrue(opening.startswith("retry: "))
+        self.assertTrue(replayed.startswith(f"id: {second.pk}\nevent: notification\n"))
+        self.assertEqual(json.loads(replayed.split("data: ", 1)[1])["message"], "two")
+        self.assertEqual(live, 'event: status\ndata: {"id": 7, "status": "approved"}\n\n')
+
+    def test_live_events_below_the_newest_id_still_arrive(self):
+        @async_to_sync
+        async def read():
+            stream = notification_event_stream(self.user, last_id=10)
+            await stream.__anext__()
+            # transactions commit out of order: 12 may be published before 11
+            for event_id in (12, 11, 10):
+                get_bus().publish(self.user.pk, {"event": "notification", "id": event_id, "data": {}})
+            frames = [await stream.__anext__(), await stream.__anext__()]
+            await stream.aclose()
+            return frames
+
+        self.assertEqual([frame.split("\n")[0] for frame in read()], ["id: 12", "id: 11"])
+
+    def test_requires_a_valid_token(self):
+        @async_to_sync
+        async def get(token):
+            response = await AsyncClient().get(f"/api/auth/notifications/stream/?token={token}")
+            if response.streaming:
+                await response.streaming_content.aclose()
+            return response
+
+        self.assertEqual(get("bogus").status_code, 401)
+        response = get(AccessToken.for_user(self.user))
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "text/event-stream"))
+
+    def test_not_served_under_wsgi(self):
+        response = self.client.get(f"/api/auth/notifications/stream/?token={AccessToken.for_user(self.user)}")
+        self.assertEqual(response.status_code, 503)
+
+    def test_token_is_redacted_from_access_logs(self):
+        record = logging.LogRecord("django.server", logging.INFO, "", 0, '"%s" %s %s',
+                                   ("GET /api/auth/notifications/stream/?token=abc.def&last_event_id=3 HTTP/1.1",
+                                    200, 0), None)
+        RedactTokenFilter().filter(record)
+        self.assertEqual(record.getMessage(),
+                         '"GET /api/auth/notifications/stream/?token=[redacted]&last_event_id=3 HTTP/1.1" 200 0')
+
+
+class NotificationArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="na-user", email="na@example.com", password="pw", role="student")
+        old = timezone.now() - timedelta(days=120)
+        for i, (unread, created_at) in enumerate([(False, old)] * 5 + [(True, old), (False, timezone.now())]):
+            note = Notification.objects.create(recipient=self.user, verb="actioned", message=f"m{i}", unread=unread)
+            Notification.objects.filter(pk=note.pk).update(created_at=created_at)
+
+    def test_moves_old_read_rows_in_batches(self):
+        call_command("archive_notifications", days=90, batch_size=2, stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 2)  # the unread one and the recent one stay
+        self.assertEqual(NotificationArchive.objects.count(), 5)
+        self.assertEqual(sorted(NotificationArchive.objects.values_list("message", flat=True)),
+                         ["m0", "m1", "m2", "m3", "m4"])
+
+    def test_file_only_with_limit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "archive.jsonl.gz"
+            call_command("archive_notifications", days=90, file=str(path), no_table=True, limit=3, stdout=StringIO())
+            with gzip.open(path, "rt") as fh:
+                lines = [json.loads(line) for line in fh]
+        self.assertEqual([line["message"] for line in lines], ["m0", "m1", "m2"])
+        self.assertEqual(NotificationArchive.objects.count(), 0)
+        self.assertEqual(Notification.objects.count(), 4)
+
+    def test_deleting_without_a_copy_needs_purge(self):
+        with self.assertRaisesMessage(CommandError, "--no-table needs --file"):
+            call_command("archive_notifications", days=90, no_table=True, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "--purge keeps no copy"):
+            call_command("archive_notifications", days=90, purge=True, file="x.gz", stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 7)
+        call_command("archive_notifications", days=90, purge=True, stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(NotificationArchive.objects.count(), 0)
+
+    def test_file_is_synced_before_each_delete(self):
+        remaining = []
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("accounts.notifications.os.fsync",
+                           side_effect=lambda fd: remaining.append(Notification.objects.count())):
+            path = Path(tmp) / "archive.jsonl.gz"
+            call_command("archive_notifications", days=90, file=str(path), batch_size=2, stdout=StringIO())
+        # one sync per batch, each while the batch's rows were still in the table
+        self.assertEqual(remaining, [7, 5, 3])
+
+
+class IndexUsageTests(TestCase):
+    """
+    EXPLAIN the list queries (as the views and KeysetPagination build them) and
+    check the planner picks the matching index from the BonafideRequest and
+    Notification Meta.indexes. Runs against the configured database: SQLite by
+    default, PostgreSQL with POSTGRES_DB set (sequential scans are disabled there,
+    since a test-sized table is otherwise cheaper to scan).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dept = Department.objects.create(code="IX_DEPT", name="Index dept")
+        cls.klass = StudentClass.objects.create(code="IX_DEPT_G1", name="IX G1", department=cls.dept)
+        cls.other = StudentClass.objects.create(code="IX_DEPT_G2", name="IX G2", department=cls.dept)
+        cls.student = User.objects.create_user(username="ix-student", email="ix@example.com", password="pw", role="student")
+        StudentProfile.objects.create(user=cls.student, student_class=cls.klass)
+        BonafideRequest.objects.bulk_create(
+            BonafideRequest(student=cls.student, student_class=(cls.klass, cls.other)[i // len(STATUSES) % 2],
+                            status=STATUSES[i % len(STATUSES)])
+            for i in range(400)
+        )
+        Notification.objects.bulk_create(
+            Notification(recipient=cls.student, verb="actioned", unread=i % 3 == 0) for i in range(400)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def page(self, queryset):
+        # the query KeysetPagination runs for a page after the first one
+        newest = queryset.order_by("-created_at", "-pk").first()
+        return queryset.filter(
+            Q(created_at__lt=newest.created_at) | Q(created_at=newest.created_at, pk__lt=newest.pk)
+        ).order_by("-created_at", "-pk")[:21]  # LIST_PAGE_SIZE + 1
+
+    def assert_uses_index(self, queryset, index_name):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+        table = queryset.model._meta.db_table
+        self.assertNotIn(f"SCAN {table}\n", plan + "\n", plan)  # SQLite full-table scan
+        self.assertNotIn(f"Seq Scan on {table}", plan, plan)  # PostgreSQL
+
+    def test_student_list(self):
+        self.assert_uses_index(self.page(BonafideRequest.objects.filter(student=self.student)),
+                               "bonafide_student_keyset_idx")
+
+    def test_tutor_inbox(self):
+        qs = BonafideRequest.objects.filter(student_class=self.klass).exclude(
+            status__in=["pc_pending", "hod_pending", "rejected", "approved"])
+        self.assert_uses_index(self.page(qs), "bonafide_class_history_idx")
+
+    def test_pc_inbox(self):
+        qs = BonafideRequest.objects.filter(student_class=self.klass, status="pc_pending")
+        self.assert_uses_index(self.page(qs), "bonafide_class_status_idx")
+
+    def test_hod_inbox(self):
+        qs = BonafideRequest.objects.filter(status="hod_pending", student_class__department_id=self.dept.id)
+        self.assert_uses_index(self.page(qs), "bonafide_class_status_idx")
+
+    def test_history(self):
+        qs = BonafideRequest.objects.filter(student_class=self.klass).exclude(status__in=["pending", ""])
+        self.assert_uses_index(self.page(qs), "bonafide_class_history_idx")
+        qs = BonafideRequest.objects.filter(student_class__department_id=self.dept.id).exclude(status__in=["pending", ""])
+        self.assert_uses_index(self.page(qs), "bonafide_class_history_idx")
+
+    def test_notifications(self):
+        self.assert_uses_index(self.page(Notification.objects.filter(recipient=self.student)), "notification_keyset_idx")
+
+    def test_unread_notifications(self):
+        qs = Notification.objects.filter(recipient=self.student, unread=True)
+        self.assert_uses_index(self.page(qs), "notification_unread_idx")
+        self.assert_uses_index(qs.order_by(), "notification_unread_idx")
+
+
+class LazyImportTests(TestCase):
+    def test_views_import_without_heavy_dependencies(self):
+        code = ("import sys, django; django.setup(); import accounts.views; "
+                "print(','.join(m for m in ('langchain_google_genai', 'langgraph', 'fitz') if m in sys.modules))")
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "backend.settings"}
+        out = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "")
+
+    @override_settings(BONAFIDE_MODEL_TIERS=None, BONAFIDE_LLM_BACKEND="fake")
+    def test_llm_and_graph_are_built_once(self):
+        reset_llms()
+        self.addCleanup(reset_llms)
+        with mock.patch("accounts.llm_backends.build_llm", wraps=build_llm) as build:
+            self.assertIs(get_llm(), get_llm())
+        build.assert_called_once()
+
+        with mock.patch("accounts.bonafide_agent._bonafide_app", None), \
+                mock.patch("accounts.bonafide_agent.build_bonafide_app", return_value=object()) as build_app:
+            self.assertIs(get_bonafide_app(), get_bonafide_app())
+        build_app.assert_called_once()
+
+
+@override_settings(BONAFIDE_AGENT_CACHE_ENABLED=True, BONAFIDE_AGENT_CACHE_TTL=3600, BONAFIDE_AGENT_CACHE_MAX_ENTRIES=3)
+class AgentResultCacheTests(TestCase):
+    RESULT = {"is_valid": True, "iterations": 2, "extracted": {}}
+
+    def setUp(self):
+        cache.clear()
+
+    def test_key_depends_on_pdf_and_expected_details(self):
+        expected = {"name": "Asha", "roll_number": "21CS001"}
+        self.assertEqual(make_key("abc", expected), make_key("abc", dict(reversed(expected.items()))))
+        self.assertNotEqual(make_key("abc", expected), make_key("abd", expected))
+        self.assertNotEqual(make_key("abc", expected), make_key("abc", {**expected, "name": "Ravi"}))
+        self.assertEqual(file_digest(b"%PDF"), upload_digest(SimpleUploadedFile("a.pdf", b"%PDF")))
+
+    def test_hit_skips_parse_and_graph(self):
+        load_text = mock.Mock(return_value="letter")
+        with mock.patch("accounts.agent_cache.run_bonafide_graph_from_text", return_value=self.RESULT) as graph:
+            self.assertEqual(run_cached("d1", {}, load_text), self.RESULT)
+            self.assertEqual(run_cached("d1", {}, load_text), self.RESULT)
+        self.assertEqual((graph.call_count, load_text.call_count), (1, 1))
+        self.assertEqual(AgentResultCache.objects.get().hit_count, 1)
+        self.assertEqual(cache_stats()["llm_calls_saved"], 2)
+
+    def test_expired_entries_are_misses(self):
+        key = make_key("d1", {})
+        store_result(key, self.RESULT)
+        AgentResultCache.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNone(get_result(key))
+        self.assertFalse(AgentResultCache.objects.exists())
+
+    def test_evicts_least_recently_used_above_limit(self):
+        now = timezone.now()
+        for i in range(3):
+            store_result(make_key(f"d{i}", {}), self.RESULT)
+            AgentResultCache.objects.filter(key=make_key(f"d{i}", {})).update(last_used_at=now - timedelta(minutes=10 - i))
+        get_result(make_key("d0", {}))  # a hit bumps d0, so d1 is now the least recently used
+        store_result(make_key("d3", {}), self.RESULT)
+        self.assertIsNone(get_result(make_key("d1", {})))
+        self.assertEqual(AgentResultCache.objects.count(), 3)
+
+
+@override_settings(BONAFIDE_AGENT_STALE_MINUTES=10)
+class AgentQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="aq-student", email="aq@example.com", password="pw", role="student")
+
+    def make(self, agent_status, created_ago, claimed_ago=None):
+        now = timezone.now()
+        bon = BonafideRequest.objects.create(student=self.student, agent_status=agent_status)
+        BonafideRequest.objects.filter(pk=bon.pk).update(
+            created_at=now - timedelta(minutes=created_ago),
+            agent_claimed_at=None if claimed_ago is None else now - timedelta(minutes=claimed_ago),
+        )
+        return bon.pk
+
+    def test_claim_records_time(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp), \
+                mock.patch("accounts.agent_worker.run_cached", return_value={"is_valid": True}):
+            bon = BonafideRequest.objects.create(student=self.student, permission_file=SimpleUploadedFile("a.pdf", b"%PDF"))
+            self.assertTrue(process_bonafide(bon.pk))
+            self.assertFalse(process_bonafide(bon.pk))  # already claimed
+        bon.refresh_from_db()
+        self.assertEqual(bon.agent_status, "done")
+        self.assertLess(timezone.now() - bon.agent_claimed_at, timedelta(minutes=1))
+
+    def test_sweep_requeues_by_claim_time(self):
+        just_claimed = self.make("running", created_ago=120, claimed_ago=1)
+        stuck = self.make("running", created_ago=120, claimed_ago=30)
+        legacy = self.make("running", created_ago=120)
+        deferred = self.make("deferred", created_ago=1)
+        call_command("run_agent_queue", limit=0, stdout=StringIO())
+        statuses = dict(BonafideRequest.objects.values_list("pk", "agent_status"))
+        self.assertEqual(
+            [statuses[pk] for pk in (just_claimed, stuck, legacy, deferred)],
+            ["running", "queued", "queued", "queued"],
+        )
+
+
+class RuleExtractTests(TestCase):
+    TEMPLATE = "\n".join([
+        "To the Principal,",
+        "Name: Arun Kumar",
+        "Roll No: 22CS001",
+        "Department: BE CSE G1",
+        "Reason: Bonafide certificate for passport application",
+    ])
+    EXPECTED = {"name": "Arun Kumar", "roll_number": "22CS001", "department": "BE CSE G1"}
+
+    def test_template_letter_is_read_from_labels(self):
+        extracted, confidence = rule_extract(self.TEMPLATE)
+        self.assertEqual(confidence, 1.0)
+        self.assertEqual((extracted["name"], extracted["roll_number"]), ("Arun Kumar", "22CS001"))
+
+    def test_expected_values_in_unlabelled_text_do_not_skip_the_llm(self):
+        # two labelled fields; the name and class only appear in passing
+        text = "Roll No: 22CS001\nReason: passport\nArun Kumar of BE CSE G1 is mentioned in the annexure."
+        extracted, confidence = rule_extract(text)
+        self.assertEqual(confidence, 0.5)
+        self.assertIsNone(extracted["name"])
+        self.assertIsNone(extracted["department"])
+        state = rule_extractor_node({"raw_text": text, "expected": self.EXPECTED})
+        self.assertEqual(route_after_rules(state), "extract")
+
+    def test_signature_needs_a_filled_block(self):
+        for text, signed in (
+            (self.TEMPLATE + "\nSignature of the student", False),
+            (self.TEMPLATE + "\nSignature: ______________", False),
+            (self.TEMPLATE + "\nYours faithfully,\nSignature: ________\nDate:", False),
+            (self.TEMPLATE + "\nSignature: Arun Kumar", True),
+            (self.TEMPLATE + "\nYours faithfully,\n\nArun Kumar\n22CS001", True),
+        ):
+            with self.subTest(text=text.splitlines()[-1]):
+                self.assertIs(rule_extract(text)[0]["has_signature"], signed)
+
+
+@override_settings(BONAFIDE_MODEL_TIERS=None)
+class FieldRetryTests(TestCase):
+    EXPECTED = {"name": "Arun Kumar", "roll_number": "22CS001", "department": None}
+
+    def audited(self, extracted, expected=EXPECTED, **state):
+        state = {"raw_text": "letter", "extracted_data": extracted, "expected": expected, "source": "llm", "tier": 0,
+                 "iterations": 1, **state}
+        return {**state, **auditor_node(state)}
+
+    def test_missing_mismatched_and_unverifiable(self):
+        state = self.audited({"name": "Someone Else", "department": "BE CSE G1"})
+        self.assertTrue(state["checklist_results"]["Dept"].startswith("❌ Unverified"))
+        self.assertEqual(failing_fields(state), (["roll_number"], ["name"]))
+
+    def test_anonymous_check_is_not_retried(self):
+        state = self.audited({"name": "Arun Kumar", "roll_number": "22CS001", "department": "BE CSE G1"}, expected={})
+        self.assertEqual(failing_fields(state), ([], []))
+        self.assertEqual(should_continue(state), END)
+
+    def test_retry_asks_only_for_missing_fields(self):
+        state = self.audited({"name": "Arun Kumar", "department": "BE CSE G1"})
+        self.assertEqual(should_continue(state), "retry")
+        reply = ({"name": "Wrong", "roll_number": "22CS001"}, {"input_tokens": 10, "output_tokens": 2})
+        with mock.patch("accounts.bonafide_agent.invoke_structured", return_value=reply) as invoke:
+            update = field_retry_node(state)
+        self.assertIn("extract only these fields: roll_number.", invoke.call_args[0][0])
+        self.assertEqual(update["extracted_data"]["name"], "Arun Kumar")  # not re-asked, not overwritten
+        self.assertEqual(update["extracted_data"]["roll_number"], "22CS001")
+        self.assertTrue(self.audited(update["extracted_data"])["checklist_results"]["Roll No"].startswith("✅"))
+
+
+class PdfBudgetTests(TestCase):
+    PAGES = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import fitz
+
+        doc = fitz.open()
+        for n in range(cls.PAGES):
+            doc.new_page().insert_text((72, 72), f"Page {n} " + "x" * 50)
+        cls.pdf = doc.tobytes()
+        cls.page_chars = len(extract_pdf_text(cls.pdf, max_pages=1, max_chars=10**6, max_tokens=10**6).text)
+
+    def extract(self, **budgets):
+        import fitz
+
+        loaded = []
+        load_page = fitz.Document.load_page
+
+        def spy(doc, page_no, *args, **kwargs):
+            loaded.append(page_no)
+            return load_page(doc, page_no, *args, **kwargs)
+
+        with mock.patch.object(fitz.Document, "load_page", spy):
+            result = extract_pdf_text(self.pdf, **budgets)
+        return result, loaded
+
+    def test_within_budget_reads_everything(self):
+        result, loaded = self.extract(max_pages=10, max_chars=10**6, max_tokens=10**6)
+        self.assertEqual((result.pages_read, result.page_count, result.truncated), (5, 5, False))
+        self.assertEqual(loaded, [0, 1, 2, 3, 4])
+
+    def test_page_budget(self):
+        result, loaded = self.extract(max_pages=2, max_chars=10**6, max_tokens=10**6)
+        self.assertEqual((result.pages_read, result.page_count, result.truncated), (2, 5, True))
+        self.assertEqual(loaded, [0, 1])
+        self.assertIn("Page 1", result.text)
+        self.assertNotIn("Page 2", result.text)
+
+    def test_char_budget_stops_mid_page(self):
+        budget = self.page_chars + 10
+        result, loaded = self.extract(max_pages=10, max_chars=budget, max_tokens=10**6)
+        self.assertEqual((len(result.text), result.pages_read, result.truncated), (budget, 2, True))
+        self.assertEqual(loaded, [0, 1])
+
+    def test_token_budget(self):
+        tokens = self.page_chars // CHARS_PER_TOKEN  # just under one page
+        result, loaded = self.extract(max_pages=10, max_chars=10**6, max_tokens=tokens)
+        self.assertEqual((len(result.text), result.pages_read, result.truncated), (tokens * CHARS_PER_TOKEN, 1, True))
+        self.assertEqual(loaded, [0])
+
+    @override_settings(BONAFIDE_PDF_MAX_PAGES=3, BONAFIDE_PDF_MAX_CHARS=10**6, BONAFIDE_PDF_MAX_TOKENS=10**6)
+    def test_defaults_come_from_settings(self):
+        result, loaded = self.extract()
+        self.assertEqual((result.pages_read, result.truncated), (3, True))
+        self.assertEqual(loaded, [0, 1, 2])
+
+
+class UploadSourceTests(TestCase):
+    def test_parses_from_upload_buffer_or_spool_file(self):
+        data = letter_pdf()
+        in_memory = InMemoryUploadedFile(BytesIO(data), "file", "a.pdf", "application/pdf", len(data), None)
+        self.assertIsInstance(upload_pdf_source(in_memory), memoryview)
+        spooled = TemporaryUploadedFile("a.pdf", "application/pdf", len(data), None)
+        spooled.write(data)
+        spooled.flush()
+        source = upload_pdf_source(spooled)
+        self.assertEqual(source, spooled.temporary_file_path())
+        self.assertIn("Roll No: 22CS001", extract_pdf_text(source).text)
+        self.assertEqual(upload_digest(spooled), file_digest(data))
+        spooled.close()
+
+
+class CheckTokenTests(TestCase):
+    RESULT = {
+        "extracted": {"name": "Arun Kumar", "roll_number": "22CS001", "department": "BE CSE G1", "reason": "passport"},
+        "checklist": {}, "is_valid": False, "iterations": 1, "llm_calls": 1, "source": "llm", "tier": "flash",
+        "tokens": {"input": 900, "output": 50},
+    }
+
+    def test_round_trip_is_bound_to_the_file(self):
+        token = make_check_token("digest-a", self.RESULT)
+        self.assertEqual(load_check_token(token, "digest-a")["extracted"], self.RESULT["extracted"])
+        self.assertNotIn("tokens", load_check_token(token, "digest-a"))
+        self.assertIsNone(load_check_token(token, "digest-b"))
+        self.assertIsNone(load_check_token(token[:-2] + "xx", "digest-a"))
+        self.assertIsNone(load_check_token(None, "digest-a"))
+        with override_settings(BONAFIDE_CHECK_TOKEN_MAX_AGE=-1):
+            self.assertIsNone(load_check_token(token, "digest-a"))
+
+    def test_submit_reuses_checked_result_without_queueing(self):
+        user = User.objects.create_user(username="22CS001", email="ct@example.com", password="pw", role="student",
+                                        name="Arun Kumar")
+        StudentProfile.objects.create(user=user)
+        data = letter_pdf()
+        client = APIClient()
+        client.force_authenticate(user)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp), \
+                mock.patch("accounts.views.enqueue_bonafide") as enqueue:
+            response = client.post("/api/auth/bonafide/submit/", {
+                "file": SimpleUploadedFile("a.pdf", data, content_type="application/pdf"),
+                "check_token": make_check_token(file_digest(data), self.RESULT),
+            }, format="multipart")
+        self.assertEqual(response.status_code, 202, response.data)
+        enqueue.assert_not_called()
+        bon = BonafideRequest.objects.get(student=user)
+        self.assertEqual(bon.agent_status, "done")
+        # re-audited against the submitting student: name and roll number now verify
+        self.assertTrue(bon.checklist["Name"].startswith("✅"))
+        self.assertTrue(bon.checklist["Roll No"].startswith("✅"))
+
+
+class DepartmentAliasTests(TestCase):
+    # BE_CSE (classes BE_CSE_G1, BE_CSE_G2, BE_CSE_AI_ML), BE_EEE and BE_ECE come from migration 0003
+
+    def setUp(self):
+        invalidate_alias_index()
+
+    def test_same_class_in_other_spellings(self):
+        for extracted in ("BE CSE G1", "B.E. CSE G1", "BE_CSE_G1", "B.E. Computer Science and Engineering G1",
+                          "III year BE CSE G1 section A", "CSE G1"):
+            with self.subTest(extracted=extracted):
+                self.assertTrue(departments_match(extracted, "BE_CSE_G1"))
+
+    def test_department_level_expected_value(self):
+        self.assertTrue(departments_match("B.E. Computer Science", "BE_CSE"))
+        self.assertTrue(departments_match("BE CSE G2", "BE_CSE"))
+        self.assertFalse(departments_match("BE EEE", "BE_CSE"))
+
+    def test_partial_names_do_not_verify_a_class(self):
+        for extracted, expected in (
+            ("BE", "BE EEE"), ("B.E.", "BE EEE"), ("BE", "BE_CSE_G1"), ("B.E.", "BE CSE G1"),
+            ("CSE", "BE CSE G1"), ("BE CSE", "BE_CSE_G1"), ("BE CSE G2", "BE_CSE_G1"), ("BE ECE", "BE_CSE_G1"),
+        ):
+            with self.subTest(extracted=extracted, expected=expected):
+                self.assertFalse(departments_match(extracted, expected))
+
+    def test_unknown_values_need_identical_canonical_forms(self):
+        self.assertTrue(departments_match("M.Tech VLSI", "MTECH_VLSI"))
+        self.assertFalse(departments_match("MTech", "MTECH VLSI"))
+        self.assertFalse(departments_match("MTECH VLSI", "MTECH VLSI G2"))
+
+
+@override_settings(BONAFIDE_MODEL_TIERS=None, BONAFIDE_CORPUS_DIR=None)
+class AgentTraceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_llms(FakeBonafideLLM())
+        self.addCleanup(reset_llms)
+
+    def test_run_is_recorded_per_stage_and_node(self):
+        # prose letter: the rules can't read every field, so the fake model is called
+        text = "I, Arun Kumar, (Roll No 22CS001) request a certificate for my passport application."
+        with trace_run("check"):
+            result = run_bonafide_graph_from_text(text, {"name": "Arun Kumar", "roll_number": "22CS001"})
+        record = AgentRunRecord.objects.get()
+        self.assertEqual((record.endpoint, record.llm_calls), ("check", result["llm_calls"]))
+        self.assertEqual([n[0] for n in record.nodes][:3], ["rules", "extract", "audit"])
+        self.assertGreater(record.input_tokens, 0)
+        self.assertIsNotNone(record.graph_ms)
+        self.assertGreaterEqual(record.total_ms, record.graph_ms)
+
+        stats = aggregate_runs(AgentRunRecord.objects.all())
+        self.assertEqual(stats["runs"], 1)
+        self.assertEqual(stats["nodes"]["extract"]["calls"], result["node_calls"]["extract"])
+
+    def test_failures_record_the_exception_type(self):
+        with self.assertRaises(ValueError), trace_run("submit"):
+            raise ValueError("boom")
+        self.assertEqual(AgentRunRecord.objects.get().error_type, "ValueError")
+        with trace_run("check", record=False):
+            pass
+        self.assertEqual(AgentRunRecord.objects.count(), 1)
+
+
+class LLMGuardTests(TestCase):
+    @staticmethod
+    def fail():
+        raise RuntimeError("llm down")
+
+    def test_breaker_opens_then_lets_one_trial_through(self):
+        guard = LLMGuard(failure_threshold=2, reset_timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                guard.call(self.fail)
+        self.assertTrue(guard.is_open())
+        with self.assertRaises(LLMUnavailable) as ctx:
+            guard.call(lambda: "never called")
+        self.assertEqual(ctx.exception.reason, "circuit_open")
+
+        time.sleep(0.06)
+        with self.assertRaises(RuntimeError):
+            guard.call(self.fail)  # the failed trial re-opens it at once
+        self.assertTrue(guard.is_open())
+        time.sleep(0.06)
+        self.assertEqual(guard.call(lambda: "ok"), "ok")
+        self.assertEqual((guard.state, guard.consecutive_failures), ("closed", 0))
+
+    def test_rejects_beyond_concurrency_and_wait_queue(self):
+        guard = LLMGuard(max_concurrency=1, max_waiting=0, acquire_timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=guard.call, args=(lambda: (started.set(), release.wait(5)),))
+        holder.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(LLMUnavailable) as ctx:
+                guard.call(lambda: "ok")
+            self.assertEqual(ctx.exception.reason, "queue_full")
+            guard.max_waiting = 1
+            with self.assertRaises(LLMUnavailable) as ctx:
+                guard.call(lambda: "ok")
+            self.assertEqual(ctx.exception.reason, "queue_timeout")
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(guard.call(lambda: "ok"), "ok")
+
+    def test_check_endpoint_answers_503_when_unavailable(self):
+        with mock.patch("accounts.views.run_cached", side_effect=LLMUnavailable("circuit_open", retry_after=12.2)):
+            response = APIClient().post("/api/auth/bonafide/check/", {"file": SimpleUploadedFile("a.pdf", letter_pdf())},
+                                        format="multipart")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual((response["Retry-After"], response.data["reason"]), ("13", "circuit_open"))
+
+
+def slow_extract(source, *budgets):
+    if source == b"slow":
+        time.sleep(5)
+    return extract_pdf_text(source, *budgets)
+
+
+class PdfPoolTests(TestCase):
+    budgets = (10, 20000, 5000)
+
+    def make_pool(self, **kwargs):
+        # fork so the workers inherit the patched extract_pdf_text
+        with mock.patch("accounts.pdf_pool.extract_pdf_text", slow_extract):
+            pool = PdfWorkerPool(start_method="fork", **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_timeout_replaces_only_the_stuck_process(self):
+        pool = self.make_pool(size=2)
+        results = {}
+
+        def innocent():
+            time.sleep(0.2)  # starts while the slow parse holds the other process
+            results["text"] = pool.run((letter_pdf(), *self.budgets), timeout=5).text
+
+        thread = threading.Thread(target=innocent)
+        thread.start()
+        with self.assertRaises(PdfParseTimeout):
+            pool.run((b"slow", *self.budgets), timeout=0.5)
+        thread.join()
+        self.assertIn("Arun Kumar", results["text"])
+        self.assertEqual(pool._idle.qsize(), 2)
+        self.assertIn("Arun Kumar", pool.run((letter_pdf(), *self.budgets), timeout=5).text)
+
+    def test_worker_errors_propagate_and_keep_the_process(self):
+        pool = self.make_pool(size=1)
+        with self.assertRaises(Exception):
+            pool.run((b"not a pdf", *self.budgets), timeout=5)
+        self.assertIn("Arun Kumar", pool.run((letter_pdf(), *self.budgets), timeout=5).text)
+
+    def test_process_recycled_after_max_tasks(self):
+        pool = self.make_pool(size=1, max_tasks=2)
+        pids = []
+        for _ in range(3):
+            pool.run((letter_pdf(), *self.budgets), timeout=5)
+            worker = pool._idle.get()
+            pids.append(worker.process.pid)
+            pool._idle.put(worker)
+        self.assertNotEqual(pids[0], pids[1])
+        self.assertEqual(pids[1], pids[2])
+
+    @override_settings(BONAFIDE_PDF_POOL_ENABLED=False)
+    def test_parse_inline_when_disabled(self):
+        with mock.patch("accounts.pdf_pool.get_pdf_pool") as get_pool:
+            self.assertIn("Arun Kumar", parse_pdf(memoryview(letter_pdf())).text)
+        get_pool.assert_not_called()
+
+
+class CheckStreamTests(TestCase):
+    @staticmethod
+    def events(**post):
+        @async_to_sync
+        async def consume():
+            response = await AsyncClient().post("/api/auth/bonafide/check/stream/", post)
+            if not response.streaming:
+                return response, None
+            return response, b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+        return consume()
+
+    def test_streams_progress_then_result(self):
+        pdf, loops = letter_pdf(), []
+
+        def source(upload):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return upload_pdf_source(upload)
+
+        def run(source, digest, expected, emit):
+            emit("parsed", {"chars": 10})
+            emit("result", {"is_valid": True, "digest": digest, "expected": expected})
+
+        with mock.patch("accounts.views.upload_pdf_source", side_effect=source), \
+                mock.patch("accounts.agent_stream.run_check_events", side_effect=run):
+            response, body = self.events(file=SimpleUploadedFile("a.pdf", pdf))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(loops, [None])  # the upload was read off the event loop
+        frames = [f for f in body.split("\n\n") if f.startswith("event:")]
+        self.assertEqual([f.split("\n")[0] for f in frames], ["event: parsed", "event: result"])
+        result = json.loads(frames[1].split("data: ", 1)[1])
+        self.assertEqual((result["digest"], result["expected"]), (file_digest(pdf), {}))
+
+    def test_missing_file_is_rejected(self):
+        response, _ = self.events()
+        self.assertEqual(response.status_code, 400)
+
+
+def zero_arg_llm():
+    return FakeBonafideLLM()
+
+
+class ModelTierTests(TestCase):
+    TIERS = [{"name": "cheap", "model": "m1", "backend": "fake"}, {"name": "strong", "model": "m2", "backend": "fake"}]
+
+    def test_model_only_passed_to_factories_that_take_it(self):
+        self.assertIsInstance(build_llm("accounts.tests.zero_arg_llm", "gemini-2.5-flash"), FakeBonafideLLM)
+        factory = mock.Mock(spec=lambda model=None: None)
+        with mock.patch.dict("accounts.llm_backends.LLM_BACKENDS", {"custom": factory}):
+            build_llm("custom", "m1")
+        factory.assert_called_once_with(model="m1")
+
+    def test_check_audits_without_expected_details_even_for_students(self):
+        student = User.objects.create_user(username="mt-student", email="mt@example.com", password="pw", role="student")
+        StudentProfile.objects.create(user=student, student_class=StudentClass.objects.get(code="BE_CSE_G1"))
+        client = APIClient()
+        client.force_authenticate(student)
+        with mock.patch("accounts.views.run_cached", return_value={"is_valid": False}) as run:
+            response = client.post("/api/auth/bonafide/check/", {"file": SimpleUploadedFile("a.pdf", letter_pdf())},
+                                   format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(run.call_args[0][1], {})  # same cache key as an anonymous check
+
+    @override_settings(BONAFIDE_MODEL_TIERS=TIERS, BONAFIDE_CORPUS_DIR=None)
+    def test_anonymous_check_stays_on_the_first_tier(self):
+        cache.clear()
+        reset_llms()
+        self.addCleanup(reset_llms)
+        text = "I, Arun Kumar, (Roll No 22CS001) studying in BE CSE G1 request a certificate for my passport application."
+        result = run_bonafide_graph_from_text(text, {})
+        self.assertEqual((result["tier"], result["llm_calls"]), ("cheap", 1))
+        self.assertFalse(any("Mismatch" in verdict for verdict in result["checklist"].values()))
+
+
+@override_settings(BONAFIDE_MODEL_TIERS=None, BONAFIDE_CORPUS_DIR=None)
+class ReplayCorpusTests(TestCase):
+    RECORD = {
+        "raw_text": "\n".join(LETTER_LINES + ("Yours faithfully,", "Signature: Arun")),
+        "expected": {"name": "Arun Kumar", "roll_number": "22CS001", "department": "BE CSE G1"},
+        "extracted": {"name": "Arun Kumar", "roll_number": "22CS001", "department": "BE CSE G1",
+                      "reason": "passport application", "has_signature": True},
+        "is_valid": True,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        (self.root / "v1").mkdir()
+        (self.root / "v1" / "2026-10-01.jsonl").write_text(json.dumps(self.RECORD) + "\n")
+
+    def replay(self, *args):
+        out = StringIO()
+        call_command("replay_bonafide_corpus", "--corpus", str(self.root), "--mode", "fake", *args, stdout=out)
+        return out.getvalue()
+
+    def test_baseline_round_trip_and_regression(self):
+        self.assertIn("Baseline written", self.replay("--write-baseline"))
+        self.assertIn("No regressions", self.replay())
+        baseline = self.root / "v1" / "baseline-fake.json"
+        report = json.loads(baseline.read_text())
+        self.assertEqual(report["field_accuracy"]["name"], 1.0)
+        report["retry_rate"] = -1.0
+        baseline.write_text(json.dumps(report))
+        with self.assertRaisesMessage(CommandError, "retry rate"):
+            self.replay()
+
+    def test_replay_does_not_touch_live_counters(self):
+        self.replay("--write-baseline")
+        self.assertEqual(metrics.get_counters("agent.runs"), {"agent.runs": 0})
+        with metrics.namespace("replay"):
+            self.assertEqual(metrics.get_counters("agent.runs"), {"agent.runs": 1})
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="page-user", email="page@example.com", password="pw", role="student")
+        rows = Notification.objects.bulk_create(
+            Notification(recipient=cls.user, verb="submitted", message=str(i)) for i in range(7)
+        )
+        base = timezone.now()
+        # rows 2..4 share one timestamp: the id breaks the tie
+        stamps = [base - timedelta(minutes=m) for m in (6, 5, 3, 3, 3, 2, 1)]
+        for row, stamp in zip(rows, stamps):
+            Notification.objects.filter(pk=row.pk).update(created_at=stamp)
+        cls.newest_first = [row.pk for row in reversed(rows)]
+
+    def get(self, url):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, page):
+        return [row["id"] for row in page["results"]]
+
+    def test_walks_forward_and_back_across_ties(self):
+        seen, url, pages = [], "/api/auth/notifications/?page_size=2&count=1", []
+        while url:
+            page = self.get(url)
+            pages.append(page)
+            seen += self.ids(page)
+            url = page["next"]
+        self.assertEqual(seen, self.newest_first)
+        self.assertEqual(pages[0]["count"], 7)
+        self.assertIsNone(pages[0]["previous"])
+        self.assertEqual(len(pages), 4)
+
+        back = self.get(pages[-1]["previous"])
+        self.assertEqual(self.ids(back), self.ids(pages[-2]))
+        back = self.get(back["previous"])
+        self.assertEqual(self.ids(back), self.ids(pages[-3]))
+        self.assertIsNotNone(back["next"])
+
+    def test_rows_inserted_while_paging_are_not_repeated(self):
+        first = self.get("/api/auth/notifications/?page_size=3")
+        Notification.objects.create(recipient=self.user, verb="approved")
+        second = self.get(first["next"])
+        self.assertEqual(self.ids(second), self.newest_first[3:6])
+        self.assertNotIn("count", second)
+
+    def test_invalid_cursor_is_404(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for cursor in ("garbage", "WyJ4IiwiMjAyNi0wMS0wMSIsMV0"):  # the second decodes to ["x", ...]
+            self.assertEqual(client.get(f"/api/auth/notifications/?cursor={cursor}").status_code, 404)
+
+
+class NotifyManyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="nm-user", email="nm@example.com", password="pw", role="student")
+        cls.other = User.objects.create_user(username="nm-other", email="nm2@example.com", password="pw", role="student")
+
+    def setUp(self):
+        cache.clear()
+
+    def recipients(self, verb):
+        return sorted(Notification.objects.filter(verb=verb).values_list("recipient_id", flat=True))
+
+    def test_recipients_are_deduplicated(self):
+        count = notify_many([self.user, self.user.pk, None, self.other], None, "dedup", mode="inline")
+        self.assertEqual(count, 2)
+        self.assertEqual(self.recipients("dedup"), sorted([self.user.pk, self.other.pk]))
+        both = User.objects.filter(pk__in=[self.user.pk, self.other.pk]) | User.objects.filter(pk=self.user.pk)
+        self.assertEqual(notify_many(both, None, "dedup-qs", mode="inline"), 2)
+
+    def test_on_commit_waits_for_the_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            notify_many([self.user], self.other, "later", mode="on_commit")
+            self.assertEqual(self.recipients("later"), [])
+        self.assertEqual(len(callbacks), 2)  # the insert, then the push it schedules
+        self.assertEqual(self.recipients("later"), [self.user.pk])
+
+    def test_worker_mode_inserts_off_the_request(self):
+        with mock.patch("accounts.notifications.get_executor") as executor, \
+                self.captureOnCommitCallbacks(execute=True):
+            notify_many([self.user, self.other], None, "queued", mode="worker")
+        task, rows = executor.return_value.submit.call_args[0]
+        self.assertEqual(self.recipients("queued"), [])
+        with mock.patch("accounts.notifications.close_old_connections") as close:
+            task(rows)
+        close.assert_called_once()
+        self.assertEqual(self.recipients("queued"), sorted([self.user.pk, self.other.pk]))
+
+    def test_failures_are_logged_not_raised(self):
+        def broken():
+            raise RuntimeError("resolver down")
+            yield
+
+        with self.assertLogs("accounts.notifications", "ERROR"):
+            self.assertEqual(notify_many(broken(), None, "lost", mode="inline"), 0)
+        with mock.patch.object(Notification.objects, "bulk_create", side_effect=RuntimeError("db down")), \
+                self.assertLogs("accounts.notifications", "ERROR"):
+            self.assertEqual(notify_many([self.user], None, "lost", mode="inline"), 1)
+        self.assertEqual(self.recipients("lost"), [])
@@ -3,9 +3,9 @@ from .views import (
     StudentSignupView, StaffSignupView, LoginView,
     BonafideCheckView, BonafideSubmitView, BonafideDetailView,
     IncomingBonafideListView, BonafideActionView, BonafideHistoryView,
-    NotificationListView, NotificationMarkReadView,
+    NotificationListView, NotificationMarkReadView, NotificationUnreadCountView, NotificationBulkMarkReadView,
     BonafideFileView, BonafideDownloadTokenView, PublicBonafideDownloadView,
-    StudentBonafideListView
+    StudentBonafideListView, AgentStatsView, bonafide_check_stream, notification_stream
 )
 
 urlpatterns = [
@@ -13,6 +13,7 @@ urlpatterns = [
     path('staff/signup/', StaffSignupView.as_view(), name='staff-signup'),
     path('login/', LoginView.as_view(), name='login'),
     path('bonafide/check/', BonafideCheckView.as_view(), name='bonafide-check'),
+    path('bonafide/check/stream/', bonafide_check_stream, name='bonafide-check-stream'),
     path('bonafide/submit/', BonafideSubmitView.as_view(), name='bonafide-submit'),
     path('bonafide/incoming/', IncomingBonafideListView.as_view(), name='bonafide-incoming'),
     path('bonafide/<int:pk>/', BonafideDetailView.as_view(), name='bonafide-detail'),
@@ -20,8 +21,12 @@ urlpatterns = [
     path("bonafide/history/", BonafideHistoryView.as_view(), name="bonafide-history"),
     path("notifications/", NotificationListView.as_view(), name="notifications-list"),
     path("notifications/<int:pk>/mark-read/", NotificationMarkReadView.as_view(), name="notification-mark-read"),
+    path("notifications/unread-count/", NotificationUnreadCountView.as_view(), name="notifications-unread-count"),
+    path("notifications/mark-read/", NotificationBulkMarkReadView.as_view(), name="notifications-mark-read"),
+    path("notifications/stream/", notification_stream, name="notifications-stream"),
     path("bonafide/<int:pk>/file/", BonafideFileView.as_view(), name="bonafide-file"),
     path("bonafide/<int:pk>/file-token/", BonafideDownloadTokenView.as_view(), name="bonafide-file-token"),
     path("bonafide/download/<str:token>/", PublicBonafideDownloadView.as_view(), name="bonafide-download-token"),
     path("bonafide/mine/", StudentBonafideListView.as_view(), name="bonafide-mine"),
+    path("bonafide/agent-stats/", AgentStatsView.as_view(), name="bonafide-agent-stats"),
 ]
\ No newline at end of file
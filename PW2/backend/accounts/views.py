@@ -5,24 +5,42 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
 import logging
-import re
+import math
 import os
-import tempfile
 
 # import the agent runner
-from .bonafide_agent import get_pdf_text, run_bonafide_graph_from_text
-
-from .models import BonafideRequest, StaffProfile, StudentProfile, Notification
-from .serializers import BonafideRequestSerializer, NotificationSerializer
+from .bonafide_agent import get_pdf_text, llm_free_stats, llm_usage_stats, reaudit_result, tier_stats
+from .agent_cache import cache_stats, file_digest, run_cached, upload_digest
+from .agent_trace import aggregate_runs, trace_run
+from .pdf_text import upload_pdf_source
+from .agent_worker import apply_agent_result, enqueue_bonafide, expected_details_for
+from .llm_guard import LLMUnavailable, guard_stats
+from .agent_stream import check_event_stream
+from .check_token import load_check_token, make_check_token
+from .pagination import paginated_response
+from .push import notification_event_stream, publish_status
+from .notifications import (
+    coordinators_for, create_notification, hods_for, mark_read, notify_many, tutors_for, unread_count,
+)
+from . import metrics
+
+from .models import AgentRunRecord, BonafideRequest, StudentProfile, Notification
+from .serializers import BonafideRequestListSerializer, BonafideRequestSerializer, NotificationSerializer
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework.permissions import AllowAny
 from .serializers import StudentSignupSerializer, StaffSignupSerializer, MinimalUserSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.db.models import Q
-from django.http import FileResponse, HttpResponseRedirect, Http404
+from django.http import FileResponse, HttpResponseNotAllowed, HttpResponseRedirect, Http404, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 import uuid
 
@@ -30,6 +48,10 @@ User = get_user_model()
 
 logger = logging.getLogger(__name__)
 
+class PdfTextError(Exception):
+    """Raised when text extraction from an uploaded PDF fails."""
+
+
 def tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
     return {
@@ -37,6 +59,11 @@ def tokens_for_user(user):
         'access': str(refresh.access_token)
     }
 
+def minimal_user_data(user):
+    # re-read the user with its profiles joined: one query instead of up to four lazy loads
+    user = MinimalUserSerializer.setup_eager_loading(User.objects.all()).get(pk=user.pk)
+    return MinimalUserSerializer(user).data
+
 class StudentSignupView(APIView):
     permission_classes = [AllowAny]
 
@@ -47,7 +74,7 @@ class StudentSignupView(APIView):
         tokens = tokens_for_user(user)
         return Response({
             **tokens,
-            'user': MinimalUserSerializer(user).data
+            'user': minimal_user_data(user)
         }, status=status.HTTP_201_CREATED)
 
 class StaffSignupView(APIView):
@@ -60,7 +87,7 @@ class StaffSignupView(APIView):
         tokens = tokens_for_user(user)
         return Response({
             **tokens,
-            'user': MinimalUserSerializer(user).data
+            'user': minimal_user_data(user)
         }, status=status.HTTP_201_CREATED)
 
 class LoginView(APIView):
@@ -82,7 +109,7 @@ class LoginView(APIView):
         tokens = tokens_for_user(user)
         return Response({
             **tokens,
-            'user': MinimalUserSerializer(user).data
+            'user': minimal_user_data(user)
         })
 
 class BonafideCheckView(APIView):
@@ -99,42 +126,114 @@ class BonafideCheckView(APIView):
             return Response({"detail": "No file uploaded. Attach file under key 'file' or 'permission'."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # save to temp file
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        try:
-            for chunk in upload.chunks():
-                tmp.write(chunk)
-            tmp.flush()
-            tmp.close()
-            file_path = tmp.name
+        # parse straight from the upload buffer (or Django's own spool file for large
+        # uploads) -- no intermediate temp file; the hash keys the agent cache
+        source = upload_pdf_source(upload)
+        digest = upload_digest(upload) if isinstance(source, str) else file_digest(source)
 
-            # extract text
+        # extract text lazily: only needed when the agent cache misses
+        def load_text():
             try:
-                document_content = get_pdf_text(file_path)
+                return get_pdf_text(source)
             except Exception as exc:
-                return Response({"detail": f"Failed to extract text from PDF: {str(exc)}"},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                raise PdfTextError(str(exc)) from exc
 
-            # run langgraph/Gemini flow (no heuristics)
-            try:
-                result = run_bonafide_graph_from_text(document_content)
-            except Exception as exc:
-                return Response({"detail": f"Agent run failed: {str(exc)}"},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # run langgraph/Gemini flow (no heuristics); the check has no expected details,
+        # submit re-audits the result against the student's profile
+        try:
+            with trace_run("check"):
+                result = run_cached(digest, {}, load_text)
+        except PdfTextError as exc:
+            return Response({"detail": f"Failed to extract text from PDF: {str(exc)}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except LLMUnavailable as exc:
+            headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after or 30)))}
+            return Response({"detail": "The document checker is busy, please try again shortly.", "reason": exc.reason},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers)
+        except Exception as exc:
+            return Response({"detail": f"Agent run failed: {str(exc)}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            return Response(result, status=status.HTTP_200_OK)
+        # submit can reuse this result for the same file instead of re-running the agent
+        result = {**result, "check_token": make_check_token(digest, result)}
+        return Response(result, status=status.HTTP_200_OK)
 
-        finally:
-            # cleanup temp file
-            try:
-                tmp.close()
-            except Exception:
-                pass
-            try:
-                if 'file_path' in locals() and os.path.exists(file_path):
-                    os.unlink(file_path)
-            except Exception:
-                pass
+def _stream_user(request):
+    """JWT user for the (non-DRF) stream view, or None when no/invalid token is sent."""
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return authenticated[0] if authenticated else None
+
+
+@csrf_exempt
+async def bonafide_check_stream(request):
+    """
+    Same input and final result as BonafideCheckView, streamed as server-sent events
+    while the agent runs (see accounts/agent_stream.py for the event types).
+    Async view: served from backend/asgi.py a waiting client holds no worker thread.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    def load_input():
+        # multipart parsing and hashing block; keep them off the event loop
+        upload = request.FILES.get('file') or request.FILES.get('permission') or None
+        if not upload:
+            return None
+        source = upload_pdf_source(upload)
+        digest = upload_digest(upload) if isinstance(source, str) else file_digest(source)
+        return source, digest
+
+    loaded = await sync_to_async(load_input)()
+    if loaded is None:
+        return JsonResponse({"detail": "No file uploaded. Attach file under key 'file' or 'permission'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+    source, digest = loaded
+    response = StreamingHttpResponse(check_event_stream(source, digest, {}), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the events
+    return response
+
+@csrf_exempt
+async def notification_stream(request):
+    """
+    Live notifications as server-sent events (see accounts/push.py). EventSource
+    can't send headers, so the access token may be passed as ?token=. Only served
+    under ASGI; WSGI gets a 503 and the client falls back to polling.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not isinstance(request, ASGIRequest):
+        # a WSGI server buffers the whole never-ending stream and pins a worker for good
+        return JsonResponse({"detail": "Live notifications need the ASGI server; poll notifications/ instead."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def load_user():
+        raw = request.GET.get("token")
+        if not raw:
+            return _stream_user(request)
+        try:
+            auth = JWTAuthentication()
+            return auth.get_user(auth.get_validated_token(raw))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+
+    user = await sync_to_async(load_user)()
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."},
+                            status=status.HTTP_401_UNAUTHORIZED)
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return JsonResponse({"detail": "Invalid Last-Event-ID."}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(notification_event_stream(user, last_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 class BonafideSubmitView(APIView):
     permission_classes = [IsAuthenticated]
@@ -144,8 +243,9 @@ class BonafideSubmitView(APIView):
         """
         Student submits bonafide. On submit we:
          - store the uploaded file
-         - run the LLM (single call) on the saved PDF text
-         - persist extracted/checklist/is_valid/explanation into the BonafideRequest record
+         - reuse the /bonafide/check/ result when a valid check_token for the same file is sent
+         - otherwise queue the agent run (see accounts/agent_worker.py) and return 202 right away
+         - the worker persists extracted/checklist/is_valid/explanation and agent_status
         """
         user = request.user
         print(request)
@@ -166,6 +266,7 @@ class BonafideSubmitView(APIView):
         # create record first so file is saved by storage
         bon = BonafideRequest.objects.create(
             student=user,
+            student_class=sp.student_class,
             student_name=student_name,
             roll_number=roll_number,
             contact=contact,
@@ -173,42 +274,16 @@ class BonafideSubmitView(APIView):
             permission_file=permission_file
         )
 
-        # attempt to extract text and run the agent (best-effort)
-        try:
-            file_path = bon.permission_file.path
-            raw_text = get_pdf_text(file_path)
-
-            # provide the logged-in student's expected details to the agent so it can verify matches
-            user = request.user
-            student_profile = getattr(user, "student_profile", None)
-            expected = {
-                "name": getattr(user, "name", None) or getattr(user, "full_name", None) or getattr(user, "username", None),
-                "roll_number": getattr(user, "username", None),
-                "department": (
-                    getattr(getattr(student_profile, "student_class", None), "code", None)
-                    or getattr(student_profile, "department", None)
-                    or ""
-                ),
-            }
-            agent_result = run_bonafide_graph_from_text(raw_text, expected=expected)
-
-            # persist results
-            bon.extracted = agent_result.get('extracted') or {}
-            bon.checklist = agent_result.get('checklist') or {}
-            bon.is_valid = bool(agent_result.get('is_valid', False))
-            # prefer explanation inside extracted if present
-            explanation = None
-            if isinstance(bon.extracted, dict):
-                explanation = bon.extracted.get('explanation')
-            if not explanation:
-                explanation = agent_result.get('explanation') or ''
-            bon.explanation = explanation or ''
-            # set status based on is_valid
-            bon.status = 'pending'
-            bon.save()
-        except Exception as exc:
-            # keep record but log LLM failure
-            logger.exception("LLM run failed for bonafide id=%s: %s", bon.id, str(exc))
+        checked = load_check_token(request.data.get('check_token'), upload_digest(permission_file))
+        if checked is not None:
+            # same file already went through /bonafide/check/: only re-audit against this student
+            apply_agent_result(bon, reaudit_result(checked, expected_details_for(user)))
+            bon.agent_status = 'done'
+            bon.save(update_fields=['extracted', 'checklist', 'is_valid', 'explanation', 'agent_status'])
+            metrics.incr("check_token.reused")
+        else:
+            # the agent runs in the background worker pool; clients poll agent_status
+            enqueue_bonafide(bon)
 
         serializer = BonafideRequestSerializer(bon, context={'request': request})
         # if student's class missing, warn (tutor routing won't work until set)
@@ -216,20 +291,17 @@ class BonafideSubmitView(APIView):
             return Response({
                 "warning": "Your student profile has no class assigned. The request was created but tutors will not receive it until your class is set.",
                 "result": serializer.data
-            }, status=status.HTTP_201_CREATED)
+            }, status=status.HTTP_202_ACCEPTED)
 
         # notify student
         create_notification(user, None, "submitted", "Your bonafide request has been submitted.", target=bon)
 
-        # notify tutors for the student's class
-        student_cls = getattr(getattr(bon.student, "student_profile", None), "student_class", None)
+        # notify tutors for the student's class (one bulk insert)
+        student_cls = bon.student_class
         if student_cls:
-            tutors = StaffProfile.objects.filter(student_class=student_cls).filter(Q(designation__icontains="TUTOR") | Q(designation__iexact="TUTOR"))
-            for t in tutors:
-                if getattr(t, "user", None):
-                    create_notification(t.user, bon.student, "new_request", f"New bonafide request from {bon.student.username}", target=bon)
+            notify_many(tutors_for(student_cls), bon.student, "new_request", f"New bonafide request from {bon.student.username}", target=bon)
 
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 class BonafideDetailView(APIView):
@@ -237,7 +309,7 @@ class BonafideDetailView(APIView):
 
     def get(self, request, pk, *args, **kwargs):
         try:
-            bon = BonafideRequest.objects.get(pk=pk)
+            bon = BonafideRequest.objects.select_related('student__student_profile__student_class', 'student_class').get(pk=pk)
         except BonafideRequest.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -253,7 +325,7 @@ class BonafideDetailView(APIView):
             return Response({"detail": "Not authorized to view this request."}, status=status.HTTP_403_FORBIDDEN)
 
         designation = (staff_profile.designation or "").upper()
-        student_cls = getattr(getattr(bon.student, "student_profile", None), "student_class", None)
+        student_cls = bon.student_class
         class_code = getattr(student_cls, "code", None) or str(student_cls or "")
 
         # Tutors can view requests for their class (that are not forwarded to PC)
@@ -270,14 +342,10 @@ class BonafideDetailView(APIView):
 
         # HoD can view requests forwarded to HoD (status == 'hod_pending') for classes in their department.
         if designation in ('HOD', 'HEAD', 'HEAD_OF_DEPARTMENT'):
-            dept = get_staff_department(staff_profile)
-            # normalize both dept and class_code to compare robustly (handle "BE CSE" / "BE_CSE" / "BE CSE G1")
-            if dept and getattr(bon, "status", None) == "hod_pending":
-                def norm(s) -> str:
-                    return re.sub(r'\W+', '', str(s or '')).upper()
-                if norm(dept) and norm(dept) in norm(class_code):
-                    serializer = BonafideRequestSerializer(bon, context={'request': request})
-                    return Response(serializer.data, status=status.HTTP_200_OK)
+            dept_id = staff_profile.hod_department_id
+            if dept_id and student_cls and student_cls.department_id == dept_id and getattr(bon, "status", None) == "hod_pending":
+                serializer = BonafideRequestSerializer(bon, context={'request': request})
+                return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response({"detail": "Not authorized to view this request."}, status=status.HTTP_403_FORBIDDEN)
 
@@ -304,41 +372,31 @@ class IncomingBonafideListView(APIView):
         if designation == 'TUTOR':
             FINAL_STATUSES = ['pc_pending', 'hod_pending', 'rejected', 'approved']
             incoming_qs = BonafideRequest.objects.filter(
-                student__student_profile__student_class=tutor_class
+                student_class=tutor_class
             ).exclude(status__in=FINAL_STATUSES)
-            serializer = BonafideRequestSerializer(incoming_qs, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return paginated_response(self, request, incoming_qs, BonafideRequestListSerializer, context={'request': request})
 
         # Program Coordinators: show requests forwarded to PC for their class
         if designation in ('PROGRAM_COORDINATOR', 'PC', 'COORDINATOR'):
             incoming_qs = BonafideRequest.objects.filter(
-                student__student_profile__student_class=tutor_class,
+                student_class=tutor_class,
                 status='pc_pending'
             )
-            serializer = BonafideRequestSerializer(incoming_qs, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return paginated_response(self, request, incoming_qs, BonafideRequestListSerializer, context={'request': request})
 
         # HoD: show requests forwarded to HoD for classes belonging to their department
         if designation in ('HOD', 'HEAD', 'HEAD_OF_DEPARTMENT'):
-            dept = get_staff_department(staff_profile)
-            if not dept:
+            dept_id = staff_profile.hod_department_id
+            if not dept_id:
                 logger.warning("HoD %s has no department set; returning empty list", getattr(user, "username", None))
-                return Response([], status=status.HTTP_200_OK)
-
-            # normalize comparator
-            def norm(s) -> str:
-                return re.sub(r'\W+', '', str(s or '')).upper()
-
-            qs = BonafideRequest.objects.filter(status='hod_pending')
-            matches = []
-            dept_norm = norm(dept)
-            for b in qs:
-                cls = getattr(getattr(b.student, 'student_profile', None), 'student_class', None)
-                class_code = getattr(cls, 'code', None) or str(cls or "")
-                if dept_norm and dept_norm in norm(class_code):
-                    matches.append(b)
-            serializer = BonafideRequestSerializer(matches, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+                return paginated_response(self, request, BonafideRequest.objects.none(), BonafideRequestListSerializer)
+
+            # one query through StudentClass.department instead of matching class codes per row
+            incoming_qs = BonafideRequest.objects.filter(
+                status='hod_pending',
+                student_class__department_id=dept_id,
+            )
+            return paginated_response(self, request, incoming_qs, BonafideRequestListSerializer, context={'request': request})
 
         logger.warning("User %s denied incoming list access due to designation=%s", user.username, designation)
         return Response({"detail": "Only tutors, program coordinators and HoDs can view incoming requests."}, status=status.HTTP_403_FORBIDDEN)
@@ -361,7 +419,7 @@ class BonafideActionView(APIView):
         Expects JSON: {"action":"approve"|"reject", "comment":"..."}
         """
         try:
-            bon = BonafideRequest.objects.get(pk=pk)
+            bon = BonafideRequest.objects.select_related('student__student_profile__student_class', 'student_class').get(pk=pk)
         except BonafideRequest.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -392,7 +450,7 @@ class BonafideActionView(APIView):
 
         # Tutor actions
         if designation == 'TUTOR':
-            student_cls = getattr(getattr(bon.student, "student_profile", None), "student_class", None)
+            student_cls = bon.student_class
             if not student_cls or student_cls != staff_profile.student_class:
                 return Response({"detail": "Not authorized for this student/class."}, status=status.HTTP_403_FORBIDDEN)
 
@@ -403,22 +461,19 @@ class BonafideActionView(APIView):
 
             persist_comment("tutor_comment", comment)
             bon.save()
+            publish_status(bon)
 
             # notify student
             create_notification(bon.student, request.user, "actioned", f"Tutor {action} your request. Comment: {comment}", target=bon)
             if action == "approve":
                 # notify program coordinators for that class
-                pc_profiles = StaffProfile.objects.filter(student_class=student_cls).filter(
-                    Q(designation__icontains="PROGRAM_COORDINATOR") | Q(designation__icontains="PC")
-                )
-                for pc in pc_profiles:
-                    if getattr(pc, "user", None):
-                        create_notification(pc.user, request.user, "new_request", f"New bonafide request from {bon.student.username} awaiting your action", target=bon)
+                notify_many(coordinators_for(student_cls), request.user, "new_request",
+                            f"New bonafide request from {bon.student.username} awaiting your action", target=bon)
             return Response(BonafideRequestSerializer(bon, context={"request": request}).data, status=status.HTTP_200_OK)
 
         # Program Coordinator actions (must act only on pc_pending)
         if designation in ('PROGRAM_COORDINATOR', 'PC', 'COORDINATOR'):
-            student_cls = getattr(getattr(bon.student, "student_profile", None), "student_class", None)
+            student_cls = bon.student_class
             if not student_cls or student_cls != staff_profile.student_class:
                 return Response({"detail": "Not authorized for this student/class."}, status=status.HTTP_403_FORBIDDEN)
             if getattr(bon, "status", None) != "pc_pending":
@@ -431,19 +486,14 @@ class BonafideActionView(APIView):
 
             persist_comment("pc_comment", comment)
             bon.save()
+            publish_status(bon)
 
             # notify student and next approver (if any)
             create_notification(bon.student, request.user, "actioned", f"Program Coordinator {action} your request. Comment: {comment}", target=bon)
             if bon.status == "hod_pending":
-                # notify HoD(s) whose department matches the student's class
-                class_code_val = getattr(student_cls, "code", None) or str(student_cls or "")
-                def _norm(s): return re.sub(r'\W+', '', str(s or '')).upper()
-                hod_profiles = StaffProfile.objects.filter(designation__icontains='HOD')
-                for hod in hod_profiles:
-                    dept_val = get_staff_department(hod)
-                    if dept_val and _norm(dept_val) in _norm(class_code_val):
-                        if getattr(hod, "user", None):
-                            create_notification(hod.user, request.user, "new_request", f"New bonafide request from {bon.student.username} awaiting your action", target=bon)
+                # notify HoD(s) of the department the student's class belongs to
+                notify_many(hods_for(student_cls.department_id), request.user, "new_request",
+                            f"New bonafide request from {bon.student.username} awaiting your action", target=bon)
             return Response(BonafideRequestSerializer(bon, context={"request": request}).data, status=status.HTTP_200_OK)
 
         # HoD actions (must act only on hod_pending)
@@ -453,12 +503,9 @@ class BonafideActionView(APIView):
                 return Response({"detail": "Only HoD pending requests can be acted on by HoD."}, status=status.HTTP_400_BAD_REQUEST)
 
             # verify HoD's department matches the student's class
-            student_cls = getattr(getattr(bon.student, "student_profile", None), "student_class", None)
-            staff_dept = get_staff_department(staff_profile)
-            def _norm(s):
-                return re.sub(r'\W+', '', str(s or '')).upper()
-            class_code = getattr(student_cls, "code", None) or str(student_cls or "")
-            if not staff_dept or not (_norm(staff_dept) in _norm(class_code)):
+            student_cls = bon.student_class
+            dept_id = staff_profile.hod_department_id
+            if not dept_id or not student_cls or student_cls.department_id != dept_id:
                 return Response({"detail": "Not authorized for this department/class."}, status=status.HTTP_403_FORBIDDEN)
 
             if action == "approve":
@@ -468,6 +515,7 @@ class BonafideActionView(APIView):
 
             persist_comment("hod_comment", comment)
             bon.save()
+            publish_status(bon)
 
             # notify student
             create_notification(bon.student, request.user, "actioned", f"HoD {action} your request. Comment: {comment}", target=bon)
@@ -491,110 +539,86 @@ class BonafideHistoryView(APIView):
         if designation == "TUTOR":
             tutor_class = staff_profile.student_class
             if not tutor_class:
-                return Response([], status=status.HTTP_200_OK)
+                return paginated_response(self, request, BonafideRequest.objects.none(), BonafideRequestListSerializer)
             qs = BonafideRequest.objects.filter(
-                student__student_profile__student_class=tutor_class
-            ).exclude(status__in=['pending', '', None]).order_by('-created_at')
-            serializer = BonafideRequestSerializer(qs, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+                student_class=tutor_class
+            ).exclude(status__in=['pending', ''])
+            return paginated_response(self, request, qs, BonafideRequestListSerializer, context={'request': request})
 
         # Program Coordinator: history for their class (include pc actions)
         if designation in ("PROGRAM_COORDINATOR", "PC", "COORDINATOR"):
             pc_class = staff_profile.student_class
             if not pc_class:
-                return Response([], status=status.HTTP_200_OK)
+                return paginated_response(self, request, BonafideRequest.objects.none(), BonafideRequestListSerializer)
             qs = BonafideRequest.objects.filter(
-                student__student_profile__student_class=pc_class
-            ).exclude(status__in=['pending', '', None]).order_by('-created_at')
-            serializer = BonafideRequestSerializer(qs, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+                student_class=pc_class
+            ).exclude(status__in=['pending', ''])
+            return paginated_response(self, request, qs, BonafideRequestListSerializer, context={'request': request})
 
-        # HoD: history for their department (normalized matching)
+        # HoD: history for every class in their department (StudentClass.department FK)
         if designation in ("HOD", "HEAD", "HEAD_OF_DEPARTMENT"):
-            dept = get_staff_department(staff_profile)
-            if not dept:
-                return Response([], status=status.HTTP_200_OK)
-            def norm(s) -> str:
-                return re.sub(r'\W+', '', str(s or '')).upper()
-            dept_norm = norm(dept)
-            qs = BonafideRequest.objects.exclude(status__in=['pending', '', None]).order_by('-created_at')
-            matches = []
-            for b in qs:
-                cls = getattr(getattr(b.student, 'student_profile', None), 'student_class', None)
-                class_code = getattr(cls, 'code', None) or str(cls or "")
-                if dept_norm and dept_norm in norm(class_code):
-                    matches.append(b)
-            serializer = BonafideRequestSerializer(matches, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            dept_id = staff_profile.hod_department_id
+            if not dept_id:
+                return paginated_response(self, request, BonafideRequest.objects.none(), BonafideRequestListSerializer)
+            qs = BonafideRequest.objects.filter(
+                student_class__department_id=dept_id
+            ).exclude(status__in=['pending', ''])
+            return paginated_response(self, request, qs, BonafideRequestListSerializer, context={'request': request})
 
         # other staff: empty list
-        return Response([], status=status.HTTP_200_OK)
-
-# add helper to robustly read department from StaffProfile
-def get_staff_department(staff_profile):
-    if not staff_profile:
-        return None
-
-    # 1) direct FK field on StaffProfile (your model uses hod_department)
-    dept_obj = getattr(staff_profile, "hod_department", None)
-    if dept_obj:
-        # Department instance: prefer 'code' then 'name'
-        code = getattr(dept_obj, "code", None)
-        if code:
-            return code
-        name = getattr(dept_obj, "name", None)
-        if name:
-            return name
-        return str(dept_obj)
-
-    # 2) check other common attribute names that might hold a string value
-    for attr in ('department', 'hod_department', 'department_code', 'dept', 'hodDept', 'hod_dept', 'hod_dept_code'):
-        val = getattr(staff_profile, attr, None)
-        if val:
-            return val
-
-    # 3) fallback to inspecting __dict__ for any dept-like key
-    d = getattr(staff_profile, '__dict__', None)
-    if isinstance(d, dict):
-        for k, v in d.items():
-            if v and ('dept' in k.lower() or 'hod' in k.lower()):
-                return v
-
-    return None
-
-# helper to create notification
-def create_notification(recipient, actor, verb, message="", target=None):
-    try:
-        Notification.objects.create(
-            recipient=recipient,
-            actor=actor,
-            verb=verb,
-            message=message or "",
-            target_bonafide=target
-        )
-    except Exception:
-        logger.exception("Failed to create notification for recipient=%s", getattr(recipient, "username", None))
+        return paginated_response(self, request, BonafideRequest.objects.none(), BonafideRequestListSerializer)
 
 class NotificationListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        qs = Notification.objects.filter(recipient=request.user).order_by("-created_at")
-        serializer = NotificationSerializer(qs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        qs = Notification.objects.filter(recipient=request.user)
+        return paginated_response(self, request, qs, NotificationSerializer)
 
 class NotificationMarkReadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk, *args, **kwargs):
-        try:
-            n = Notification.objects.get(pk=pk, recipient=request.user)
-        except Notification.DoesNotExist:
+        # one UPDATE; the existence check only runs when nothing was unread
+        if not mark_read(request.user, ids=[pk]) and not Notification.objects.filter(pk=pk, recipient=request.user).exists():
             return Response({"detail":"Not found"}, status=status.HTTP_404_NOT_FOUND)
-        n.unread = False
-        n.save()
         return Response({"detail":"ok"}, status=status.HTTP_200_OK)
 
+class NotificationUnreadCountView(APIView):
+    """{"unread": n} for the bell badge, from the cached per-user counter."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"unread": unread_count(request.user)}, status=status.HTTP_200_OK)
+
+class NotificationBulkMarkReadView(APIView):
+    """
+    Mark many notifications read with one UPDATE.
+    Expects JSON: {"all": true} | {"ids": [1, 2]} | {"before": "<ISO timestamp>"}
+    ("ids" and "before" can be combined). Returns {"updated": n, "unread": m}.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        ids = request.data.get("ids")
+        before = request.data.get("before")
+        if not (request.data.get("all") or ids is not None or before):
+            return Response({"detail": "Send all, ids or before."}, status=status.HTTP_400_BAD_REQUEST)
+        if ids is not None:
+            if not isinstance(ids, list):
+                return Response({"detail": "ids must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [int(i) for i in ids]
+            except (TypeError, ValueError):
+                return Response({"detail": "ids must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if before:
+            parsed = parse_datetime(str(before))
+            if parsed is None:
+                return Response({"detail": "before must be an ISO 8601 timestamp."}, status=status.HTTP_400_BAD_REQUEST)
+            before = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        updated = mark_read(request.user, ids=ids, before=before or None)
+        return Response({"updated": updated, "unread": unread_count(request.user)}, status=status.HTTP_200_OK)
+
 class BonafideFileView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -739,11 +763,43 @@ class PublicBonafideDownloadView(APIView):
             return Response({"detail": "Invalid or expired token."}, status=status.HTTP_404_NOT_FOUND)
         return FileResponse(open(file_path, "rb"), as_attachment=False, filename=os.path.basename(file_path))
 
+class AgentStatsView(APIView):
+    """
+    Staff-only latency/usage figures for recent agent runs: p50/p95/p99 per stage
+    and per graph node, token counts, error types and the cache/LLM counters.
+    Optional query params: ?endpoint=check|submit, ?limit=N (most recent runs).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        if not (getattr(request.user, "staff_profile", None) or request.user.is_staff):
+            return Response({"detail": "Staff profile required."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            limit = int(request.query_params.get("limit") or getattr(settings, "BONAFIDE_AGENT_STATS_WINDOW", 1000))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        qs = AgentRunRecord.objects.order_by("-created_at")
+        endpoint = request.query_params.get("endpoint")
+        if endpoint:
+            qs = qs.filter(endpoint=endpoint)
+        qs = qs.only("total_ms", "pdf_ms", "graph_ms", "iterations", "llm_calls",
+                     "input_tokens", "output_tokens", "cache_hit", "error_type", "nodes")[:max(1, limit)]
+
+        stats = aggregate_runs(qs)
+        stats["counters"] = {
+            "cache": cache_stats(),
+            "llm_free": llm_free_stats(),
+            "llm_usage": llm_usage_stats(),
+            "llm_guard": guard_stats(),
+            "model_tiers": tier_stats(),
+        }
+        return Response(stats, status=status.HTTP_200_OK)
+
 class StudentBonafideListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        # return all bonafide requests belonging to the logged in student
-        qs = BonafideRequest.objects.filter(student=request.user).order_by('-created_at')
-        serializer = BonafideRequestSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # the logged in student's bonafide requests, newest first, one page at a time
+        qs = BonafideRequest.objects.filter(student=request.user)
+        return paginated_response(self, request, qs, BonafideRequestListSerializer, context={'request': request})
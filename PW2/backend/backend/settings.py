@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -85,6 +86,29 @@ DATABASES = {
     }
 }
 
+# PostgreSQL instead of SQLite when POSTGRES_DB is set (psycopg2 is in requirements.txt)
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', ''),
+        'PORT': os.environ.get('POSTGRES_PORT', ''),
+    }
+
+# Cache
+# Metrics counters (accounts/metrics.py) and unread notification counts live in the cache.
+# The default LocMemCache is per process, so with several gunicorn/uvicorn workers set
+# CACHE_URL (e.g. redis://localhost:6379/1) to share one Redis cache between them.
+if os.environ.get('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_URL'],
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -145,3 +169,103 @@ CORS_ALLOW_CREDENTIALS = True
 # Media files (uploaded permission PDFs)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Bonafide agent result cache (accounts/agent_cache.py)
+# Entries are keyed by sha256(pdf bytes) + expected student details.
+BONAFIDE_AGENT_CACHE_ENABLED = True
+BONAFIDE_AGENT_CACHE_TTL = 60 * 60 * 24 * 7  # seconds
+BONAFIDE_AGENT_CACHE_MAX_ENTRIES = 5000
+
+# Background agent pipeline (accounts/agent_worker.py). With BONAFIDE_AGENT_ASYNC = False
+# the agent runs inline in BonafideSubmitView (handy for local debugging).
+BONAFIDE_AGENT_ASYNC = True
+BONAFIDE_AGENT_WORKERS = 2
+# run_agent_queue re-queues 'running' rows a worker claimed longer ago than this (the worker died)
+BONAFIDE_AGENT_STALE_MINUTES = 15
+
+# Rule-based pre-extractor (accounts/bonafide_agent.py): letters whose template
+# fields are found with at least this confidence are audited without calling Gemini.
+BONAFIDE_RULE_CONFIDENCE_THRESHOLD = 0.75
+
+# LLM backend for the bonafide agent (accounts/llm_backends.py), built lazily on first use:
+# "gemini", "fake" (deterministic local model, no quota) or a dotted path to a factory.
+BONAFIDE_LLM_BACKEND = os.environ.get("BONAFIDE_LLM_BACKEND", "gemini")
+# Fake backend behaviour: latency (ms, +/- jitter), fraction of failing calls, RNG seed
+BONAFIDE_FAKE_LLM_LATENCY_MS = 0
+BONAFIDE_FAKE_LLM_JITTER_MS = 0
+BONAFIDE_FAKE_LLM_FAILURE_RATE = 0.0
+BONAFIDE_FAKE_LLM_SEED = 0
+
+# Gemini client settings
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "")
+BONAFIDE_LLM_MODEL = "gemini-2.5-flash"  # used when BONAFIDE_MODEL_TIERS is empty
+BONAFIDE_LLM_TIMEOUT = 30  # seconds per request
+BONAFIDE_LLM_MAX_RETRIES = 2
+
+# Model tiers for the extractor, cheapest first (the rule extractor runs before all of
+# them). A request only escalates to the next tier when the audit finds missing or
+# mismatched core fields. Optional "backend" overrides BONAFIDE_LLM_BACKEND per tier.
+BONAFIDE_MODEL_TIERS = [
+    {"name": "flash-lite", "model": "gemini-2.5-flash-lite"},
+    {"name": "flash", "model": "gemini-2.5-flash"},
+]
+
+# Per-process limits on LLM calls (accounts/llm_guard.py): concurrent calls, callers
+# allowed to wait for a slot (and for how long), and the circuit breaker, which opens
+# after N consecutive failures and lets a trial call through after the reset period.
+BONAFIDE_LLM_MAX_CONCURRENCY = 4
+BONAFIDE_LLM_MAX_WAITING = 16
+BONAFIDE_LLM_ACQUIRE_TIMEOUT = 10  # seconds
+BONAFIDE_LLM_BREAKER_THRESHOLD = 5
+BONAFIDE_LLM_BREAKER_RESET = 30  # seconds
+
+# Budgets for PDF text extraction (accounts/pdf_text.py); text beyond these is dropped
+BONAFIDE_PDF_MAX_PAGES = 10
+BONAFIDE_PDF_MAX_CHARS = 20000
+BONAFIDE_PDF_MAX_TOKENS = 5000
+
+# Run PDF text extraction in a warm process pool (accounts/pdf_pool.py) so a large or
+# hostile PDF doesn't hold the GIL of a threaded worker. Processes are recycled after
+# MAX_TASKS documents; a parse exceeding TIMEOUT seconds fails and only its process is replaced.
+# Off by default so runserver and the tests don't start worker processes; enable it in deployments.
+BONAFIDE_PDF_POOL_ENABLED = os.environ.get("BONAFIDE_PDF_POOL_ENABLED", "0") == "1"
+BONAFIDE_PDF_POOL_SIZE = 2
+BONAFIDE_PDF_POOL_MAX_TASKS = 50
+BONAFIDE_PDF_POOL_TIMEOUT = 20  # seconds
+BONAFIDE_PDF_POOL_START_METHOD = "forkserver"
+
+# Lifetime of the signed check_token returned by /bonafide/check/ and accepted by /bonafide/submit/
+BONAFIDE_CHECK_TOKEN_MAX_AGE = 15 * 60  # seconds
+
+# Number of most recent agent runs aggregated by /bonafide/agent-stats/
+BONAFIDE_AGENT_STATS_WINDOW = 1000
+
+# Replay corpus (accounts/replay_corpus.py): when set, this share of traced agent runs
+# is appended to <dir>/v<N>/<date>.jsonl for `manage.py replay_bonafide_corpus`.
+# The records contain letter text and student details -- keep the directory private.
+BONAFIDE_CORPUS_DIR = os.environ.get("BONAFIDE_CORPUS_DIR") or None
+BONAFIDE_CORPUS_SAMPLE_RATE = 1.0
+
+# Keyset pagination of the list endpoints (accounts/pagination.py)
+LIST_PAGE_SIZE = 20
+LIST_MAX_PAGE_SIZE = 100
+LIST_INCLUDE_COUNT = False  # clients can still ask for a total with ?count=1
+
+# Notification fan-out (accounts/notifications.py): "inline" inserts in the request,
+# "on_commit" after its transaction commits, "worker" on a background thread
+NOTIFICATION_FANOUT_MODE = "inline"
+# lifetime of the cached per-user unread count (bounds drift from writes outside accounts/notifications.py)
+NOTIFICATION_UNREAD_TTL = 300  # seconds
+
+# Notification push stream (accounts/push.py): "local" reaches streams served by the
+# same process; use "redis" (NOTIFICATION_BUS_URL) when running several ASGI workers
+NOTIFICATION_BUS_BACKEND = os.environ.get("NOTIFICATION_BUS_BACKEND", "local")
+NOTIFICATION_BUS_URL = os.environ.get("NOTIFICATION_BUS_URL", "redis://localhost:6379/0")
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+NOTIFICATION_STREAM_REPLAY = 100  # max notifications replayed after Last-Event-ID
+NOTIFICATION_STREAM_RETRY_MS = 3000  # client reconnect delay
+
+# Notification retention (`manage.py archive_notifications`, accounts/notifications.py):
+# read notifications older than this move to NotificationArchive / a gzip file
+NOTIFICATION_RETENTION_DAYS = 90
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000  # rows per (short) transaction
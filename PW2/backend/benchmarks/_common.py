@@ -0,0 +1,68 @@
+"""Shared helpers for the scripts in benchmarks/ (run them from the backend directory)."""
+import contextlib
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Run against a throwaway test database so benchmarks never touch db.sqlite3."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def letter_lines(reason: str = "Bonafide certificate for passport application"):
+    """The text lines of a template-style permission letter."""
+    return [
+        "To the Principal,",
+        "Name: Arun Kumar",
+        "Roll No: 22CS001",
+        "Department: BE CSE G1",
+        f"Reason: {reason}",
+        "Signature of the student",
+    ]
+
+
+def make_letter_pdf(pages: int = 1, reason: str = "Bonafide certificate for passport application") -> bytes:
+    """A template-style permission letter padded to the requested page count."""
+    import fitz
+
+    lines = letter_lines(reason)
+    doc = fitz.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        y = 72
+        for line in (lines if page_no == 0 else [f"Annexure page {page_no + 1}"] * 30):
+            page.insert_text((72, y), line)
+            y += 18
+    return doc.tobytes()
@@ -0,0 +1,177 @@
+"""
+Throughput of the bonafide agent on the local fake LLM backend (no Gemini quota):
+run_bonafide_graph_from_text, BonafideCheckView and BonafideSubmitView driven at
+increasing concurrency, reporting requests/sec and latency percentiles.
+
+    python benchmarks/bench_agent_throughput.py
+    python benchmarks/bench_agent_throughput.py --target check --concurrency 1,4,16 \\
+        --latency-ms 800 --jitter-ms 200 --failure-rate 0.05 --force-llm
+
+Every request uses a distinct letter and the result cache is off unless --cache is
+given, so each request really runs the graph. Submit runs the agent inline
+(BONAFIDE_AGENT_ASYNC = False) so its latency includes the agent.
+"""
+import argparse
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from _common import letter_lines, make_letter_pdf, percentile, setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from accounts import bonafide_agent  # noqa: E402
+from accounts.bonafide_agent import run_bonafide_graph_from_text  # noqa: E402
+from accounts.models import Department, StudentClass, StudentProfile  # noqa: E402
+
+EXPECTED = {"name": "Arun Kumar", "roll_number": "22CS001", "department": "BE_CSE_G1"}
+
+
+def reason(i: int) -> str:
+    # a distinct letter per request, so the result cache can't serve it
+    return f"Bonafide certificate for scholarship application no. {i}"
+
+
+def configure(args, workdir: Path):
+    settings.BONAFIDE_LLM_BACKEND = "fake"
+    settings.BONAFIDE_FAKE_LLM_LATENCY_MS = args.latency_ms
+    settings.BONAFIDE_FAKE_LLM_JITTER_MS = args.jitter_ms
+    settings.BONAFIDE_FAKE_LLM_FAILURE_RATE = args.failure_rate
+    settings.BONAFIDE_AGENT_CACHE_ENABLED = args.cache
+    settings.BONAFIDE_AGENT_ASYNC = False
+    settings.MEDIA_ROOT = str(workdir / "media")
+    if args.force_llm:
+        # rule confidence never exceeds 1.0, so every letter goes to the (fake) LLM
+        settings.BONAFIDE_RULE_CONFIDENCE_THRESHOLD = 1.01
+    # worker threads need their own connections, which an in-memory test DB can't share
+    db = settings.DATABASES["default"]
+    if db["ENGINE"].endswith("sqlite3"):
+        db.setdefault("TEST", {})["NAME"] = str(workdir / "bench.sqlite3")
+        db.setdefault("OPTIONS", {})["timeout"] = 30
+    bonafide_agent.reset_llms()
+
+
+def seed_student():
+    User = get_user_model()
+    # the migrations may already seed the departments/classes
+    dept, _ = Department.objects.get_or_create(code="BE_CSE", defaults={"name": "BE CSE"})
+    klass, _ = StudentClass.objects.get_or_create(code="BE_CSE_G1", defaults={"name": "BE CSE G1", "department": dept})
+    student = User.objects.create_user(
+        username="22CS001", email="student@example.com", password="bench", role="student", name="Arun Kumar",
+    )
+    StudentProfile.objects.create(user=student, student_class=klass)
+    return student
+
+
+def make_ops(student):
+    counter = iter(range(10**9))
+    lock = threading.Lock()
+
+    def next_id():
+        with lock:
+            return next(counter)
+
+    def runner():
+        i = next_id()
+        result = run_bonafide_graph_from_text("\n".join(letter_lines(reason(i))), EXPECTED)
+        return result.get("is_valid") is not None
+
+    def client():
+        c = APIClient()
+        c.force_authenticate(student)
+        return c
+
+    def upload(i):
+        return SimpleUploadedFile(f"letter-{i}.pdf", make_letter_pdf(reason=reason(i)), content_type="application/pdf")
+
+    def check():
+        resp = client().post("/api/auth/bonafide/check/", {"file": upload(next_id())}, format="multipart")
+        return resp.status_code == 200
+
+    def submit():
+        i = next_id()
+        resp = client().post(
+            "/api/auth/bonafide/submit/",
+            {"file": upload(i), "reason": f"scholarship {i}", "contact": "9999999999"},
+            format="multipart",
+        )
+        return resp.status_code in (200, 201, 202)
+
+    return {"runner": runner, "check": check, "submit": submit}
+
+
+def run_level(op, concurrency: int, requests: int):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal failures
+        t0 = time.perf_counter()
+        try:
+            ok = op()
+        except Exception:
+            ok = False
+        finally:
+            connection.close()
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "rps": requests / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("runner", "check", "submit", "all"), default="all")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level.")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Fake LLM latency per call.")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--force-llm", action="store_true", help="Skip the rule-based shortcut.")
+    parser.add_argument("--cache", action="store_true", help="Keep the agent result cache enabled.")
+    args = parser.parse_args()
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    targets = ("runner", "check", "submit") if args.target == "all" else (args.target,)
+
+    # injected failures are logged with tracebacks by the views/worker; keep the table readable
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(args, Path(tmp))
+        with test_database():
+            ops = make_ops(seed_student())
+            print(f"fake LLM: {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, failure rate {args.failure_rate:.2f}, "
+                  f"force_llm={args.force_llm}, cache={args.cache}")
+            print(f"{'target':<7} {'conc':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'failed':>6}")
+            for target in targets:
+                run_level(ops[target], 1, 1)  # warm-up: builds the graph, the fake model and the alias index
+                for conc in levels:
+                    r = run_level(ops[target], conc, args.requests)
+                    print(f"{target:<7} {conc:>4} {r['rps']:>8.1f} {r['p50']:>9.1f} {r['p95']:>9.1f} "
+                          f"{r['p99']:>9.1f} {r['failures']:>6}")
+
+
+if __name__ == "__main__":
+    main()
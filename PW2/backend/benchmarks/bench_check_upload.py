@@ -0,0 +1,103 @@
+"""
+Upload-to-text latency and syscalls for BonafideCheckView: the old temp-file
+path (copy chunks to NamedTemporaryFile, fitz.open(path), unlink) against the
+current stream path (upload_pdf_source + in-memory open).
+
+    python benchmarks/bench_check_upload.py [--iterations 50]
+
+Syscalls are read/write counts from /proc/self/io (Linux) plus file opens seen
+by a sys.audit hook.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from _common import make_letter_pdf, percentile, setup_django
+
+setup_django()
+
+from django.core.files.uploadedfile import InMemoryUploadedFile  # noqa: E402
+
+from accounts.pdf_text import extract_pdf_text, upload_pdf_source  # noqa: E402
+
+_opens = 0
+
+
+def _audit(event, args):
+    global _opens
+    if event == "open":
+        _opens += 1
+
+
+def _proc_io():
+    try:
+        with open("/proc/self/io") as fh:
+            fields = dict(line.split(": ") for line in fh.read().splitlines())
+        return int(fields["syscr"]), int(fields["syscw"])
+    except OSError:
+        return 0, 0
+
+
+def make_upload(data: bytes):
+    return InMemoryUploadedFile(io.BytesIO(data), "file", "letter.pdf", "application/pdf", len(data), None)
+
+
+def legacy_tempfile(upload) -> str:
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    try:
+        for chunk in upload.chunks():
+            tmp.write(chunk)
+        tmp.flush()
+        tmp.close()
+        return extract_pdf_text(tmp.name, max_pages=10**6, max_chars=10**9, max_tokens=10**9).text
+    finally:
+        os.unlink(tmp.name)
+
+
+def stream(upload) -> str:
+    source = upload_pdf_source(upload)
+    return extract_pdf_text(source, max_pages=10**6, max_chars=10**9, max_tokens=10**9).text
+
+
+def measure(fn, data: bytes, iterations: int):
+    global _opens
+    latencies = []
+    _opens = 0
+    reads0, writes0 = _proc_io()
+    for _ in range(iterations):
+        upload = make_upload(data)
+        t0 = time.perf_counter()
+        fn(upload)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    reads1, writes1 = _proc_io()
+    # the /proc read itself costs a couple of syscalls; negligible per iteration
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "opens": _opens / iterations,
+        "reads": (reads1 - reads0) / iterations,
+        "writes": (writes1 - writes0) / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    sys.addaudithook(_audit)
+
+    print(f"{'pages':>5} {'path':<9} {'p50 ms':>8} {'p95 ms':>8} {'opens':>6} {'read()':>7} {'write()':>8}")
+    for pages in (1, 10, 50):
+        data = make_letter_pdf(pages)
+        for label, fn in (("tempfile", legacy_tempfile), ("stream", stream)):
+            fn(make_upload(data))  # warm-up
+            r = measure(fn, data, args.iterations)
+            print(f"{pages:>5} {label:<9} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['opens']:>6.1f} {r['reads']:>7.1f} {r['writes']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+HoD inbox and history: the old Python loop (fetch every hod_pending request,
+walk student -> profile -> class per row, regex-normalise class codes) against
+the current single query through StudentClass.department.
+
+    python benchmarks/bench_hod_inbox.py [--requests 100000] [--departments 10] [--repeat 1]
+
+Requests are spread evenly over departments, classes and statuses, so the HoD
+inbox is roughly 1/(3 * departments) of the table. Both sides serialize their
+rows with BonafideRequestSerializer; the DB query count is reported as well.
+The legacy loop issues ~3 queries per scanned row, so at 100k requests it
+takes minutes.
+"""
+import argparse
+import logging
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from _common import setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from accounts.models import (  # noqa: E402
+    BonafideRequest, Department, StaffProfile, StudentClass, StudentProfile,
+)
+from accounts.serializers import BonafideRequestSerializer  # noqa: E402
+
+STATUSES = ("hod_pending", "approved", "pc_pending")
+CLASSES_PER_DEPT = 4
+REQUESTS_PER_STUDENT = 20
+
+
+def seed(args):
+    User = get_user_model()
+    depts = Department.objects.bulk_create(
+        Department(code=f"BENCH{d:02d}", name=f"Bench dept {d}") for d in range(args.departments)
+    )
+    classes = StudentClass.objects.bulk_create(
+        StudentClass(code=f"BENCH{d.code[5:]}_G{g}", name=f"Bench class {g}", department=d)
+        for d in depts for g in range(1, CLASSES_PER_DEPT + 1)
+    )
+    n_students = max(len(classes), args.requests // REQUESTS_PER_STUDENT)
+    students = User.objects.bulk_create(
+        User(username=f"bench{i}", email=f"bench{i}@example.com", role="student", password="!")
+        for i in range(n_students)
+    )
+    StudentProfile.objects.bulk_create(
+        StudentProfile(user=s, student_class=classes[i % len(classes)]) for i, s in enumerate(students)
+    )
+    BonafideRequest.objects.bulk_create(
+        (BonafideRequest(student=students[i % n_students], student_class=classes[i % n_students % len(classes)],
+                         reason=f"bench {i}", status=STATUSES[i % len(STATUSES)], agent_status="done")
+         for i in range(args.requests)),
+        batch_size=5000,
+    )
+    hod = User.objects.create_user(username="bench-hod", email="hod@example.com", password="bench", role="staff")
+    StaffProfile.objects.create(user=hod, designation="HOD", hod_department=depts[0])
+    return hod
+
+
+# --- the pre-FK implementation, kept here for comparison -------------------------
+
+def _norm(s) -> str:
+    return re.sub(r'\W+', '', str(s or '')).upper()
+
+
+def legacy_matches(qs, dept_code):
+    dept_norm = _norm(dept_code)
+    matches = []
+    for b in qs:
+        cls = getattr(getattr(b.student, 'student_profile', None), 'student_class', None)
+        class_code = getattr(cls, 'code', None) or str(cls or "")
+        if dept_norm and dept_norm in _norm(class_code):
+            matches.append(b)
+    return matches
+
+
+def legacy_inbox(hod):
+    rows = legacy_matches(BonafideRequest.objects.filter(status='hod_pending'), hod.staff_profile.hod_department.code)
+    return BonafideRequestSerializer(rows, many=True).data
+
+
+def legacy_history(hod):
+    qs = BonafideRequest.objects.exclude(status__in=['pending', '', None]).order_by('-created_at')
+    rows = legacy_matches(qs, hod.staff_profile.hod_department.code)
+    return BonafideRequestSerializer(rows, many=True).data
+
+
+# --------------------------------------------------------------------------------
+
+def view(client, url):
+    def call():
+        resp = client.get(url)
+        assert resp.status_code == 200, resp.status_code
+        return resp.data["results"]
+    return call
+
+
+def measure(fn, repeat: int):
+    fn()  # warm-up: URL resolution, imports, SQLite page cache
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    best = None
+    for _ in range(repeat):
+        queries = 0
+        with connection.execute_wrapper(count):
+            t0 = time.perf_counter()
+            rows = fn()
+            elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, queries, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--departments", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="timed runs per case after one warm-up; the best is reported")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    # one page holds the whole inbox/history, so both sides serialize the same rows
+    settings.LIST_PAGE_SIZE = settings.LIST_MAX_PAGE_SIZE = 10**9
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = settings.DATABASES["default"]
+        if db["ENGINE"].endswith("sqlite3"):
+            db.setdefault("TEST", {})["NAME"] = str(Path(tmp) / "bench.sqlite3")
+        with test_database():
+            t0 = time.perf_counter()
+            hod = seed(args)
+            print(f"seeded {args.requests} requests over {args.departments} departments "
+                  f"in {time.perf_counter() - t0:.1f}s")
+            client = APIClient()
+            client.force_authenticate(hod)
+            cases = (
+                ("inbox  legacy loop", lambda: legacy_inbox(hod)),
+                ("inbox  FK query", view(client, "/api/auth/bonafide/incoming/")),
+                ("history legacy loop", lambda: legacy_history(hod)),
+                ("history FK query", view(client, "/api/auth/bonafide/history/")),
+            )
+            print(f"{'case':<20} {'ms':>10} {'queries':>8} {'rows':>7}")
+            for label, fn in cases:
+                ms, queries, rows = measure(fn, args.repeat)
+                print(f"{label:<20} {ms:>10.1f} {queries:>8} {rows:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Notification fan-out to 1, 50 and 500 recipients: the old per-recipient loop
+(StaffProfile query, then one autocommitted Notification.objects.create each)
+against accounts.notifications.notify_many in "inline" mode (one bulk_create
+in one transaction) and in "worker" mode (request-side cost only; the insert
+happens on the background thread).
+
+    python benchmarks/bench_notify_fanout.py [--recipients 1,50,500] [--repeat 5]
+
+Runs on a file-backed SQLite test database so every commit really hits disk.
+"""
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from _common import setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from accounts.models import Department, Notification, StaffProfile, StudentClass  # noqa: E402
+from accounts.notifications import get_executor, notify_many, tutors_for  # noqa: E402
+
+
+def seed(n: int, tag: str):
+    User = get_user_model()
+    dept, _ = Department.objects.get_or_create(code="BENCH_FAN", defaults={"name": "Bench fan-out"})
+    klass = StudentClass.objects.create(code=f"BENCH_FAN_{tag}", name=f"Bench {tag}", department=dept)
+    users = User.objects.bulk_create(
+        User(username=f"fan{tag}-{i}", email=f"fan{tag}-{i}@example.com", role="staff", password="!") for i in range(n)
+    )
+    StaffProfile.objects.bulk_create(StaffProfile(user=u, designation="TUTOR", student_class=klass) for u in users)
+    actor = User.objects.create_user(username=f"fan{tag}-actor", email=f"fan{tag}-actor@example.com", password="x")
+    return klass, actor
+
+
+def legacy(klass, actor):
+    for t in StaffProfile.objects.filter(student_class=klass, designation__icontains="TUTOR").select_related("user"):
+        Notification.objects.create(recipient=t.user, actor=actor, verb="new_request", message="bench")
+
+
+def measure(fn, repeat: int):
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    samples = []
+    for _ in range(repeat):
+        queries = 0
+        with connection.execute_wrapper(count):
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", default="1,50,500")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = settings.DATABASES["default"]
+        if db["ENGINE"].endswith("sqlite3"):
+            db.setdefault("TEST", {})["NAME"] = str(Path(tmp) / "bench.sqlite3")
+        with test_database():
+            print(f"{'recipients':>10} {'mode':<20} {'ms (median)':>12} {'queries':>8}")
+            for n in (int(x) for x in args.recipients.split(",")):
+                klass, actor = seed(n, str(n))
+                cases = (
+                    ("per-row create", lambda: legacy(klass, actor)),
+                    ("notify_many", lambda: notify_many(tutors_for(klass), actor, "new_request", "bench", mode="inline")),
+                    ("notify_many/worker", lambda: notify_many(tutors_for(klass), actor, "new_request", "bench",
+                                                               mode="worker")),
+                )
+                for label, fn in cases:
+                    ms, queries = measure(fn, args.repeat)
+                    print(f"{n:>10} {label:<20} {ms:>12.2f} {queries:>8}")
+                get_executor().submit(lambda: None).result()  # let queued worker inserts finish
+            get_executor().shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Mixed-workload latency with and without the PDF process pool (accounts/pdf_pool.py).
+
+A few threads keep parsing large PDFs through get_pdf_text while other threads
+serve "light" requests (rule extraction on a short letter, pure Python). The
+light requests' latency shows how much the parsing threads hold the GIL.
+
+    python benchmarks/bench_pdf_pool.py [--heavy-threads 2] [--light-requests 300] [--pages 50]
+"""
+import argparse
+import logging
+import threading
+import time
+
+from _common import make_letter_pdf, percentile, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from accounts.bonafide_agent import get_pdf_text, rule_extract  # noqa: E402
+from accounts.pdf_pool import get_pdf_pool, shutdown_pdf_pool  # noqa: E402
+
+LETTER = "\n".join([
+    "To the Principal,",
+    "I, Arun Kumar, (Roll No 22CS001) studying in BE CSE G1, request a bonafide certificate",
+    "for my passport application.",
+    "Yours faithfully,",
+])
+
+
+def run(pool: bool, args, pdf: bytes) -> dict:
+    settings.BONAFIDE_PDF_POOL_ENABLED = pool
+    if pool:
+        get_pdf_pool()  # warm: processes started and fitz imported before timing
+        get_pdf_text(pdf)
+
+    stop = threading.Event()
+    parsed = []
+
+    def heavy():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            get_pdf_text(pdf)
+            parsed.append((time.perf_counter() - t0) * 1000)
+
+    light = []
+    heavy_threads = [threading.Thread(target=heavy, daemon=True) for _ in range(args.heavy_threads)]
+    for t in heavy_threads:
+        t.start()
+    time.sleep(0.2)
+    started = time.perf_counter()
+    for _ in range(args.light_requests):
+        t0 = time.perf_counter()
+        for _ in range(args.light_work):
+            rule_extract(LETTER)
+        light.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.002)  # requests arrive spaced out, not back to back
+    wall = time.perf_counter() - started
+    stop.set()
+    for t in heavy_threads:
+        t.join()
+    return {
+        "light_p50": percentile(light, 50),
+        "light_p95": percentile(light, 95),
+        "light_p99": percentile(light, 99),
+        "parse_p50": percentile(parsed, 50),
+        "parses_per_s": len(parsed) / wall if wall else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy-threads", type=int, default=2)
+    parser.add_argument("--light-requests", type=int, default=300)
+    parser.add_argument("--light-work", type=int, default=20, help="rule_extract calls per light request")
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    pdf = make_letter_pdf(args.pages)
+    # let the parses read every page so each one is a real chunk of CPU work
+    settings.BONAFIDE_PDF_MAX_PAGES = args.pages
+    settings.BONAFIDE_PDF_MAX_CHARS = 10**9
+    settings.BONAFIDE_PDF_MAX_TOKENS = 10**9
+    print(f"{args.heavy_threads} parsing threads on a {args.pages}-page PDF, "
+          f"pool size {getattr(settings, 'BONAFIDE_PDF_POOL_SIZE', 2)}")
+    print(f"{'mode':<7} {'light p50':>10} {'light p95':>10} {'light p99':>10} {'parse p50':>10} {'parses/s':>9}")
+    try:
+        for label, pool in (("inline", False), ("pool", True)):
+            r = run(pool, args, pdf)
+            print(f"{label:<7} {r['light_p50']:>10.2f} {r['light_p95']:>10.2f} {r['light_p99']:>10.2f} "
+                  f"{r['parse_p50']:>10.1f} {r['parses_per_s']:>9.1f}")
+    finally:
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
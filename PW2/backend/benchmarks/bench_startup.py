@@ -0,0 +1,64 @@
+"""
+Startup benchmark: django.setup() plus importing the root URLconf (which pulls in
+accounts.views and the bonafide agent), measured in fresh interpreters.
+
+    python benchmarks/bench_startup.py            # lazy agent (current behaviour)
+    python benchmarks/bench_startup.py --eager    # also build the Gemini client + graph,
+                                                  # i.e. what every boot paid before
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import os, sys, time
+sys.path.insert(0, {backend!r})
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+t0 = time.perf_counter()
+import django
+django.setup()
+import backend.urls
+t1 = time.perf_counter()
+if {eager!r}:
+    from accounts.bonafide_agent import get_bonafide_app, get_llm
+    get_llm()
+    get_bonafide_app()
+t2 = time.perf_counter()
+print(f"{{(t1 - t0) * 1000:.2f}} {{(t2 - t0) * 1000:.2f}}")
+"""
+
+
+def run_once(eager: bool) -> tuple:
+    env = dict(os.environ)
+    # the client refuses to build without a key; a placeholder is enough for timing
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(backend=str(BACKEND_DIR), eager=eager)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    setup_ms, total_ms = out.stdout.strip().splitlines()[-1].split()
+    return float(setup_ms), float(total_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--eager", action="store_true", help="build the LLM client and graph during startup")
+    args = parser.parse_args()
+
+    run_once(args.eager)  # warm the filesystem/bytecode caches
+    samples = [run_once(args.eager) for _ in range(args.runs)]
+    setup = [s for s, _ in samples]
+    total = [t for _, t in samples]
+    label = "eager" if args.eager else "lazy"
+    print(f"[{label}] django.setup()+urls  median {statistics.median(setup):8.1f} ms  min {min(setup):8.1f} ms")
+    print(f"[{label}] startup total        median {statistics.median(total):8.1f} ms  min {min(total):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
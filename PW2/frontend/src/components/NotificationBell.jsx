@@ -5,6 +5,7 @@ export default function NotificationBell() {
   const [open, setOpen] = useState(false)
   const [items, setItems] = useState([])
   const [loading, setLoading] = useState(false)
+  const [unreadCount, setUnreadCount] = useState(0)
 
   const token = (localStorage.getItem("access") || localStorage.getItem("token") || null)
 
@@ -16,7 +17,8 @@ export default function NotificationBell() {
       })
       if (res.ok) {
         const data = await res.json()
-        setItems(data)
+        // paginated: the newest page is enough for the dropdown
+        setItems(data.results || [])
       }
     } catch (e) {
       console.error("fetch notifications", e)
@@ -25,15 +27,49 @@ export default function NotificationBell() {
     }
   }
 
+  // the badge only needs the count; the list is fetched when the dropdown opens
+  const fetchUnread = async () => {
+    try {
+      const res = await fetch(`${API_BASE}/api/auth/notifications/unread-count/`, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {}
+      })
+      if (res.ok) {
+        const data = await res.json()
+        setUnreadCount(data.unread || 0)
+      }
+    } catch (e) {
+      console.error("fetch unread count", e)
+    }
+  }
+
   useEffect(() => {
-    fetchNotes()
-    // poll every 30s (optional)
-    const id = setInterval(fetchNotes, 30000)
-    return () => clearInterval(id)
+    fetchUnread()
+    let pollId = null
+    // no push channel (or it gave up): poll the count
+    const poll = () => { if (pollId === null) pollId = setInterval(fetchUnread, 30000) }
+    if (!token || typeof EventSource === "undefined") {
+      poll()
+      return () => clearInterval(pollId)
+    }
+    // server push; the browser reconnects by itself and resumes from the last event id
+    const source = new EventSource(`${API_BASE}/api/auth/notifications/stream/?token=${encodeURIComponent(token)}`)
+    source.addEventListener("notification", (e) => {
+      const note = JSON.parse(e.data)
+      setItems(prev => prev.some(it => it.id === note.id) ? prev : [note, ...prev])
+      setUnreadCount(c => c + 1)
+    })
+    source.onopen = () => fetchUnread()
+    // an error response (401 once the token expired, 503 without an ASGI server) closes
+    // the EventSource for good instead of retrying
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) poll()
+    }
+    return () => {
+      source.close()
+      if (pollId !== null) clearInterval(pollId)
+    }
   }, [])
 
-  const unreadCount = items.filter(i => i.unread).length
-
   const markRead = async (id) => {
     try {
       await fetch(`${API_BASE}/api/auth/notifications/${id}/mark-read/`, {
@@ -45,11 +81,32 @@ export default function NotificationBell() {
       })
       // optimistic update
       setItems(items.map(it => it.id === id ? { ...it, unread: false } : it))
+      setUnreadCount(c => Math.max(0, c - 1))
     } catch (e) {
       console.error("mark read", e)
     }
   }
 
+  const markAllRead = async () => {
+    try {
+      const res = await fetch(`${API_BASE}/api/auth/notifications/mark-read/`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
+        },
+        body: JSON.stringify({ all: true })
+      })
+      if (res.ok) {
+        const data = await res.json()
+        setItems(items.map(it => ({ ...it, unread: false })))
+        setUnreadCount(data.unread || 0)
+      }
+    } catch (e) {
+      console.error("mark all read", e)
+    }
+  }
+
   return (
     <div style={{position:'relative', display:'inline-block'}}>
       <button aria-label="Notifications" onClick={() => { setOpen(!open); if(!open) fetchNotes() }} style={{position:'relative'}}>
@@ -66,7 +123,10 @@ export default function NotificationBell() {
         }}>
           <div style={{display:'flex', justifyContent:'space-between', alignItems:'center', marginBottom:8}}>
             <strong>Notifications</strong>
-            <button onClick={() => { setOpen(false) }}>Close</button>
+            <div>
+              {unreadCount > 0 && <button onClick={markAllRead} style={{color:'#007bff', marginRight:8}}>Mark all read</button>}
+              <button onClick={() => { setOpen(false) }}>Close</button>
+            </div>
           </div>
           {loading && <div>Loading...</div>}
           {!loading && !items.length && <div style={{color:'#666'}}>No notifications</div>}
@@ -87,7 +147,7 @@ export default function NotificationBell() {
             </div>
           ))}
           <div style={{textAlign:'center', marginTop:8}}>
-            <button onClick={() => fetchNotes()}>Refresh</button>
+            <button onClick={() => { fetchNotes(); fetchUnread() }}>Refresh</button>
           </div>
         </div>
       )}
@@ -18,6 +18,10 @@ const ApprovalHistory = () => {
   const [currentPage, setCurrentPage] = useState(1)
   const PAGE_SIZE = 5
 
+  // the history endpoint is paginated on the server ({next, results}); "Load more" follows next
+  const [nextUrl, setNextUrl] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+
   const getJwtToken = () => {
     const ls = localStorage
     return ls.getItem("access") || ls.getItem("token") || null
@@ -46,7 +50,8 @@ const ApprovalHistory = () => {
           throw new Error(txt || `Failed to load history (${res.status})`)
         }
         const data = await parseJsonOrThrow(res)
-        setItems(data)
+        setItems(data.results || [])
+        setNextUrl(data.next)
         setCurrentPage(1)
       } catch (err) {
         console.error("fetchHistory error:", err)
@@ -58,6 +63,29 @@ const ApprovalHistory = () => {
     fetchHistory()
   }, [])
 
+  const loadMore = async () => {
+    if (!nextUrl) return
+    setLoadingMore(true)
+    try {
+      const token = getJwtToken()
+      const res = await fetch(nextUrl, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {}
+      })
+      if (!res.ok) {
+        const txt = await res.text()
+        throw new Error(txt || `Failed to load history (${res.status})`)
+      }
+      const data = await parseJsonOrThrow(res)
+      setItems(prev => [...prev, ...(data.results || [])])
+      setNextUrl(data.next)
+    } catch (err) {
+      console.error("loadMore error:", err)
+      setError(err.message || "Error")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   // recalc current page if items length changed and currentPage is out of range
   useEffect(() => {
     const totalPages = Math.max(1, Math.ceil((items || []).length / PAGE_SIZE))
@@ -254,6 +282,12 @@ const ApprovalHistory = () => {
 
       </div>
 
+      {nextUrl && (
+        <div style={{textAlign:'center', margin:'12px 0'}}>
+          <button className='view-btn' onClick={loadMore} disabled={loadingMore}>{loadingMore ? 'Loading...' : 'Load more'}</button>
+        </div>
+      )}
+
       {/* Read-only modal for history detail */}
       {modalVisible && selected && (
         <div className="modal">
@@ -5,6 +5,9 @@ const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000"
 
 const IncomingRequests = () => {
   const [requests, setRequests] = useState([])
+  // the incoming endpoint is paginated ({next, results}); "Load more" follows next
+  const [nextUrl, setNextUrl] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
 
@@ -65,7 +68,8 @@ const IncomingRequests = () => {
           throw new Error(txt || `Failed to load incoming requests (${res.status})`)
         }
         const data = await parseJsonOrThrow(res)
-        setRequests(data)
+        setRequests(data.results || [])
+        setNextUrl(data.next)
       } catch (err) {
         console.error("fetchIncoming error:", err)
         setError(err.message || "Error")
@@ -108,7 +112,8 @@ const IncomingRequests = () => {
       })
       if (res.ok) {
         const d = await parseJsonOrThrow(res)
-        setRequests(d)
+        setRequests(d.results || [])
+        setNextUrl(d.next)
       } else {
         const txt = await res.text()
         throw new Error(txt || "Failed to refresh list")
@@ -120,6 +125,28 @@ const IncomingRequests = () => {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextUrl) return
+    setLoadingMore(true)
+    try {
+      const token = getJwtToken()
+      const res = await fetch(nextUrl, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {}
+      })
+      if (!res.ok) {
+        const txt = await res.text()
+        throw new Error(txt || "Failed to load more requests")
+      }
+      const d = await parseJsonOrThrow(res)
+      setRequests(prev => [...prev, ...(d.results || [])])
+      setNextUrl(d.next)
+    } catch (e) {
+      console.error("loadMore error:", e)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleAction = async (action) => {
     if (!selected || !selected.id) return
     setActionLoading(true)
@@ -259,6 +286,12 @@ const IncomingRequests = () => {
 
         </div>
 
+        {nextUrl && (
+          <div style={{textAlign:'center', margin:'12px 0'}}>
+            <button className='view-btn' onClick={loadMore} disabled={loadingMore}>{loadingMore ? 'Loading...' : 'Load more'}</button>
+          </div>
+        )}
+
         {/* Modal */}
         {modalVisible && selected && (
           <div className="modal">
@@ -10,8 +10,17 @@ const PendingRequests = () => {
   const [error, setError] = useState(null)
   const [currentPage, setCurrentPage] = useState(1)
 
+  const [nextUrl, setNextUrl] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+
   const getJwtToken = () => localStorage.getItem("access") || localStorage.getItem("token") || null
 
+  // keep only pending/forwarded statuses (not final)
+  const keep = (d) => {
+    const s = (d.status || '').toLowerCase()
+    return !['approved','rejected'].includes(s)
+  }
+
   useEffect(() => {
     const fetchMine = async () => {
       setLoading(true)
@@ -23,12 +32,9 @@ const PendingRequests = () => {
         })
         if (!res.ok) throw new Error(await res.text() || `Failed (${res.status})`)
         const data = await res.json()
-        // keep only pending/forwarded statuses (not final)
-        const filtered = (data || []).filter(d => {
-          const s = (d.status || '').toLowerCase()
-          return !['approved','rejected'].includes(s)
-        })
+        const filtered = (data.results || []).filter(keep)
         setItems(filtered)
+        setNextUrl(data.next)
         setCurrentPage(1)
       } catch (e) {
         setError(e.message || 'Error')
@@ -39,6 +45,26 @@ const PendingRequests = () => {
     fetchMine()
   }, [])
 
+  // the list endpoint is paginated ({next, results}); append the next page
+  const loadMore = async () => {
+    if (!nextUrl) return
+    setLoadingMore(true)
+    try {
+      const token = getJwtToken()
+      const res = await fetch(nextUrl, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {}
+      })
+      if (!res.ok) throw new Error(await res.text() || `Failed (${res.status})`)
+      const data = await res.json()
+      setItems(prev => [...prev, ...(data.results || []).filter(keep)])
+      setNextUrl(data.next)
+    } catch (e) {
+      setError(e.message || 'Error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const totalPages = Math.max(1, Math.ceil((items || []).length / PAGE_SIZE))
   const visibleItems = items.slice((currentPage-1)*PAGE_SIZE, currentPage*PAGE_SIZE)
 
@@ -84,6 +110,11 @@ const PendingRequests = () => {
             </div>
           ))}
         </div>
+        {nextUrl && (
+          <div style={{textAlign:'center', margin:'12px 0'}}>
+            <button className='view-btn' onClick={loadMore} disabled={loadingMore}>{loadingMore ? 'Loading...' : 'Load more'}</button>
+          </div>
+        )}
     </div>
   )
 }
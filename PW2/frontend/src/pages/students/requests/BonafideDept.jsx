@@ -19,6 +19,9 @@ const BonafideDept = () => {
   // URL for previewing the uploaded permission PDF
   const [fileUrl, setFileUrl] = useState(null)
 
+  // live progress of the agent while a check streams (server-sent events)
+  const [progress, setProgress] = useState(null)
+
   // add state for submit feedback
   const [submitMessage, setSubmitMessage] = useState(null)
 
@@ -30,6 +33,31 @@ const BonafideDept = () => {
            null
   }
 
+  // one SSE frame ("event: x\ndata: {...}") -> { event, data }
+  const parseSseFrame = (frame) => {
+    let event = 'message'
+    let data = ''
+    for (const line of frame.split('\n')) {
+      if (line.startsWith('event:')) event = line.slice(6).trim()
+      else if (line.startsWith('data:')) data += line.slice(5).trim()
+    }
+    if (!data) return null
+    try { return { event, data: JSON.parse(data) } } catch { return null }
+  }
+
+  const progressText = ({ event, data }) => {
+    if (event === 'cached') return 'This letter was checked before, loading the result...'
+    if (event === 'parsed') return 'Letter read, extracting details...'
+    if (event === 'rules') return data.confidence >= 1 ? 'Template letter detected, verifying...' : 'Analysing the letter...'
+    if (event === 'extraction') return `Extraction pass ${data.iteration} done, verifying...`
+    if (event === 'audit') {
+      const rows = Object.entries(data.checklist || {}).filter(([k]) => k !== 'AI Reasoning')
+      const ok = rows.filter(([, v]) => String(v).startsWith('✅')).length
+      return `${ok} of ${rows.length} checks passed so far...`
+    }
+    return null
+  }
+
   async function checkValidity(e) {
     e.preventDefault()
     setError(null)
@@ -51,7 +79,8 @@ const BonafideDept = () => {
       const token = getJwtToken()
       const headers = token ? { 'Authorization': `Bearer ${token}` } : {}
 
-      const resp = await fetch('http://localhost:8000/api/auth/bonafide/check/', {
+      // streamed variant of /bonafide/check/: progress events, then the same result body
+      const resp = await fetch('http://localhost:8000/api/auth/bonafide/check/stream/', {
         method: 'POST',
         headers,
         body: form,
@@ -61,13 +90,32 @@ const BonafideDept = () => {
         const txt = await resp.text()
         throw new Error(txt || 'Server error')
       }
-      const data = await resp.json()
+      const reader = resp.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let data = null
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        let idx
+        while ((idx = buffer.indexOf('\n\n')) >= 0) {
+          const ev = parseSseFrame(buffer.slice(0, idx))
+          buffer = buffer.slice(idx + 2)
+          if (!ev) continue
+          if (ev.event === 'result') data = ev.data
+          else if (ev.event === 'error') throw new Error(ev.data.detail || 'Check failed')
+          else setProgress(progressText(ev))
+        }
+      }
+      if (!data) throw new Error('The check did not complete, please try again.')
       setResult(data)
       setModalVisible(true)
     } catch (err) {
       setError(err.message || 'Failed to check document')
     } finally {
       setLoading(false)
+      setProgress(null)
     }
   }
 
@@ -89,6 +137,8 @@ const BonafideDept = () => {
       form.append('contact', formEl.querySelector("input[placeholder='Student Contact']")?.value || '')
       form.append('reason', formEl.querySelector("input[placeholder='Reason for Bonafide']")?.value || '')
       form.append('file', fileToSend)
+      // reuse the AI check for this file (server ignores it if the file changed)
+      if (result?.check_token) form.append('check_token', result.check_token)
 
       const token = getJwtToken()
       const headers = token ? { 'Authorization': `Bearer ${token}` } : {}
@@ -250,6 +300,10 @@ const BonafideDept = () => {
         </button>
       </form>
 
+      {loading && progress && (
+        <div style={{marginTop:12, color:'#555'}}>{progress}</div>
+      )}
+
       {submitMessage && (
         <div style={{marginTop:12, color: submitMessage.type === 'error' ? 'red' : 'green'}}>
           {submitMessage.text}